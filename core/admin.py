@@ -3,11 +3,14 @@ from django.contrib import admin
 # Register your models here.
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin
-from .models import CustomUser, Form, FormSubmission, SubmissionData, ChildRelationship, FormPermission
+from .models import CustomUser, Form, FormSubmission, SubmissionData, ChildRelationship, FormPermission, ExportJob, AIGenerationCacheEntry, UsageCounter, RequestProfile, ImportJob, ApiToken
+from .api_tokens import set_new_key
+from .submissions import delete_forms, delete_submissions
 from django import forms
 from .widgets import JSONFieldBuilderWidget 
 from .forms import ChildRelationshipForm
 from django.utils.html import format_html
+from django.contrib import messages
 
 # We customize how the User model is displayed
 @admin.register(CustomUser)
@@ -38,9 +41,12 @@ class FormAdmin(admin.ModelAdmin):
     ordering = ('-updated_at',)
     readonly_fields = ('submission_count',)
 
-    def submission_count(self, obj):
-        return obj.submissions.count()
-    submission_count.short_description = 'Submissions'
+    # Deletes go through core.submissions so the submission counters stay right.
+    def delete_model(self, request, obj):
+        delete_forms(Form.objects.filter(pk=obj.pk))
+
+    def delete_queryset(self, request, queryset):
+        delete_forms(queryset)
     
 class ChildRelationshipInline(admin.TabularInline):
     model = ChildRelationship
@@ -68,9 +74,18 @@ class FormSubmissionAdmin(admin.ModelAdmin):
     search_fields = ('data_entries__field_value', 'submitted_by__username')
     ordering = ('-submitted_at',)
     inlines = [SubmissionDataInline]
+    readonly_fields = ('display_label', 'snapshot')
     
     def get_queryset(self, request):
-        return super().get_queryset(request).select_related('form', 'submitted_by').prefetch_related('data_entries')
+        # __str__ reads the stored display_label, so the data entries are not needed here
+        return super().get_queryset(request).select_related('form', 'submitted_by')
+
+    # Deletes go through core.submissions so the submission counters stay right.
+    def delete_model(self, request, obj):
+        delete_submissions(FormSubmission.objects.filter(pk=obj.pk))
+
+    def delete_queryset(self, request, queryset):
+        delete_submissions(queryset)
 
 # Register your models with the admin site
 admin.site.register(ChildRelationship)
@@ -80,3 +95,72 @@ class FormPermissionAdmin(admin.ModelAdmin):
     list_display = ('user', 'form', 'permission_level')
     list_filter = ('permission_level', 'form')
     search_fields = ('user__username', 'form__form_name')
+
+@admin.register(ExportJob)
+class ExportJobAdmin(admin.ModelAdmin):
+    list_display = ('form', 'export_format', 'status', 'progress', 'requested_by', 'created_at', 'finished_at')
+    list_filter = ('status', 'export_format')
+    search_fields = ('form__form_name', 'requested_by__username')
+    readonly_fields = ('rows_total', 'rows_done', 'last_submission_id', 'submission_count', 'data_version', 'started_at', 'finished_at', 'error')
+    list_select_related = ('form', 'requested_by')
+
+@admin.register(ImportJob)
+class ImportJobAdmin(admin.ModelAdmin):
+    list_display = ('form', 'file_format', 'status', 'progress', 'rows_imported', 'rows_failed', 'requested_by', 'created_at', 'finished_at')
+    list_filter = ('status', 'file_format')
+    search_fields = ('form__form_name', 'requested_by__username')
+    readonly_fields = ('columns', 'rows_total', 'rows_done', 'rows_imported', 'rows_failed', 'row_errors', 'started_at', 'finished_at', 'error')
+    list_select_related = ('form', 'requested_by')
+
+@admin.register(AIGenerationCacheEntry)
+class AIGenerationCacheEntryAdmin(admin.ModelAdmin):
+    list_display = ('normalized_description', 'model_name', 'prompt_version', 'hits', 'created_at', 'last_used_at')
+    list_filter = ('model_name', 'prompt_version')
+    search_fields = ('normalized_description',)
+    readonly_fields = ('key', 'normalized_description', 'model_name', 'prompt_version', 'hits', 'created_at', 'last_used_at')
+
+@admin.register(UsageCounter)
+class UsageCounterAdmin(admin.ModelAdmin):
+    list_display = ('name', 'value', 'updated_at')
+    search_fields = ('name',)
+    readonly_fields = ('name', 'value', 'updated_at')
+
+@admin.register(RequestProfile)
+class RequestProfileAdmin(admin.ModelAdmin):
+    list_display = ('created_at', 'method', 'path', 'view_name', 'status_code', 'duration_ms', 'sql_count', 'sql_ms', 'user')
+    list_filter = ('view_name', 'method')
+    search_fields = ('path', 'view_name')
+    list_select_related = ('user',)
+    exclude = ('profile', 'sql_statements')
+    readonly_fields = ('created_at', 'user', 'method', 'path', 'view_name', 'status_code', 'duration_ms',
+                       'sql_count', 'sql_ms', 'profile_report', 'sql_report')
+
+    def has_add_permission(self, request):
+        # Profiles are recorded by core.profiling, never entered by hand
+        return False
+
+    @admin.display(description='Profile')
+    def profile_report(self, obj):
+        return format_html('<pre style="white-space: pre; overflow-x: auto;">{}</pre>', obj.profile)
+
+    @admin.display(description='SQL statements')
+    def sql_report(self, obj):
+        lines = [f"{statement['ms']:>9.3f} ms  {statement['sql']}" for statement in obj.sql_statements]
+        return format_html('<pre style="white-space: pre-wrap;">{}</pre>', '\n'.join(lines))
+
+
+@admin.register(ApiToken)
+class ApiTokenAdmin(admin.ModelAdmin):
+    list_display = ('name', 'user', 'key_prefix', 'is_active', 'created_at', 'last_used_at')
+    list_filter = ('is_active',)
+    search_fields = ('name', 'key_prefix', 'user__username')
+    list_select_related = ('user',)
+    exclude = ('key_hash',)
+    readonly_fields = ('key_prefix', 'created_at', 'last_used_at')
+
+    def save_model(self, request, obj, form, change):
+        if not change:
+            # Only the hash is stored, so this is the one chance to see the key
+            key = set_new_key(obj)
+            messages.warning(request, f"The key of '{obj.name}' is {key} - copy it now, it will not be shown again.")
+        super().save_model(request, obj, form, change)
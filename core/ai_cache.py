@@ -0,0 +1,129 @@
+# core/ai_cache.py (NEW FILE)
+"""
+Persistent memoization of AI-generated form fields.
+
+Descriptions are normalized (case, punctuation, whitespace) so that "student
+registration form" and "Student Registration Form." share one entry. Entries are
+keyed by that text plus the model name and PROMPT_VERSION, so switching models or
+changing the prompt never serves an old answer.
+
+Entries expire AI_CACHE_TTL seconds after they were created, and once the table
+holds more than AI_CACHE_MAX_ENTRIES the least recently used ones are evicted.
+Hits and misses are counted in UsageCounter ('ai.cache.hit' / 'ai.cache.miss').
+
+Descriptions the local rules can answer (core.utils.generate_fields_from_rules)
+never reach the cache or the model; `fast_path_fields` counts those too
+('ai.fast_path.hit' / 'ai.fast_path.miss').
+"""
+import hashlib
+import re
+from datetime import timedelta
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import AIGenerationCacheEntry, UsageCounter
+from .utils import PROMPT_VERSION, generate_fields_from_rules
+
+HIT_COUNTER = 'ai.cache.hit'
+MISS_COUNTER = 'ai.cache.miss'
+FAST_PATH_HIT_COUNTER = 'ai.fast_path.hit'
+FAST_PATH_MISS_COUNTER = 'ai.fast_path.miss'
+
+
+def normalize_description(description):
+    """Lowercases, drops punctuation and collapses whitespace."""
+    words = re.sub(r'[^\w\s]', ' ', description.lower()).split()
+    return ' '.join(words)
+
+
+def cache_key(normalized, model_name):
+    return hashlib.sha256(f'{model_name}|{PROMPT_VERSION}|{normalized}'.encode()).hexdigest()
+
+
+def _ttl():
+    return timedelta(seconds=getattr(settings, 'AI_CACHE_TTL', 30 * 24 * 60 * 60))
+
+
+def fast_path_fields(description):
+    """Returns the rule-based fields for `description`, or None if the LLM is needed."""
+    fields = generate_fields_from_rules(description)
+    UsageCounter.increment(FAST_PATH_MISS_COUNTER if fields is None else FAST_PATH_HIT_COUNTER)
+    return fields
+
+
+def _rate(hits, misses):
+    return round(hits / (hits + misses), 4) if hits + misses else None
+
+
+def get_cached_fields(description):
+    """Returns the cached field list for `description`, or None on a miss."""
+    key = cache_key(normalize_description(description), settings.OLLAMA_MODEL)
+    entry = AIGenerationCacheEntry.objects.filter(key=key).only('id', 'fields', 'created_at').first()
+    if entry is not None and entry.created_at < timezone.now() - _ttl():
+        entry.delete()
+        entry = None
+
+    if entry is None:
+        UsageCounter.increment(MISS_COUNTER)
+        return None
+    AIGenerationCacheEntry.objects.filter(pk=entry.pk).update(hits=F('hits') + 1, last_used_at=timezone.now())
+    UsageCounter.increment(HIT_COUNTER)
+    return entry.fields
+
+
+def store_fields(description, fields):
+    """Saves a successful generation, then evicts expired and least recently used entries."""
+    normalized = normalize_description(description)
+    now = timezone.now()
+    with transaction.atomic():
+        AIGenerationCacheEntry.objects.update_or_create(
+            key=cache_key(normalized, settings.OLLAMA_MODEL),
+            defaults={
+                'normalized_description': normalized,
+                'model_name': settings.OLLAMA_MODEL,
+                'prompt_version': PROMPT_VERSION,
+                'fields': fields,
+                'created_at': now,
+                'last_used_at': now,
+            },
+        )
+    evict_entries()
+
+
+def evict_entries():
+    """Deletes expired entries and everything beyond AI_CACHE_MAX_ENTRIES, oldest use first."""
+    AIGenerationCacheEntry.objects.filter(created_at__lt=timezone.now() - _ttl()).delete()
+    max_entries = getattr(settings, 'AI_CACHE_MAX_ENTRIES', 5000)
+    overflow = list(
+        AIGenerationCacheEntry.objects.order_by('-last_used_at', '-id').values_list('id', flat=True)[max_entries:]
+    )
+    if overflow:
+        AIGenerationCacheEntry.objects.filter(id__in=overflow).delete()
+
+
+def cache_stats():
+    """Hit/miss counters of the cache and of the rule-based fast path, and the number of entries."""
+    counters = UsageCounter.current_values('ai.')
+    hits, misses = counters.get(HIT_COUNTER, 0), counters.get(MISS_COUNTER, 0)
+    fast_hits, fast_misses = counters.get(FAST_PATH_HIT_COUNTER, 0), counters.get(FAST_PATH_MISS_COUNTER, 0)
+    return {
+        'hits': hits,
+        'misses': misses,
+        'hit_rate': _rate(hits, misses),
+        'entries': AIGenerationCacheEntry.objects.count(),
+        'fast_path': {
+            'hits': fast_hits,
+            'misses': fast_misses,
+            'hit_rate': _rate(fast_hits, fast_misses),
+        },
+    }
+
+
+afast_path_fields = sync_to_async(fast_path_fields)
+aget_cached_fields = sync_to_async(get_cached_fields)
+astore_fields = sync_to_async(store_fields)
+acache_stats = sync_to_async(cache_stats)
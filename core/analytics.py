@@ -0,0 +1,451 @@
+# core/analytics.py (NEW FILE)
+"""
+Incrementally maintained aggregates behind the analytics dashboard.
+
+For every chartable field of a form we keep:
+- FieldBucket rows: submissions per numeric range (INTEGER/FLOAT), per option
+  (SELECT/RADIO) or per day (DATE/DATETIME);
+- a FieldStats row for numeric fields: count, min, max and sum.
+
+`record_submissions` adds a batch of new submissions to them with two upserts, in
+the same transaction as the submissions themselves, so `form_analytics` renders
+from a handful of rows per field however many submissions the form has.
+
+Deleting or editing a submission clears `Form.analytics_ready` instead of trying
+to subtract it. `rebuild_stale_aggregates` recomputes such forms:
+`manage.py rebuild_form_analytics --watch` keeps doing so in the background,
+and `form_analytics` rebuilds small forms on the spot.
+Until then the charts come from the SQL aggregation engine at the end of this
+module, which lets PostgreSQL do the bucketing.
+"""
+import hashlib
+import logging
+import math
+from collections import Counter
+from datetime import date
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.db.models import Count, DateField, F, FloatField, Func, IntegerField, Max, Min, Sum, Value
+from django.db.models.functions import Cast, Least, Substr, Trunc
+from django.utils import timezone
+
+import plotly.express as px
+
+from .matrix import NUMERIC_PATTERN, default_matrix_source, field_values, iter_submission_matrix
+from .models import FieldBucket, FieldStats, Form, FormSubmission
+from .schema import get_form_schema
+
+logger = logging.getLogger(__name__)
+
+# Which aggregate each chartable field type gets.
+AGGREGATE_KINDS = {
+    'INTEGER': 'numeric',
+    'FLOAT': 'numeric',
+    'SELECT': 'category',
+    'RADIO': 'category',
+    'DATE': 'date',
+    'DATETIME': 'date',
+}
+# Numeric values are bucketed to this many significant digits, which bounds the
+# number of buckets per power of ten no matter how many values there are.
+NUMERIC_BUCKET_DIGITS = 3
+REBUILD_CHUNK_SIZE = 2000
+# Rows per INSERT ... ON CONFLICT statement, well below PostgreSQL's parameter limit.
+UPSERT_BATCH_SIZE = 1000
+# Number of equal-width bins the SQL fallback splits a numeric field into.
+SQL_HISTOGRAM_BINS = 20
+ISO_DATE_PATTERN = r'^\d{4}-\d{2}-\d{2}'
+
+
+def chartable_fields(schema):
+    """The (compiled field, aggregate kind) pairs of a schema, in field order."""
+    return [(field, AGGREGATE_KINDS[field.type]) for field in schema.fields if field.type in AGGREGATE_KINDS]
+
+
+def _parse_number(value):
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        return None
+    return number if math.isfinite(number) else None
+
+
+def bucket_for(kind, value):
+    """Returns the bucket key a non-empty value falls into, or None if it cannot be bucketed."""
+    if value in (None, ''):
+        return None
+    if kind == 'numeric':
+        number = _parse_number(value)
+        return None if number is None else f'{number:.{NUMERIC_BUCKET_DIGITS}g}'
+    if kind == 'date':
+        try:
+            return date.fromisoformat(str(value)[:10]).isoformat()
+        except ValueError:
+            return None
+    return str(value)[:255]
+
+
+def accumulate(schema, snapshots):
+    """
+    Folds {field_name: field_value} snapshots into bucket counts and numeric stats.
+    Returns (Counter of (field_name, kind, bucket) -> count, {field_name: [count, min, max, sum]}).
+    """
+    fields = chartable_fields(schema)
+    buckets = Counter()
+    stats = {}
+    for snapshot in snapshots:
+        for field, kind in fields:
+            value = snapshot.get(field.name)
+            bucket = bucket_for(kind, value)
+            if bucket is None:
+                continue
+            buckets[(field.name, kind, bucket)] += 1
+            if kind == 'numeric':
+                number = _parse_number(value)
+                entry = stats.setdefault(field.name, [0, number, number, 0.0])
+                entry[0] += 1
+                entry[1] = min(entry[1], number)
+                entry[2] = max(entry[2], number)
+                entry[3] += number
+    return buckets, stats
+
+
+def _upsert_aggregates(form_id, buckets, stats):
+    """Adds the accumulated counts to the stored aggregates (usually one upsert per table)."""
+    now = timezone.now()
+    with connection.cursor() as cursor:
+        # Sorted so concurrent writers lock the rows in the same order.
+        bucket_rows = sorted(buckets.items())
+        for start in range(0, len(bucket_rows), UPSERT_BATCH_SIZE):
+            rows = bucket_rows[start:start + UPSERT_BATCH_SIZE]
+            cursor.execute(
+                f"""
+                INSERT INTO {FieldBucket._meta.db_table} AS t (form_id, field_name, kind, bucket, count, updated_at)
+                VALUES {', '.join(['(%s, %s, %s, %s, %s, %s)'] * len(rows))}
+                ON CONFLICT (form_id, field_name, bucket) DO UPDATE
+                SET count = t.count + EXCLUDED.count, updated_at = EXCLUDED.updated_at
+                """,
+                [param for (field_name, kind, bucket), count in rows
+                 for param in (form_id, field_name, kind, bucket, count, now)],
+            )
+        if stats:
+            # One row per numeric field, so this always fits in a single statement.
+            rows = sorted(stats.items())
+            cursor.execute(
+                f"""
+                INSERT INTO {FieldStats._meta.db_table} AS t
+                    (form_id, field_name, count, min_value, max_value, sum_value, updated_at)
+                VALUES {', '.join(['(%s, %s, %s, %s, %s, %s, %s)'] * len(rows))}
+                ON CONFLICT (form_id, field_name) DO UPDATE
+                SET count = t.count + EXCLUDED.count,
+                    min_value = LEAST(t.min_value, EXCLUDED.min_value),
+                    max_value = GREATEST(t.max_value, EXCLUDED.max_value),
+                    sum_value = t.sum_value + EXCLUDED.sum_value,
+                    updated_at = EXCLUDED.updated_at
+                """,
+                [param for field_name, entry in rows for param in (form_id, field_name, *entry, now)],
+            )
+
+
+def record_submissions(form, snapshots):
+    """
+    Adds newly written submissions to the form's aggregates. Call it inside the
+    transaction that writes them, after locking the form row (see core.submissions).
+    """
+    buckets, stats = accumulate(get_form_schema(form), snapshots)
+    _upsert_aggregates(form.pk, buckets, stats)
+
+
+def _iter_submission_values(form, schema, chunk_size):
+    """
+    Yields a {field_name: field_value} dict per submission of `form`, read from the
+    source named by SUBMISSION_MATRIX_SOURCE. Streamed in chunks, so only the
+    aggregates are held in memory.
+    """
+    if default_matrix_source() == 'snapshot':
+        yield from FormSubmission.objects.filter(form=form).values_list('snapshot', flat=True).iterator(
+            chunk_size=chunk_size
+        )
+        return
+    columns = [field.name for field, kind in chartable_fields(schema)]
+    for row in iter_submission_matrix(form, columns, extra_fields=(), chunk_size=chunk_size):
+        yield dict(zip(columns, row))
+
+
+def rebuild_form_aggregates(form, chunk_size=REBUILD_CHUNK_SIZE):
+    """
+    Recomputes all aggregates of `form` from its submissions (snapshots or
+    SubmissionData rows, per SUBMISSION_MATRIX_SOURCE) and marks them ready. The form row is locked meanwhile, so submissions written
+    concurrently wait and are then added on top of the rebuilt totals.
+    """
+    with transaction.atomic():
+        form = Form.objects.select_for_update().get(pk=form.pk)
+        FieldBucket.objects.filter(form=form).delete()
+        FieldStats.objects.filter(form=form).delete()
+
+        schema = get_form_schema(form)
+        buckets, stats = accumulate(schema, _iter_submission_values(form, schema, chunk_size))
+
+        FieldBucket.objects.bulk_create([
+            FieldBucket(form=form, field_name=field_name, kind=kind, bucket=bucket, count=count)
+            for (field_name, kind, bucket), count in buckets.items()
+        ], batch_size=chunk_size)
+        FieldStats.objects.bulk_create([
+            FieldStats(form=form, field_name=field_name, count=count,
+                       min_value=min_value, max_value=max_value, sum_value=sum_value)
+            for field_name, (count, min_value, max_value, sum_value) in stats.items()
+        ])
+        Form.objects.filter(pk=form.pk).update(analytics_ready=True)
+    return form
+
+
+def rebuild_stale_aggregates(limit=None):
+    """
+    Rebuilds the aggregates of forms whose `analytics_ready` flag was cleared, at most
+    `limit` of them, and returns how many were rebuilt. Forms another process is
+    rebuilding (or writing to) right now are skipped and left for the next call.
+    """
+    form_ids = Form.objects.filter(analytics_ready=False).order_by('id').values_list('id', flat=True)
+    rebuilt = 0
+    for form_id in form_ids[:limit] if limit else form_ids:
+        with transaction.atomic():
+            form = Form.objects.select_for_update(skip_locked=True).filter(pk=form_id, analytics_ready=False).first()
+            if form is None:
+                continue
+            rebuild_form_aggregates(form)
+        rebuilt += 1
+    return rebuilt
+
+
+def load_field_series(form, field_names=None):
+    """
+    Returns ({field_name: [(bucket, count), ...]}, {field_name: FieldStats}) for the
+    chartable fields with data (or only those in `field_names`), ordered for
+    charting: numeric and date buckets ascending, categories by count. Costs two queries.
+    """
+    kinds = {field.name: kind for field, kind in chartable_fields(get_form_schema(form))}
+    if field_names is not None:
+        kinds = {name: kind for name, kind in kinds.items() if name in field_names}
+    series = {}
+    for field_name, bucket, count in FieldBucket.objects.filter(
+        form=form, field_name__in=kinds, count__gt=0
+    ).values_list('field_name', 'bucket', 'count'):
+        series.setdefault(field_name, []).append((bucket, count))
+
+    for field_name, points in series.items():
+        kind = kinds[field_name]
+        if kind == 'numeric':
+            points[:] = sorted((float(bucket), count) for bucket, count in points)
+        elif kind == 'date':
+            points.sort()
+        else:
+            points.sort(key=lambda point: (-point[1], point[0]))
+
+    stats = {entry.field_name: entry for entry in FieldStats.objects.filter(form=form, field_name__in=kinds)}
+    return series, stats
+
+
+def render_chart(field_name, kind, points, stats=None):
+    """Renders one chart from pre-aggregated (bucket, count) points as an HTML fragment."""
+    labels, counts = [point[0] for point in points], [point[1] for point in points]
+    if kind == 'numeric':
+        title = f'Distribution of {field_name}'
+        if stats is not None and stats.count:
+            title += (f'<br><sup>min {stats.min_value:g} · mean {stats.sum_value / stats.count:g}'
+                      f' · max {stats.max_value:g}</sup>')
+        # Each bucket is weighted by its count, so Plotly bins the buckets, not raw rows.
+        fig = px.histogram(x=labels, y=counts, histfunc='sum', title=title,
+                           labels={'x': field_name, 'y': 'count'}, template='plotly_white')
+    elif kind == 'category':
+        fig = px.pie(values=counts, names=labels, title=f'Distribution of {field_name}', hole=0.3)
+    else:
+        fig = px.bar(x=labels, y=counts, title=f'Submissions by Date for {field_name}',
+                     labels={'x': 'Date', 'y': 'Count'})
+    return fig.to_html(full_html=False, include_plotlyjs='cdn')
+
+
+# --- Rendered chart cache ---
+
+def field_data_markers(form):
+    """
+    Returns {field_name: marker} for every field with aggregates, in one query. A
+    field's marker changes whenever one of its buckets is written or rebuilt.
+    """
+    return {
+        field_name: f'{last_update.timestamp()}:{buckets}'
+        for field_name, last_update, buckets in FieldBucket.objects.filter(form=form)
+        .values('field_name').annotate(last_update=Max('updated_at'), buckets=Count('id'))
+        .values_list('field_name', 'last_update', 'buckets')
+    }
+
+
+def _chart_cache_key(form_id, field_name, kind, marker):
+    # Field names are free text, so they are hashed to keep the key cache-safe.
+    digest = hashlib.md5(f'{field_name}|{kind}|{marker}'.encode()).hexdigest()
+    return f'core:chart:{form_id}:{digest}'
+
+
+def render_form_charts(form):
+    """
+    Returns the chart HTML fragments of `form`, in field order. Each chart is cached
+    under its field's data marker, so after a submission only the charts of fields
+    whose aggregates changed are rendered again.
+    """
+    markers = field_data_markers(form)
+    keys = {
+        field.name: (kind, _chart_cache_key(form.pk, field.name, kind, markers[field.name]))
+        for field, kind in chartable_fields(get_form_schema(form))
+        if field.name in markers
+    }
+    charts = cache.get_many([key for _, key in keys.values()])
+
+    stale = [field_name for field_name, (_, key) in keys.items() if key not in charts]
+    if stale:
+        series, stats = load_field_series(form, stale)
+        rendered = {}
+        for field_name in stale:
+            kind, key = keys[field_name]
+            if field_name not in series:
+                continue
+            try:
+                rendered[key] = render_chart(field_name, kind, series[field_name], stats.get(field_name))
+            except Exception:
+                logger.exception(f"Could not generate chart for column '{field_name}'")
+        cache.set_many(rendered, getattr(settings, 'ANALYTICS_CHART_CACHE_TIMEOUT', 24 * 60 * 60))
+        charts.update(rendered)
+
+    return [charts[key] for _, key in keys.values() if key in charts]
+
+
+# --- SQL aggregation engine ---
+# Used while a form's aggregates are not ready: each chart's series is computed by
+# PostgreSQL over the values of that one field, and only the aggregated points
+# come back to Python.
+
+def _sql_numeric_series(values, field_name):
+    numbers = values.filter(value__regex=NUMERIC_PATTERN).annotate(number=Cast('value', FloatField()))
+    summary = numbers.aggregate(count=Count('pk'), low=Min('number'), high=Max('number'), total=Sum('number'))
+    if not summary['count']:
+        return [], None
+    stats = FieldStats(field_name=field_name, count=summary['count'], min_value=summary['low'],
+                       max_value=summary['high'], sum_value=summary['total'])
+    low, high = summary['low'], summary['high']
+    if low == high:
+        return [(low, summary['count'])], stats
+
+    width = (high - low) / SQL_HISTOGRAM_BINS
+    # width_bucket puts the maximum itself in bin N + 1, so it is folded into bin N.
+    bucket = Least(
+        Func(F('number'), Value(low), Value(high), Value(SQL_HISTOGRAM_BINS),
+             function='width_bucket', output_field=IntegerField()),
+        Value(SQL_HISTOGRAM_BINS),
+    )
+    rows = numbers.annotate(bucket=bucket).values('bucket').annotate(count=Count('pk')).order_by('bucket')
+    return [(low + (row['bucket'] - 1) * width, row['count']) for row in rows], stats
+
+
+def _sql_category_series(values):
+    rows = values.exclude(value='').values('value').annotate(count=Count('pk')).order_by('-count', 'value')
+    return [(row['value'], row['count']) for row in rows]
+
+
+def _sql_date_series(values):
+    day = Trunc(Cast(Substr('value', 1, 10), DateField()), 'day', output_field=DateField())
+    rows = (
+        values.filter(value__regex=ISO_DATE_PATTERN).annotate(day=day)
+        .values('day').annotate(count=Count('pk')).order_by('day')
+    )
+    return [(row['day'].isoformat(), row['count']) for row in rows]
+
+
+def sql_field_series(form):
+    """
+    Like `load_field_series`, but computed from the submissions themselves with
+    width_bucket (numeric), GROUP BY (categories) and date_trunc (dates). Costs one
+    or two queries per chartable field; memory use does not depend on the number
+    of submissions.
+    """
+    series, stats = {}, {}
+    for field, kind in chartable_fields(get_form_schema(form)):
+        values = field_values(form, field.name)
+        try:
+            # A savepoint, so one field with unparseable data does not break the others.
+            with transaction.atomic():
+                if kind == 'numeric':
+                    points, field_stats = _sql_numeric_series(values, field.name)
+                    if field_stats is not None:
+                        stats[field.name] = field_stats
+                elif kind == 'category':
+                    points = _sql_category_series(values)
+                else:
+                    points = _sql_date_series(values)
+        except Exception:
+            logger.exception(f"Could not aggregate column '{field.name}'")
+            continue
+        if points:
+            series[field.name] = points
+    return series, stats
+
+
+def render_sql_charts(form):
+    """Renders every chart of `form` from `sql_field_series`, without the chart cache."""
+    series, stats = sql_field_series(form)
+    charts = []
+    for field, kind in chartable_fields(get_form_schema(form)):
+        if field.name not in series:
+            continue
+        try:
+            charts.append(render_chart(field.name, kind, series[field.name], stats.get(field.name)))
+        except Exception:
+            logger.exception(f"Could not generate chart for column '{field.name}'")
+    return charts
+
+
+# --- Child form roll-up ---
+
+def child_form_rollup(form, depth=1):
+    """
+    Counts the submissions of `form`'s active descendant forms that hang off this
+    form's submissions, down to `depth` levels (1 = children, 2 = grandchildren, ...).
+    Returns a list of {'id', 'name', 'depth', 'count'} dicts ordered by depth, forms
+    without any linked submission included. Runs as a single query: two recursive
+    CTEs walk the form tree and the submission tree, then one GROUP BY counts.
+    """
+    form_table = Form._meta.db_table
+    submission_table = FormSubmission._meta.db_table
+    sql = f"""
+        WITH RECURSIVE descendant_forms AS (
+            SELECT id, form_name, 1 AS depth
+            FROM {form_table}
+            WHERE parent_form_id = %(root)s AND status = 'active'
+            UNION ALL
+            SELECT f.id, f.form_name, d.depth + 1
+            FROM {form_table} AS f
+            JOIN descendant_forms AS d ON f.parent_form_id = d.id
+            WHERE d.depth < %(depth)s AND f.status = 'active'
+        ),
+        linked_submissions AS (
+            SELECT s.id, s.form_id, 1 AS depth
+            FROM {submission_table} AS s
+            JOIN {submission_table} AS p ON p.id = s.parent_submission_id
+            WHERE p.form_id = %(root)s
+            UNION ALL
+            SELECT s.id, s.form_id, l.depth + 1
+            FROM {submission_table} AS s
+            JOIN linked_submissions AS l ON s.parent_submission_id = l.id
+            WHERE l.depth < %(depth)s
+        )
+        SELECT d.id, d.form_name, d.depth, COUNT(l.id)
+        FROM descendant_forms AS d
+        LEFT JOIN linked_submissions AS l ON l.form_id = d.id AND l.depth = d.depth
+        GROUP BY d.id, d.form_name, d.depth
+        ORDER BY d.depth, d.id
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(sql, {'root': form.pk, 'depth': depth})
+        return [
+            {'id': form_id, 'name': form_name, 'depth': form_depth, 'count': count}
+            for form_id, form_name, form_depth, count in cursor.fetchall()
+        ]
@@ -0,0 +1,59 @@
+# core/api_tokens.py (NEW FILE)
+"""
+API tokens for machine clients.
+
+A client sends `Authorization: Bearer <key>`. The key is only shown once, when
+the token is created (in the admin or with `manage.py create_api_token`). The
+database keeps its SHA-256 hash, so looking a key up is a single indexed query
+and a leaked database does not leak working keys. A token acts as its user:
+the user's form permissions apply, and deactivating the token or the user
+revokes it.
+"""
+import hashlib
+import secrets
+from datetime import timedelta
+
+from django.utils import timezone
+
+from .models import ApiToken
+
+# How often `last_used_at` is written, at most.
+LAST_USED_RESOLUTION = timedelta(minutes=1)
+
+
+def hash_key(key):
+    return hashlib.sha256(key.encode()).hexdigest()
+
+
+def set_new_key(token):
+    """Gives an (unsaved) token a fresh random key and returns the key."""
+    key = secrets.token_urlsafe(32)
+    token.key_prefix = key[:8]
+    token.key_hash = hash_key(key)
+    return key
+
+
+def create_api_token(user, name):
+    """Creates a token for `user`. Returns (token, key); the key cannot be recovered later."""
+    token = ApiToken(user=user, name=name)
+    key = set_new_key(token)
+    token.save()
+    return token, key
+
+
+def authenticate_api_token(request):
+    """Returns the active ApiToken named by the request's Authorization header, or None."""
+    scheme, _, key = request.headers.get('Authorization', '').partition(' ')
+    if scheme.lower() != 'bearer' or not key.strip():
+        return None
+    token = ApiToken.objects.select_related('user').filter(
+        key_hash=hash_key(key.strip()), is_active=True, user__is_active=True
+    ).first()
+    if token is None:
+        return None
+
+    now = timezone.now()
+    if token.last_used_at is None or now - token.last_used_at > LAST_USED_RESOLUTION:
+        ApiToken.objects.filter(pk=token.pk).update(last_used_at=now)
+        token.last_used_at = now
+    return token
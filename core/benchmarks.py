@@ -0,0 +1,165 @@
+# core/benchmarks.py (NEW FILE)
+"""
+The view benchmark suite run by `manage.py run_benchmarks`.
+
+Each BenchmarkCase names a hot view, how to request it against a synthetic
+workload (see core.synthetic) and the Budget it must stay within: the number of
+SQL queries, the median wall time and the peak Python memory allocated while
+handling one request. Query budgets do not depend on the machine, so they are the
+ones to keep tight; time budgets are generous, and can be skipped on slow machines
+with `--no-time-budgets`.
+"""
+import statistics
+import time
+import tracemalloc
+from dataclasses import dataclass
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from .synthetic import synthetic_value
+
+
+@dataclass(frozen=True)
+class Budget:
+    queries: int
+    milliseconds: float
+    memory_mb: float
+
+
+@dataclass(frozen=True)
+class BenchmarkCase:
+    name: str
+    # Builds (method, url, data) from the BenchmarkContext.
+    request: object
+    budget: Budget
+    expected_status: int = 200
+    # Posts to a child form, so the workload needs --depth 1 or more.
+    needs_child_form: bool = False
+
+
+@dataclass
+class BenchmarkContext:
+    root_form: object
+    # The first child form of root_form, or None when the workload has no child forms.
+    child_form: object
+    parent_submission_id: int
+    sequence: int = 0
+
+    def next_values(self, form, rng):
+        """Fresh valid values for one submission to `form`."""
+        self.sequence += 1
+        return {field['name']: synthetic_value(field, rng, self.sequence) for field in form.fields}
+
+
+@dataclass
+class BenchmarkResult:
+    case: BenchmarkCase
+    status_code: int
+    queries: int
+    median_ms: float
+    max_ms: float
+    peak_memory_mb: float
+
+    def violations(self, check_time=True):
+        budget, problems = self.case.budget, []
+        if self.status_code != self.case.expected_status:
+            problems.append(f'returned {self.status_code}, expected {self.case.expected_status}')
+        if self.queries > budget.queries:
+            problems.append(f'{self.queries} queries > {budget.queries}')
+        if check_time and self.median_ms > budget.milliseconds:
+            problems.append(f'{self.median_ms:.0f}ms > {budget.milliseconds:.0f}ms')
+        if self.peak_memory_mb > budget.memory_mb:
+            problems.append(f'{self.peak_memory_mb:.1f}MB > {budget.memory_mb:.1f}MB')
+        return problems
+
+    def as_dict(self):
+        return {
+            'name': self.case.name,
+            'status_code': self.status_code,
+            'queries': self.queries,
+            'median_ms': round(self.median_ms, 2),
+            'max_ms': round(self.max_ms, 2),
+            'peak_memory_mb': round(self.peak_memory_mb, 2),
+            'budget': {
+                'queries': self.case.budget.queries,
+                'milliseconds': self.case.budget.milliseconds,
+                'memory_mb': self.case.budget.memory_mb,
+            },
+        }
+
+
+# The test client posts list values (multi-value fields) as repeated keys, like a browser.
+def _submit_public(context, rng):
+    form = context.root_form
+    return 'post', reverse('form_fill', args=[form.share_token]), context.next_values(form, rng)
+
+
+def _submit_internal(context, rng):
+    form = context.child_form
+    data = context.next_values(form, rng)
+    data.update({'form_id': form.pk, 'parent_submission_id': context.parent_submission_id})
+    return 'post', reverse('internal_form_fill'), data
+
+
+BENCHMARK_CASES = [
+    BenchmarkCase('dashboard', lambda c, rng: ('get', reverse('dashboard'), None),
+                  Budget(queries=8, milliseconds=300, memory_mb=4)),
+    BenchmarkCase('form_detail', lambda c, rng: ('get', reverse('form_detail', args=[c.root_form.pk]), None),
+                  Budget(queries=8, milliseconds=300, memory_mb=4)),
+    BenchmarkCase('form_analytics', lambda c, rng: ('get', reverse('form_analytics', args=[c.root_form.pk]), None),
+                  Budget(queries=8, milliseconds=1000, memory_mb=10)),
+    BenchmarkCase('export_csv', lambda c, rng: ('get', reverse('export_csv', args=[c.root_form.pk]), None),
+                  Budget(queries=7, milliseconds=1000, memory_mb=4)),
+    BenchmarkCase('export_excel', lambda c, rng: ('get', reverse('export_excel', args=[c.root_form.pk]), None),
+                  Budget(queries=7, milliseconds=3000, memory_mb=16)),
+    BenchmarkCase('export_pdf', lambda c, rng: ('get', reverse('export_pdf', args=[c.root_form.pk]), None),
+                  Budget(queries=7, milliseconds=5000, memory_mb=16)),
+    BenchmarkCase('form_fill (submit)', _submit_public,
+                  Budget(queries=10, milliseconds=200, memory_mb=2)),
+    BenchmarkCase('internal_form_fill (submit)', _submit_internal,
+                  Budget(queries=12, milliseconds=200, memory_mb=2), expected_status=302, needs_child_form=True),
+]
+
+
+def _send(client, method, url, data):
+    response = client.get(url) if method == 'get' else client.post(url, data)
+    # Streaming responses (the exports) only do their work while being read.
+    if getattr(response, 'streaming', False):
+        for _ in response.streaming_content:
+            pass
+    return response
+
+
+def run_case(client, case, context, rng, repeat=5):
+    """Runs `case` once to warm up, `repeat` times for timing and once more under tracemalloc."""
+    _send(client, *case.request(context, rng))
+
+    timings, queries, status_code = [], 0, None
+    for _ in range(repeat):
+        request = case.request(context, rng)
+        with CaptureQueriesContext(connection) as captured:
+            started = time.perf_counter()
+            response = _send(client, *request)
+            timings.append((time.perf_counter() - started) * 1000)
+        queries = max(queries, len(captured.captured_queries))
+        status_code = response.status_code
+
+    # Memory is measured separately: tracemalloc slows everything down.
+    request = case.request(context, rng)
+    tracemalloc.start()
+    try:
+        _send(client, *request)
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+    return BenchmarkResult(
+        case=case,
+        status_code=status_code,
+        queries=queries,
+        median_ms=statistics.median(timings),
+        max_ms=max(timings),
+        peak_memory_mb=peak / (1024 * 1024),
+    )
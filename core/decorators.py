@@ -1,33 +1,50 @@
 # core/decorators.py (NEW FILE)
 from functools import wraps
-from django.shortcuts import get_object_or_404, redirect
-from django.http import Http404
-from .models import Form, FormPermission
+from django.http import Http404, JsonResponse
+from .api_tokens import authenticate_api_token
+from .permissions import resolve_form_permission
 
 def user_has_permission(required_levels):
     """
     Decorator to check if a user has the required permission level for a form.
     required_levels should be a list, e.g., ['editor', 'admin']
+
+    Global admins and the form creator always have permission. The loaded form is
+    available to the view as `request.form` and the user's level as
+    `request.form_permission` (see core.permissions).
     """
     def decorator(view_func):
         @wraps(view_func)
         def _wrapped_view(request, form_id, *args, **kwargs):
-            form = get_object_or_404(Form, pk=form_id)
-            user = request.user
-
-            # Global admin and the form creator always have permission
-            if user.role == 'admin' or form.created_by == user:
+            # Let the view's own @login_required send anonymous users to the login page
+            if not request.user.is_authenticated:
                 return view_func(request, form_id, *args, **kwargs)
 
-            # Check for explicit permission
-            try:
-                permission = FormPermission.objects.get(form=form, user=user)
-                if permission.permission_level in required_levels:
-                    return view_func(request, form_id, *args, **kwargs)
-            except FormPermission.DoesNotExist:
-                pass # Fall through to the error
+            form, level = resolve_form_permission(request, form_id)
+            if level == 'admin' or level in required_levels:
+                return view_func(request, form_id, *args, **kwargs)
 
             # If no permission was found, raise a 404 Not Found error
             raise Http404
         return _wrapped_view
-    return decorator
\ No newline at end of file
+    return decorator
+
+
+def api_token_required(view_func):
+    """
+    Decorator for JSON API views called by machine clients. Authenticates the
+    `Authorization: Bearer <key>` header (see core.api_tokens) and runs the view as
+    the token's user, available as `request.user` and the token as `request.api_token`.
+    Anything else gets a 401 JSON response. Place it above @user_has_permission.
+    """
+    @wraps(view_func)
+    def _wrapped_view(request, *args, **kwargs):
+        token = authenticate_api_token(request)
+        if token is None:
+            response = JsonResponse({'error': 'A valid API token is required.'}, status=401)
+            response['WWW-Authenticate'] = 'Bearer'
+            return response
+        request.user = token.user
+        request.api_token = token
+        return view_func(request, *args, **kwargs)
+    return _wrapped_view
@@ -0,0 +1,213 @@
+# core/exports.py (NEW FILE)
+"""
+Helpers for exporting a form's submissions without loading them all at once.
+
+Submissions are read through the submission matrix loader in keyset-paginated
+chunks (ordered by id), one query per chunk, so memory use depends on the chunk
+size and not on the number of submissions.
+"""
+import csv
+import logging
+import tempfile
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files import File
+from django.db import transaction
+from django.db.models import Count, Max
+from django.utils import timezone
+
+from .matrix import iter_submission_matrix
+from .models import ExportJob, Form
+from .schema import get_form_schema
+from .utils import generate_excel_file, generate_pdf_from_rows
+
+logger = logging.getLogger(__name__)
+
+# How many submissions are read from the database per round trip.
+EXPORT_CHUNK_SIZE = 2000
+
+
+def export_headers(form):
+    """The column order used by every export: the form's fields, then the submission time."""
+    return list(get_form_schema(form).export_headers)
+
+
+def iter_submission_rows(form, chunk_size=EXPORT_CHUNK_SIZE, max_id=None):
+    """
+    Yields one list per submission, in the same order as `export_headers(form)`.
+    Costs one query per `chunk_size` submissions. If `max_id` is given, submissions
+    created after it are left out so the export reflects a fixed point in time.
+    """
+    for submitted_at, *values in iter_submission_matrix(
+        form, extra_fields=('submitted_at',), chunk_size=chunk_size, max_id=max_id
+    ):
+        yield ['' if value is None else value for value in values] + [submitted_at]
+
+
+class Echo:
+    """A file-like object that just returns what is written, for use with csv.writer."""
+
+    def write(self, value):
+        return value
+
+
+def iter_csv_lines(form, chunk_size=EXPORT_CHUNK_SIZE, rows=None):
+    """Yields the CSV export of `form` one encoded line at a time, header first."""
+    if rows is None:
+        rows = iter_submission_rows(form, chunk_size=chunk_size)
+    writer = csv.writer(Echo())
+    yield writer.writerow(export_headers(form))
+    for row in rows:
+        yield writer.writerow(row)
+
+
+def build_xlsx_export(form, chunk_size=EXPORT_CHUNK_SIZE, rows=None):
+    """
+    Streams the submissions of `form` into an Excel workbook backed by an anonymous
+    temporary file. Returns the open file, rewound and ready to be served; it is
+    deleted from disk as soon as it is closed.
+    """
+    if rows is None:
+        rows = iter_submission_rows(form, chunk_size=chunk_size)
+    export_file = tempfile.TemporaryFile(suffix='.xlsx')
+    try:
+        generate_excel_file(export_headers(form), rows, export_file)
+    except Exception:
+        export_file.close()
+        raise
+    export_file.seek(0)
+    return export_file
+
+
+def build_pdf_export(form, rows=None):
+    """Renders the submissions of `form` as PDF bytes. The PDF leaves out the submission time."""
+    if rows is None:
+        rows = iter_submission_rows(form)
+    headers = export_headers(form)[:-1]
+    return generate_pdf_from_rows(headers, (row[:-1] for row in rows), title=form.form_name)
+
+
+# --- Background export jobs ---
+
+# How often (in rows) a running job writes its progress back to the database.
+PROGRESS_UPDATE_EVERY = 5000
+
+EXPORT_FILE_EXTENSIONS = {'csv': 'csv', 'xlsx': 'xlsx', 'pdf': 'pdf'}
+
+
+def current_data_marker(form):
+    """
+    Returns (last_submission_id, submission_count, data_version) for `form` in a
+    single query. `data_version` catches edits, which change neither of the others.
+    """
+    return Form.objects.filter(pk=form.pk).annotate(
+        last_id=Max('submissions__id'), count=Count('submissions__id')
+    ).values_list('last_id', 'count', 'data_version').get()
+
+
+def enqueue_export(form, export_format, requested_by=None):
+    """
+    Returns an ExportJob for `form` in `export_format`.
+
+    A finished job is reused if no submission has been added, edited or removed
+    since its file was built, and a job that is still queued or running is returned instead
+    of queueing a duplicate. Otherwise a new pending job is created.
+    """
+    fail_stale_export_jobs()
+    last_id, count, data_version = current_data_marker(form)
+    jobs = ExportJob.objects.filter(form=form, export_format=export_format)
+
+    finished = jobs.filter(
+        status='done', last_submission_id=last_id, submission_count=count, data_version=data_version
+    ).exclude(file='').first()
+    if finished and finished.file.storage.exists(finished.file.name):
+        return finished
+
+    in_progress = jobs.filter(status__in=['pending', 'running']).first()
+    if in_progress:
+        return in_progress
+
+    return ExportJob.objects.create(form=form, export_format=export_format, requested_by=requested_by)
+
+
+def fail_stale_export_jobs():
+    """
+    Marks jobs that have been running for longer than EXPORT_JOB_TIMEOUT seconds as
+    failed: their worker has died, and while they look in progress `enqueue_export`
+    would keep handing them out. Returns the number of jobs marked.
+    """
+    now = timezone.now()
+    cutoff = now - timedelta(seconds=getattr(settings, 'EXPORT_JOB_TIMEOUT', 3600))
+    return ExportJob.objects.filter(status='running', started_at__lt=cutoff).update(
+        status='failed', error='The export worker stopped before finishing this job.', finished_at=now,
+    )
+
+
+def claim_next_export_job():
+    """
+    Atomically marks the oldest pending job as running and returns it, or None if
+    the queue is empty. SKIP LOCKED lets several workers share one queue.
+    """
+    fail_stale_export_jobs()
+    with transaction.atomic():
+        job = (
+            ExportJob.objects.select_for_update(skip_locked=True)
+            .filter(status='pending')
+            .order_by('created_at')
+            .first()
+        )
+        if job is None:
+            return None
+        job.status = 'running'
+        job.started_at = timezone.now()
+        job.save(update_fields=['status', 'started_at'])
+    return job
+
+
+def _track_progress(job, rows):
+    """Passes `rows` through, saving `job.rows_done` every PROGRESS_UPDATE_EVERY rows."""
+    for rows_done, row in enumerate(rows, start=1):
+        job.rows_done = rows_done
+        if rows_done % PROGRESS_UPDATE_EVERY == 0:
+            ExportJob.objects.filter(pk=job.pk).update(rows_done=job.rows_done)
+        yield row
+
+
+def run_export_job(job):
+    """Builds the file for a claimed job and stores it on the job."""
+    form = job.form
+    try:
+        last_id, count, data_version = current_data_marker(form)
+        job.last_submission_id = last_id
+        job.submission_count = count
+        job.data_version = data_version
+        job.rows_total = count
+        job.save(update_fields=['last_submission_id', 'submission_count', 'data_version', 'rows_total'])
+
+        rows = _track_progress(job, iter_submission_rows(form, max_id=last_id or 0))
+        file_name = f"{form.form_name}_{job.pk}.{EXPORT_FILE_EXTENSIONS[job.export_format]}"
+
+        if job.export_format == 'csv':
+            with tempfile.TemporaryFile() as export_file:
+                for line in iter_csv_lines(form, rows=rows):
+                    export_file.write(line.encode('utf-8'))
+                export_file.seek(0)
+                job.file.save(file_name, File(export_file, name=file_name), save=False)
+        elif job.export_format == 'xlsx':
+            with build_xlsx_export(form, rows=rows) as export_file:
+                job.file.save(file_name, File(export_file, name=file_name), save=False)
+        else:
+            with tempfile.TemporaryFile() as export_file:
+                export_file.write(build_pdf_export(form, rows=rows))
+                export_file.seek(0)
+                job.file.save(file_name, File(export_file, name=file_name), save=False)
+
+        job.status = 'done'
+    except Exception as e:
+        logger.exception(f"Export job {job.pk} failed")
+        job.status = 'failed'
+        job.error = str(e)
+    job.finished_at = timezone.now()
+    job.save()
+    return job
@@ -0,0 +1,193 @@
+# core/fake_llm.py (NEW FILE)
+"""
+A stand-in for the Ollama HTTP API, for measuring and testing the AI endpoints
+without a real model.
+
+It answers `POST /api/generate` (streaming and non-streaming), `GET /api/tags` and
+`GET /api/version` like Ollama does. The answer is always a fixed, valid JSON list
+of form fields. How long it takes and how often it fails are configurable:
+
+- latency: seconds before the first token (plus up to `jitter` seconds at random)
+- tokens_per_second: how fast the answer is then written, ~4 characters per token
+- error_rate: fraction of requests answered with HTTP 500
+- malformed_rate: fraction of requests whose answer is not valid JSON
+- hang_rate: fraction of requests that never answer (until the server stops)
+
+Start it with `python manage.py run_fake_llm` and point OLLAMA_HOST at it, or let
+`python manage.py benchmark_ai_endpoint --fake-llm` start one in-process.
+"""
+import json
+import random
+import threading
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+FAKE_FIELDS = [
+    {'name': 'Full Name', 'type': 'VARCHAR(255)'},
+    {'name': 'Email Address', 'type': 'EMAIL'},
+    {'name': 'Date of Birth', 'type': 'DATE'},
+    {'name': 'Role', 'type': 'SELECT', 'options': ['Student', 'Teacher', 'Staff']},
+    {'name': 'Comments', 'type': 'TEXT'},
+]
+FAKE_RESPONSE = json.dumps(FAKE_FIELDS)
+MALFORMED_RESPONSE = 'Sure! Here are the fields you asked for: [{"name": "Full Name", "type": '
+CHARS_PER_TOKEN = 4
+
+
+@dataclass
+class FakeLLMBehaviour:
+    latency: float = 0.5
+    jitter: float = 0.0
+    tokens_per_second: float = 50.0
+    error_rate: float = 0.0
+    malformed_rate: float = 0.0
+    hang_rate: float = 0.0
+    seed: int = None
+
+
+def _split_tokens(text):
+    return [text[i:i + CHARS_PER_TOKEN] for i in range(0, len(text), CHARS_PER_TOKEN)]
+
+
+class _FakeOllamaHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+    def do_GET(self):
+        if self.path == '/api/version':
+            self._send_json(200, {'version': '0.0.0-fake'})
+        elif self.path == '/api/tags':
+            self._send_json(200, {'models': [{'name': self.server.model_name, 'model': self.server.model_name}]})
+        else:
+            self._send_json(404, {'error': 'not found'})
+
+    def do_POST(self):
+        if self.path != '/api/generate':
+            self._send_json(404, {'error': 'not found'})
+            return
+        try:
+            body = json.loads(self.rfile.read(int(self.headers.get('Content-Length') or 0)) or b'{}')
+        except json.JSONDecodeError:
+            self._send_json(400, {'error': 'invalid JSON body'})
+            return
+
+        outcome, delay = self.server.plan_request()
+        if outcome == 'hang':
+            # Only returns once the server is shutting down.
+            self.server.stopping.wait()
+            return
+        if self.server.stopping.wait(delay):
+            return
+        if outcome == 'error':
+            self._send_json(500, {'error': 'fake model failure'})
+            return
+
+        text = MALFORMED_RESPONSE if outcome == 'malformed' else FAKE_RESPONSE
+        model = body.get('model') or self.server.model_name
+        if body.get('stream', True):
+            self._stream(model, text)
+        else:
+            if self.server.stopping.wait(len(_split_tokens(text)) * self.server.seconds_per_token):
+                return
+            self._send_json(200, self._chunk(model, text, done=True))
+
+    def _chunk(self, model, text, done):
+        chunk = {
+            'model': model,
+            'created_at': datetime.now(timezone.utc).isoformat(),
+            'response': text,
+            'done': done,
+        }
+        if done:
+            chunk['done_reason'] = 'stop'
+        return chunk
+
+    def _stream(self, model, text):
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/x-ndjson')
+        self.send_header('Transfer-Encoding', 'chunked')
+        self.end_headers()
+        try:
+            for token in _split_tokens(text):
+                if self.server.stopping.wait(self.server.seconds_per_token):
+                    return
+                self._write_chunk(json.dumps(self._chunk(model, token, done=False)) + '\n')
+            self._write_chunk(json.dumps(self._chunk(model, '', done=True)) + '\n')
+            self.wfile.write(b'0\r\n\r\n')
+        except (BrokenPipeError, ConnectionResetError):
+            # The client gave up (e.g. its timeout expired); nothing left to do.
+            pass
+
+    def _write_chunk(self, data):
+        encoded = data.encode()
+        self.wfile.write(f'{len(encoded):x}\r\n'.encode() + encoded + b'\r\n')
+        self.wfile.flush()
+
+    def _send_json(self, status, payload):
+        encoded = json.dumps(payload).encode()
+        try:
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(encoded)))
+            self.end_headers()
+            self.wfile.write(encoded)
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+
+class FakeOllamaServer(ThreadingHTTPServer):
+    """An HTTP server speaking enough of the Ollama API for generate_fields_with_llama."""
+    daemon_threads = True
+
+    def __init__(self, host='127.0.0.1', port=11434, behaviour=None, model_name='fake-llm', verbose=False):
+        super().__init__((host, port), _FakeOllamaHandler)
+        self.behaviour = behaviour or FakeLLMBehaviour()
+        self.model_name = model_name
+        self.verbose = verbose
+        self.stopping = threading.Event()
+        self._random = random.Random(self.behaviour.seed)
+        self._random_lock = threading.Lock()
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f'http://{host}:{port}'
+
+    @property
+    def seconds_per_token(self):
+        rate = self.behaviour.tokens_per_second
+        return 1 / rate if rate > 0 else 0
+
+    def plan_request(self):
+        """Picks the outcome of one request and its delay before the first token."""
+        behaviour = self.behaviour
+        with self._random_lock:
+            roll = self._random.random()
+            delay = behaviour.latency + self._random.uniform(0, behaviour.jitter)
+        if roll < behaviour.hang_rate:
+            return 'hang', None
+        roll -= behaviour.hang_rate
+        if roll < behaviour.error_rate:
+            return 'error', delay
+        roll -= behaviour.error_rate
+        if roll < behaviour.malformed_rate:
+            return 'malformed', delay
+        return 'ok', delay
+
+    def start(self):
+        """Serves from a background thread; returns self so it can be used inline."""
+        self._thread = threading.Thread(target=self.serve_forever, name='fake-llm', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.stopping.set()
+        if self._thread is not None:
+            self.shutdown()
+            self._thread.join()
+        self.server_close()
@@ -69,11 +69,11 @@ class ChildRelationshipForm(forms.ModelForm):
                 self.fields['source_submission'].queryset = FormSubmission.objects.filter(
                     parent_submission=parent_instance,
                     form=self.instance.source_submission.form
-                )
+                ).with_labels()
 
             if self.instance.target_submission_id:
                 self.fields['target_form_type'].initial = self.instance.target_submission.form
                 self.fields['target_submission'].queryset = FormSubmission.objects.filter(
                     parent_submission=parent_instance,
                     form=self.instance.target_submission.form
-                )
+                ).with_labels()
@@ -0,0 +1,436 @@
+# core/imports.py (NEW FILE)
+"""
+Bulk import of submissions from CSV or Excel files.
+
+An upload becomes an ImportJob waiting for its column mapping ({column: field
+name}). Once the mapping is set, the `run_import_worker` command claims the job
+and streams through the file:
+
+- each row is validated with the same per-field rules as the web forms
+  (core.submissions); invalid rows are skipped and reported with their row
+  number, column and message;
+- valid rows are written IMPORT_BATCH_SIZE at a time, each batch in its own
+  transaction. On PostgreSQL, FormSubmission and SubmissionData rows are loaded
+  with COPY, using ids reserved from the submission sequence up front. Other
+  databases fall back to bulk_create.
+- every batch also bumps the form's submission counter and analytics aggregates,
+  like any other write (see `record_written_submissions`).
+- once the job is done or has failed, the uploaded file is deleted; the skipped
+  rows stay on the job as its error report.
+
+Besides form fields, a column can be mapped to 'submitted_at' (ISO date/time,
+kept as the submission time) or, for child forms, 'parent_submission_id'.
+Multi-value fields accept a JSON list or values separated by ';'.
+"""
+import csv
+import io
+import json
+import logging
+from datetime import date, datetime, time, timedelta
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .models import FormSubmission, ImportJob, SubmissionData, representative_value
+from .schema import get_form_schema
+from .submissions import record_written_submissions, validate_field_value
+
+logger = logging.getLogger(__name__)
+
+# Rows written per transaction (and per progress update).
+IMPORT_BATCH_SIZE = 5000
+# Row errors kept on the job; the counts are always complete.
+MAX_REPORTED_ERRORS = 1000
+# Mapping targets that are not form fields.
+SUBMITTED_AT_TARGET = 'submitted_at'
+PARENT_TARGET = 'parent_submission_id'
+IMPORT_FILE_FORMATS = {'.csv': 'csv', '.xlsx': 'xlsx'}
+
+
+def detect_file_format(file_name):
+    """'csv' or 'xlsx' from the file extension, or None if it is not supported."""
+    for extension, file_format in IMPORT_FILE_FORMATS.items():
+        if file_name.lower().endswith(extension):
+            return file_format
+    return None
+
+
+def _cell_text(value):
+    """Turns an Excel cell value into the text a web form would have posted."""
+    if value is None:
+        return ''
+    if isinstance(value, datetime):
+        return value.date().isoformat() if value.time() == time() else value.isoformat()
+    if isinstance(value, (date, time)):
+        return value.isoformat()
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value)
+
+
+def iter_file_rows(file, file_format):
+    """Yields every row of the file (the header row first) as a list of strings."""
+    if file_format == 'csv':
+        text = io.TextIOWrapper(file, encoding='utf-8-sig', newline='')
+        try:
+            yield from csv.reader(text)
+        finally:
+            text.detach()
+        return
+
+    from openpyxl import load_workbook
+    workbook = load_workbook(file, read_only=True, data_only=True)
+    try:
+        for row in workbook.active.iter_rows(values_only=True):
+            yield [_cell_text(value) for value in row]
+    finally:
+        workbook.close()
+
+
+def read_columns(job):
+    """The header row of the job's file, with surrounding whitespace removed."""
+    with job.file.open('rb') as file:
+        header = next(iter_file_rows(file, job.file_format), [])
+    return [str(column).strip() for column in header]
+
+
+def mapping_targets(form):
+    """The names a column can be mapped to: the form's fields, then the special targets."""
+    targets = [field.name for field in get_form_schema(form).fields if not field.is_file]
+    targets.append(SUBMITTED_AT_TARGET)
+    if form.parent_form_id:
+        targets.append(PARENT_TARGET)
+    return targets
+
+
+def suggest_mapping(columns, form):
+    """Maps every column whose name matches a target (ignoring case) to that target."""
+    targets = {target.lower(): target for target in mapping_targets(form)}
+    mapping = {}
+    for column in columns:
+        target = targets.get(column.lower())
+        if target and target not in mapping.values():
+            mapping[column] = target
+    return mapping
+
+
+def validate_mapping(mapping, columns, form):
+    """Raises ValidationError unless `mapping` maps existing columns to distinct targets."""
+    if not isinstance(mapping, dict) or not mapping:
+        raise ValidationError("Map at least one column to a field.")
+    targets = set(mapping_targets(form))
+    errors = []
+    for column, target in mapping.items():
+        if column not in columns:
+            errors.append(f"'{column}' is not a column of the file.")
+        if target not in targets:
+            errors.append(f"'{target}' is not a field of this form.")
+    if len(set(mapping.values())) != len(mapping):
+        errors.append("Each field can only be mapped from one column.")
+    if errors:
+        raise ValidationError(errors)
+
+
+class RowCleaner:
+    """Validates file rows against the form, using a mapping compiled once per job."""
+
+    def __init__(self, form, columns, mapping):
+        schema = get_form_schema(form)
+        index = {column: position for position, column in enumerate(columns)}
+        self.fields = [
+            (index[column], column, schema.by_name[target])
+            for column, target in mapping.items() if target in schema.by_name
+        ]
+        reverse_mapping = {target: column for column, target in mapping.items()}
+        self.submitted_at = self._special(reverse_mapping, index, SUBMITTED_AT_TARGET)
+        self.parent = self._special(reverse_mapping, index, PARENT_TARGET)
+
+    @staticmethod
+    def _special(reverse_mapping, index, target):
+        column = reverse_mapping.get(target)
+        return (index[column], column) if column is not None else None
+
+    @staticmethod
+    def _value(row, position):
+        return row[position].strip() if position < len(row) and row[position] else ''
+
+    def clean(self, row):
+        """Returns (values, parent_id, submitted_at, errors) for one row; errors is a list of (column, message)."""
+        values, errors = {}, []
+        for position, column, field in self.fields:
+            value = self._value(row, position)
+            if value and field.is_multi_value and not value.startswith('['):
+                value = json.dumps([part.strip() for part in value.split(';') if part.strip()])
+            message = validate_field_value(field, value)
+            if message:
+                errors.append((column, message))
+            values[field.name] = value
+
+        submitted_at = None
+        if self.submitted_at:
+            position, column = self.submitted_at
+            value = self._value(row, position)
+            if value:
+                try:
+                    submitted_at = datetime.fromisoformat(value)
+                    if timezone.is_naive(submitted_at):
+                        submitted_at = timezone.make_aware(submitted_at)
+                except ValueError:
+                    errors.append((column, "Enter a valid date and time."))
+
+        parent_id = None
+        if self.parent:
+            position, column = self.parent
+            value = self._value(row, position)
+            if value:
+                try:
+                    parent_id = int(value)
+                except ValueError:
+                    errors.append((column, "Invalid parent record."))
+        return values, parent_id, submitted_at, errors
+
+
+def _copy_rows(cursor, table, columns, rows, nullable=()):
+    """
+    Loads `rows` into `table` with COPY in CSV format. Every value is quoted, so
+    empty strings stay empty strings; None is only read back as NULL for the
+    `nullable` columns.
+    """
+    buffer = io.StringIO()
+    csv.writer(buffer, quoting=csv.QUOTE_ALL).writerows(rows)
+    buffer.seek(0)
+    options = 'FORMAT csv' + (f", FORCE_NULL ({', '.join(nullable)})" if nullable else '')
+    sql = f"COPY {table} ({', '.join(columns)}) FROM STDIN WITH ({options})"
+    raw_cursor = cursor.cursor
+    if hasattr(raw_cursor, 'copy_expert'):  # psycopg2
+        raw_cursor.copy_expert(sql, buffer)
+    else:  # psycopg 3
+        with raw_cursor.copy(sql) as copy:
+            copy.write(buffer.getvalue())
+
+
+def _copy_batch(form, rows, submitted_by_id, now):
+    submission_table = FormSubmission._meta.db_table
+    with connection.cursor() as cursor:
+        # A crash can lose the last few committed batches, but never corrupts them;
+        # the job is then left 'running' and its counts show how far it got.
+        cursor.execute("SET LOCAL synchronous_commit TO OFF")
+        cursor.execute(
+            "SELECT nextval(pg_get_serial_sequence(%s, 'id')) FROM generate_series(1, %s)",
+            [submission_table, len(rows)],
+        )
+        ids = [row[0] for row in cursor.fetchall()]
+        _copy_rows(
+            cursor, submission_table,
+            ['id', 'form_id', 'submitted_at', 'submitted_by_id', 'parent_submission_id', 'snapshot', 'display_label'],
+            (
+                (submission_id, form.pk, (submitted_at or now).isoformat(), submitted_by_id, parent_id,
+                 json.dumps(values), representative_value(values))
+                for submission_id, (values, parent_id, submitted_at) in zip(ids, rows)
+            ),
+            nullable=['submitted_by_id', 'parent_submission_id'],
+        )
+        _copy_rows(
+            cursor, SubmissionData._meta.db_table, ['submission_id', 'field_name', 'field_value'],
+            (
+                (submission_id, field_name, field_value)
+                for submission_id, (values, _, _) in zip(ids, rows)
+                for field_name, field_value in values.items()
+            ),
+        )
+
+
+def _bulk_create_batch(form, rows, submitted_by_id, now):
+    submissions = FormSubmission.objects.bulk_create([
+        FormSubmission(form=form, submitted_by_id=submitted_by_id, parent_submission_id=parent_id,
+                       snapshot=values, display_label=representative_value(values))
+        for values, parent_id, _ in rows
+    ])
+    SubmissionData.objects.bulk_create([
+        SubmissionData(submission=submission, field_name=field_name, field_value=field_value)
+        for submission, (values, _, _) in zip(submissions, rows)
+        for field_name, field_value in values.items()
+    ])
+    # submitted_at is auto_now_add, so imported timestamps are set afterwards.
+    dated = []
+    for submission, (_, _, submitted_at) in zip(submissions, rows):
+        if submitted_at:
+            submission.submitted_at = submitted_at
+            dated.append(submission)
+    FormSubmission.objects.bulk_update(dated, ['submitted_at'])
+
+
+def load_batch(form, rows, submitted_by_id=None):
+    """Writes validated (values, parent_id, submitted_at) rows in one transaction."""
+    now = timezone.now()
+    with transaction.atomic():
+        if connection.vendor == 'postgresql':
+            _copy_batch(form, rows, submitted_by_id, now)
+        else:
+            _bulk_create_batch(form, rows, submitted_by_id, now)
+        record_written_submissions(form, [values for values, _, _ in rows])
+
+
+def _estimate_rows(job):
+    """Data rows in the file, for progress reporting (a CSV newline count may overestimate)."""
+    with job.file.open('rb') as file:
+        if job.file_format == 'csv':
+            return max(0, sum(chunk.count(b'\n') for chunk in iter(lambda: file.read(1 << 20), b'')) - 1)
+        from openpyxl import load_workbook
+        workbook = load_workbook(file, read_only=True)
+        try:
+            return max(0, (workbook.active.max_row or 1) - 1)
+        finally:
+            workbook.close()
+
+
+class _ImportRun:
+    """The state of one job while its file is being read."""
+
+    def __init__(self, job):
+        self.job = job
+        self.form = job.form
+        self.cleaner = RowCleaner(self.form, job.columns, job.column_mapping)
+        self.batch = []
+        self.batch_row_numbers = []
+
+    def fail_row(self, row_number, errors):
+        """Counts a rejected row and reports its (column, message) errors, up to MAX_REPORTED_ERRORS."""
+        self.job.rows_failed += 1
+        for column, message in errors:
+            if len(self.job.row_errors) < MAX_REPORTED_ERRORS:
+                self.job.row_errors.append({'row': row_number, 'column': column, 'message': message})
+
+    def add(self, row_number, row):
+        values, parent_id, submitted_at, errors = self.cleaner.clean(row)
+        if errors:
+            self.fail_row(row_number, errors)
+        else:
+            self.batch.append((values, parent_id, submitted_at))
+            self.batch_row_numbers.append(row_number)
+        if len(self.batch) >= IMPORT_BATCH_SIZE:
+            self.flush()
+
+    def _drop_unknown_parents(self):
+        """Reports and removes rows whose parent record is not a submission of the parent form."""
+        parent_ids = {parent_id for _, parent_id, _ in self.batch if parent_id}
+        if not parent_ids:
+            return
+        found = set(FormSubmission.objects.filter(
+            pk__in=parent_ids, form_id=self.form.parent_form_id
+        ).values_list('id', flat=True))
+        column = self.cleaner.parent[1]
+        kept, kept_numbers = [], []
+        for row, row_number in zip(self.batch, self.batch_row_numbers):
+            if row[1] and row[1] not in found:
+                self.fail_row(row_number, [(column, "The selected parent record does not exist.")])
+            else:
+                kept.append(row)
+                kept_numbers.append(row_number)
+        self.batch, self.batch_row_numbers = kept, kept_numbers
+
+    def flush(self):
+        self._drop_unknown_parents()
+        if self.batch:
+            load_batch(self.form, self.batch, self.job.requested_by_id)
+            self.job.rows_imported += len(self.batch)
+        self.batch, self.batch_row_numbers = [], []
+        ImportJob.objects.filter(pk=self.job.pk).update(
+            rows_done=self.job.rows_done, rows_imported=self.job.rows_imported, rows_failed=self.job.rows_failed,
+        )
+
+
+def _delete_job_file(job):
+    """Removes the uploaded file of a finished job; its row errors are kept on the job."""
+    if job.file:
+        job.file.delete(save=False)
+
+
+def run_import_job(job):
+    """Imports the file of a claimed job into its form."""
+    try:
+        job.rows_total = _estimate_rows(job)
+        job.save(update_fields=['rows_total'])
+        run = _ImportRun(job)
+        with job.file.open('rb') as file:
+            rows = iter_file_rows(file, job.file_format)
+            next(rows, None)  # the header
+            # Row numbers as a spreadsheet shows them: the header is row 1.
+            for row_number, row in enumerate(rows, start=2):
+                if not any(cell.strip() for cell in row if cell):
+                    continue
+                job.rows_done += 1
+                run.add(row_number, row)
+            run.flush()
+        job.rows_total = job.rows_done
+        # Parent records are checked per batch, after the other errors of their rows.
+        job.row_errors.sort(key=lambda error: error['row'])
+        job.status = 'done'
+    except Exception as e:
+        logger.exception(f"Import job {job.pk} failed")
+        job.status = 'failed'
+        job.error = f"{e} ({job.rows_imported} rows had already been imported.)"
+    _delete_job_file(job)
+    job.finished_at = timezone.now()
+    job.save()
+    return job
+
+
+def fail_stale_import_jobs():
+    """
+    Marks jobs that have been running for longer than IMPORT_JOB_TIMEOUT seconds as
+    failed (their worker has died) and deletes their files, along with uploads whose
+    mapping was never confirmed within that time. Failed jobs are not retried: the
+    batches they committed are already in the form. Returns the number of jobs marked.
+    """
+    now = timezone.now()
+    cutoff = now - timedelta(seconds=getattr(settings, 'IMPORT_JOB_TIMEOUT', 3600))
+    stale = ImportJob.objects.filter(status='running', started_at__lt=cutoff) | ImportJob.objects.filter(
+        status='uploaded', created_at__lt=cutoff
+    )
+    marked = 0
+    for job in stale:
+        if job.status == 'running':
+            job.error = (f"The import worker stopped before finishing this job "
+                         f"({job.rows_imported} rows had already been imported.)")
+        else:
+            job.error = "The column mapping was never confirmed."
+        job.status = 'failed'
+        job.finished_at = now
+        _delete_job_file(job)
+        job.save(update_fields=['status', 'error', 'finished_at', 'file'])
+        marked += 1
+    return marked
+
+
+def claim_next_import_job():
+    """
+    Atomically marks the oldest pending job as running and returns it, or None if
+    the queue is empty. SKIP LOCKED lets several workers share one queue.
+    """
+    fail_stale_import_jobs()
+    with transaction.atomic():
+        job = (
+            ImportJob.objects.select_for_update(skip_locked=True)
+            .filter(status='pending')
+            .order_by('created_at')
+            .first()
+        )
+        if job is None:
+            return None
+        job.status = 'running'
+        job.started_at = timezone.now()
+        job.save(update_fields=['status', 'started_at'])
+    return job
+
+
+def iter_error_report_lines(job):
+    """Yields the job's row errors as CSV lines, header first."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(['row', 'column', 'message'])
+    for error in job.row_errors:
+        writer.writerow([error['row'], error['column'], error['message']])
+    yield buffer.getvalue()
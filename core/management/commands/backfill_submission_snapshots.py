@@ -0,0 +1,80 @@
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.db.models import F, Max, Min
+
+from core.models import Form, FormSubmission, SubmissionData, representative_value
+
+
+class Command(BaseCommand):
+    help = (
+        "Fills FormSubmission.snapshot from the SubmissionData rows of each submission, "
+        "and recomputes the display_label shown for each submission from it. "
+        "Works through the table in id ranges so each transaction stays small. Forms whose "
+        "snapshots changed are flagged for `rebuild_form_analytics`."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=5000,
+                            help='Number of submission ids covered by each UPDATE.')
+        parser.add_argument('--all', action='store_true',
+                            help='Rebuild every snapshot, not only the empty ones.')
+        parser.add_argument('--form', type=int, help='Only backfill submissions of this form id.')
+
+    def handle(self, *args, **options):
+        submissions = FormSubmission.objects.all()
+        if options['form']:
+            submissions = submissions.filter(form_id=options['form'])
+        bounds = submissions.aggregate(low=Min('id'), high=Max('id'))
+        if bounds['low'] is None:
+            self.stdout.write('No submissions to backfill.')
+            return
+
+        # Only rows whose snapshot actually changes are written, and their form ids
+        # are returned: the snapshots feed the analytics aggregates, so those forms
+        # are flagged for `rebuild_form_analytics`.
+        sql = f"""
+            UPDATE {FormSubmission._meta.db_table} AS s
+            SET snapshot = fresh.snapshot
+            FROM (
+                SELECT inner_s.id, COALESCE((
+                    SELECT jsonb_object_agg(d.field_name, d.field_value)
+                    FROM {SubmissionData._meta.db_table} AS d
+                    WHERE d.submission_id = inner_s.id
+                ), '{{}}'::jsonb) AS snapshot
+                FROM {FormSubmission._meta.db_table} AS inner_s
+                WHERE inner_s.id BETWEEN %s AND %s
+            ) AS fresh
+            WHERE s.id = fresh.id AND s.snapshot IS DISTINCT FROM fresh.snapshot
+        """
+        params_suffix = []
+        if not options['all']:
+            sql += " AND s.snapshot = '{}'::jsonb"
+        if options['form']:
+            sql += " AND s.form_id = %s"
+            params_suffix.append(options['form'])
+        sql += " RETURNING s.form_id"
+
+        chunk_size = options['chunk_size']
+        updated = 0
+        for start in range(bounds['low'], bounds['high'] + 1, chunk_size):
+            end = start + chunk_size - 1
+            with transaction.atomic():
+                with connection.cursor() as cursor:
+                    cursor.execute(sql, [start, end, *params_suffix])
+                    form_ids = {form_id for (form_id,) in cursor.fetchall()}
+                    updated += cursor.rowcount
+                Form.objects.filter(id__in=form_ids).update(analytics_ready=False, data_version=F('data_version') + 1)
+                self._refresh_labels(submissions.filter(id__range=(start, end)))
+            self.stdout.write(f"  ...up to id {min(end, bounds['high'])}: {updated} updated")
+
+        self.stdout.write(self.style.SUCCESS(f'Backfilled {updated} submission snapshot(s).'))
+
+    def _refresh_labels(self, submissions):
+        """Recomputes display_label from the (now filled) snapshots of one id range."""
+        changed = []
+        for submission in submissions.only('id', 'snapshot', 'display_label'):
+            label = representative_value(submission.snapshot)
+            if label != submission.display_label:
+                submission.display_label = label
+                changed.append(submission)
+        FormSubmission.objects.bulk_update(changed, ['display_label'])
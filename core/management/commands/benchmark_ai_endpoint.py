@@ -0,0 +1,164 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.test import AsyncClient
+from django.test.utils import override_settings
+from django.urls import reverse
+from collections import Counter
+import asyncio
+import json
+import logging
+import math
+import time
+import uuid
+
+from core.ai_cache import normalize_description
+from core.fake_llm import FakeOllamaServer
+from core.models import AIGenerationCacheEntry, CustomUser
+from core.management.commands.run_fake_llm import add_behaviour_arguments, behaviour_from_options
+
+
+def percentile(sorted_values, fraction):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return None
+    rank = max(1, math.ceil(fraction * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+class Command(BaseCommand):
+    help = (
+        "Sends many requests at once to the AI field generation endpoint (in-process, "
+        "through the ASGI stack) and reports latency percentiles, throughput and error "
+        "rates. Use --fake-llm to measure against the built-in fake Ollama server."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=50, help='Total number of requests to send.')
+        parser.add_argument('--concurrency', type=int, default=4, help='Requests in flight at once.')
+        parser.add_argument('--endpoint', choices=['json', 'stream'], default='json',
+                            help='The plain JSON endpoint or its Server-Sent Events variant.')
+        parser.add_argument('--description', default='Registration form for a school science fair',
+                            help='Form description to send.')
+        parser.add_argument('--cached', action='store_true',
+                            help='Send the same description every time, so the AI cache answers '
+                                 'after the first call. By default every request is unique.')
+        parser.add_argument('--user', help='Username to send the requests as (default: the first global admin).')
+        parser.add_argument('--keep-cache-entries', action='store_true',
+                            help="Keep the AI cache entries this run created instead of deleting them.")
+        parser.add_argument('--fake-llm', action='store_true',
+                            help='Start a fake Ollama server for the run and point OLLAMA_HOST at it.')
+        add_behaviour_arguments(parser)
+
+    def handle(self, *args, **options):
+        if options['requests'] < 1 or options['concurrency'] < 1:
+            raise CommandError('--requests and --concurrency must be at least 1.')
+        user = self._get_user(options['user'])
+
+        if not options['fake_llm']:
+            self.stdout.write(f'Sending requests to the model at {settings.OLLAMA_HOST}.')
+            return self._run(user, options)
+
+        server = FakeOllamaServer('127.0.0.1', 0, behaviour_from_options(options)).start()
+        self.stdout.write(f'Started a fake Ollama server on {server.url}.')
+        try:
+            with override_settings(OLLAMA_HOST=server.url):
+                return self._run(user, options)
+        finally:
+            server.stop()
+
+    def _get_user(self, username):
+        users = CustomUser.objects.all()
+        user = users.filter(username=username).first() if username else \
+            users.filter(role='admin').order_by('pk').first()
+        if user is None:
+            raise CommandError('No such user.' if username else 'No admin user found; pass --user.')
+        return user
+
+    def _run(self, user, options):
+        run_tag = uuid.uuid4().hex[:8]
+        started = time.perf_counter()
+        if options['verbosity'] < 2:
+            # Failed requests are expected here and counted below; don't log each one.
+            logging.disable(logging.CRITICAL)
+        try:
+            # The test client sends requests for the host name 'testserver'.
+            with override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver']):
+                results = asyncio.run(self._drive(user, run_tag, options))
+        finally:
+            logging.disable(logging.NOTSET)
+        wall_time = time.perf_counter() - started
+
+        if not options['keep_cache_entries']:
+            prefix = normalize_description(f"{options['description']} {run_tag}")
+            AIGenerationCacheEntry.objects.filter(normalized_description__startswith=prefix).delete()
+        self._report(results, wall_time, options)
+
+    async def _drive(self, user, run_tag, options):
+        client = AsyncClient(raise_request_exception=False)
+        await client.aforce_login(user)
+        url = reverse('api_generate_fields_stream' if options['endpoint'] == 'stream' else 'api_generate_fields')
+
+        queue = asyncio.Queue()
+        for number in range(options['requests']):
+            suffix = run_tag if options['cached'] else f'{run_tag} {number}'
+            queue.put_nowait(f"{options['description']} {suffix}")
+        results = []
+
+        async def worker():
+            while not queue.empty():
+                description = queue.get_nowait()
+                results.append(await self._send(client, url, description, options['endpoint']))
+
+        await asyncio.gather(*(worker() for _ in range(options['concurrency'])))
+        return results
+
+    async def _send(self, client, url, description, endpoint):
+        """Sends one request; returns (outcome, seconds, seconds to first field)."""
+        started = time.perf_counter()
+        response = await client.post(url, json.dumps({'description': description}),
+                                     content_type='application/json')
+        if response.status_code != 200 or endpoint == 'json':
+            return str(response.status_code), time.perf_counter() - started, None
+
+        # Streaming: succeeded only if the stream ends with a `done` event.
+        outcome, first_field = 'stream error', None
+        async for chunk in response.streaming_content:
+            for frame in chunk.decode().split('\n\n'):
+                if frame.startswith('event: field') and first_field is None:
+                    first_field = time.perf_counter() - started
+                elif frame.startswith('event: done'):
+                    outcome = '200'
+        return outcome, time.perf_counter() - started, first_field
+
+    def _report(self, results, wall_time, options):
+        outcomes = Counter(outcome for outcome, _, _ in results)
+        successes = outcomes['200']
+        latencies = sorted(seconds for _, seconds, _ in results)
+        ok_latencies = sorted(seconds for outcome, seconds, _ in results if outcome == '200')
+        first_fields = sorted(seconds for _, _, seconds in results if seconds is not None)
+
+        self.stdout.write(
+            f"\n{len(results)} requests to the {options['endpoint']} endpoint, "
+            f"{options['concurrency']} at a time, in {wall_time:.2f}s"
+        )
+        self.stdout.write(f"{'':<22} {'p50':>9} {'p95':>9} {'p99':>9} {'max':>9}")
+        self._write_latency_row('latency (all)', latencies)
+        self._write_latency_row('latency (successful)', ok_latencies)
+        if options['endpoint'] == 'stream':
+            self._write_latency_row('time to first field', first_fields)
+
+        self.stdout.write(f'throughput: {len(results) / wall_time:.2f} req/s, '
+                          f'{successes / wall_time:.2f} successful req/s')
+        for outcome, count in sorted(outcomes.items()):
+            self.stdout.write(f'  {outcome:<14} {count:>6}  ({count / len(results):.1%})')
+
+        error_rate = 1 - successes / len(results)
+        style = self.style.SUCCESS if error_rate == 0 else self.style.WARNING
+        self.stdout.write(style(f'error rate: {error_rate:.1%}'))
+
+    def _write_latency_row(self, label, values):
+        if not values:
+            self.stdout.write(f'{label:<22} {"-":>9} {"-":>9} {"-":>9} {"-":>9}')
+            return
+        cells = [percentile(values, 0.50), percentile(values, 0.95), percentile(values, 0.99), values[-1]]
+        self.stdout.write(f'{label:<22} ' + ' '.join(f'{value * 1000:>7.0f}ms' for value in cells))
@@ -0,0 +1,55 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+import time
+
+from core.models import Form
+from core.submissions import write_submission
+
+
+class Command(BaseCommand):
+    help = (
+        "Measures how many SQL queries one submission costs through the shared write path "
+        "for forms of increasing size. Everything is rolled back afterwards."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--field-counts', default='5,10,20,40,80',
+                            help='Comma-separated list of form sizes to try.')
+        parser.add_argument('--submissions', type=int, default=20,
+                            help='Number of submissions to write per form size.')
+
+    def handle(self, *args, **options):
+        try:
+            field_counts = [int(count) for count in options['field_counts'].split(',')]
+        except ValueError:
+            raise CommandError('--field-counts must be a comma-separated list of integers.')
+        runs = options['submissions']
+
+        self.stdout.write(f"{'fields':>8} {'queries/submission':>20} {'ms/submission':>15}")
+        query_counts = set()
+
+        for field_count in field_counts:
+            with transaction.atomic():
+                form = Form.objects.create(
+                    form_name=f'Benchmark ({field_count} fields)',
+                    fields=[{'name': f'Field {i}', 'type': 'VARCHAR(255)'} for i in range(field_count)],
+                    status='active',
+                )
+                values = {field['name']: f'value {i}' for i, field in enumerate(form.fields)}
+
+                with CaptureQueriesContext(connection) as captured:
+                    started = time.perf_counter()
+                    for _ in range(runs):
+                        write_submission(form, values)
+                    elapsed = time.perf_counter() - started
+
+                per_submission = len(captured.captured_queries) / runs
+                query_counts.add(per_submission)
+                self.stdout.write(f"{field_count:>8} {per_submission:>20.1f} {elapsed / runs * 1000:>15.2f}")
+                transaction.set_rollback(True)
+
+        if len(query_counts) == 1:
+            self.stdout.write(self.style.SUCCESS('Query count per submission is constant across form sizes.'))
+        else:
+            raise CommandError('Query count per submission grows with the number of fields.')
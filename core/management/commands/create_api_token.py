@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from core.api_tokens import create_api_token
+from core.models import CustomUser
+
+
+class Command(BaseCommand):
+    help = (
+        "Creates an API token for a user and prints its key, which is not stored and "
+        "cannot be shown again. Clients send it as 'Authorization: Bearer <key>'."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('username', help='The user the token acts as.')
+        parser.add_argument('--name', required=True, help="What the token is for, e.g. 'Lobby kiosk'.")
+
+    def handle(self, *args, **options):
+        try:
+            user = CustomUser.objects.get(username=options['username'])
+        except CustomUser.DoesNotExist:
+            raise CommandError(f"User '{options['username']}' does not exist.")
+
+        token, key = create_api_token(user, options['name'])
+        self.stdout.write(f"Created token '{token.name}' for {user.username}.")
+        self.stdout.write(key)
@@ -0,0 +1,52 @@
+from django.core.management.base import BaseCommand, CommandError
+import time
+
+from core.synthetic import delete_synthetic_data, generate_workload
+
+
+class Command(BaseCommand):
+    help = (
+        "Creates a reproducible synthetic workload: forms with mixed field types, child "
+        "form hierarchies, submissions and ChildRelationship edges. The forms are owned "
+        "by the 'synthetic_admin' user and named '[synthetic] ...'."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--forms', type=int, default=5, help='Number of root forms.')
+        parser.add_argument('--fields', type=int, default=12, help='Fields per root form (child forms get half).')
+        parser.add_argument('--submissions', type=int, default=1000, help='Submissions per root form.')
+        parser.add_argument('--child-submissions', type=int,
+                            help='Submissions per child form (default: same as --submissions).')
+        parser.add_argument('--depth', type=int, default=1, help='Levels of child forms below each root form.')
+        parser.add_argument('--children', type=int, default=2, help='Child forms per form on each level.')
+        parser.add_argument('--relationships', type=int, default=50,
+                            help='ChildRelationship edges per root form.')
+        parser.add_argument('--seed', type=int, default=42, help='Random seed; the same seed gives the same data.')
+        parser.add_argument('--clear', action='store_true', help='Delete existing synthetic forms first.')
+        parser.add_argument('--delete', action='store_true', help='Only delete existing synthetic forms.')
+
+    def handle(self, *args, **options):
+        if options['clear'] or options['delete']:
+            deleted = delete_synthetic_data()
+            self.stdout.write(f'Deleted {deleted} synthetic form(s).')
+            if options['delete']:
+                return
+        if min(options['forms'], options['fields'], options['submissions'], options['depth'] + 1) < 1:
+            raise CommandError('--forms, --fields and --submissions must be at least 1, --depth at least 0.')
+
+        started = time.perf_counter()
+        workload = generate_workload(
+            forms=options['forms'],
+            fields=options['fields'],
+            submissions=options['submissions'],
+            child_submissions=options['child_submissions'],
+            depth=options['depth'],
+            children=options['children'],
+            relationships=options['relationships'],
+            seed=options['seed'],
+            log=self.stdout.write,
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f'Created {len(workload.forms)} forms, {workload.submissions} submissions and '
+            f'{workload.relationships} relationships in {time.perf_counter() - started:.1f}s.'
+        ))
@@ -0,0 +1,64 @@
+from django.core.files import File
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+from pathlib import Path
+import time
+
+from core.imports import detect_file_format, read_columns, run_import_job, suggest_mapping, validate_mapping
+from core.models import Form, ImportJob
+
+
+class Command(BaseCommand):
+    help = (
+        "Imports a CSV/Excel file of submissions into a form right away, without the "
+        "background worker. Columns are matched to fields by name unless --map is given."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='The .csv or .xlsx file to import.')
+        parser.add_argument('--form', type=int, required=True, help='Id of the form to import into.')
+        parser.add_argument('--map', action='append', default=[], metavar='COLUMN=FIELD',
+                            help='Map a column to a field (repeatable). Replaces the matching by name.')
+
+    def handle(self, *args, **options):
+        path = Path(options['path'])
+        file_format = detect_file_format(path.name)
+        if file_format is None or not path.is_file():
+            raise CommandError(f'{path} is not a .csv or .xlsx file.')
+        try:
+            form = Form.objects.get(pk=options['form'])
+        except Form.DoesNotExist:
+            raise CommandError(f"Form {options['form']} does not exist.")
+
+        with path.open('rb') as source:
+            job = ImportJob(form=form, file_format=file_format)
+            job.file.save(path.name, File(source), save=False)
+        job.columns = read_columns(job)
+        if options['map']:
+            pairs = [item.split('=', 1) for item in options['map']]
+            if any(len(pair) != 2 for pair in pairs):
+                raise CommandError('--map takes COLUMN=FIELD.')
+            job.column_mapping = {column.strip(): field.strip() for column, field in pairs}
+        else:
+            job.column_mapping = suggest_mapping(job.columns, form)
+        try:
+            validate_mapping(job.column_mapping, job.columns, form)
+        except ValidationError as e:
+            job.file.delete(save=False)
+            raise CommandError(' '.join(e.messages))
+
+        job.status = 'running'
+        job.save()
+        self.stdout.write(f"Importing {path.name} into '{form.form_name}' (mapping: {job.column_mapping})...")
+        started = time.perf_counter()
+        run_import_job(job)
+        elapsed = time.perf_counter() - started
+        if job.status != 'done':
+            raise CommandError(f'Import #{job.pk} failed: {job.error}')
+
+        for error in job.row_errors[:20]:
+            self.stdout.write(f"  row {error['row']}, {error['column']}: {error['message']}")
+        self.stdout.write(self.style.SUCCESS(
+            f"Import #{job.pk}: {job.rows_imported} rows imported, {job.rows_failed} skipped in {elapsed:.2f}s "
+            f"({job.rows_done / elapsed if elapsed else 0:,.0f} rows/s)."
+        ))
@@ -0,0 +1,54 @@
+from django.core.management.base import BaseCommand
+import time
+
+from core.analytics import rebuild_form_aggregates, rebuild_stale_aggregates
+from core.models import Form
+
+
+class Command(BaseCommand):
+    help = (
+        "Recomputes the analytics aggregates (bucket counts and numeric stats) of each form "
+        "from its submissions. By default only forms whose aggregates are out of date "
+        "(after submissions were deleted or edited); run it periodically, e.g. from cron, "
+        "or keep it running next to the web server with --watch."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--all', action='store_true',
+                            help='Rebuild every form, not only the out-of-date ones.')
+        parser.add_argument('--form', type=int, help='Only rebuild this form id.')
+        parser.add_argument('--watch', action='store_true',
+                            help='Keep running and rebuild forms as soon as their aggregates go out of date.')
+        parser.add_argument('--poll-interval', type=float, default=5.0,
+                            help='With --watch, seconds to wait between checks when nothing is out of date.')
+        parser.add_argument('--batch-size', type=int, default=5,
+                            help='With --watch, forms rebuilt per check.')
+
+    def handle(self, *args, **options):
+        if options['watch']:
+            self.watch(options['poll_interval'], options['batch_size'])
+            return
+
+        forms = Form.objects.all()
+        if options['form']:
+            forms = forms.filter(pk=options['form'])
+        elif not options['all']:
+            forms = forms.filter(analytics_ready=False)
+
+        rebuilt = 0
+        for form in forms.only('id', 'form_name').order_by('id'):
+            rebuild_form_aggregates(form)
+            rebuilt += 1
+            self.stdout.write(f"  ...rebuilt '{form.form_name}' (#{form.pk})")
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt analytics for {rebuilt} form(s).'))
+
+    def watch(self, poll_interval, batch_size):
+        # Forms another watcher (or a writer) holds locked are skipped, so several
+        # of these can run side by side.
+        self.stdout.write('Watching for out-of-date analytics.')
+        while True:
+            rebuilt = rebuild_stale_aggregates(limit=batch_size)
+            if rebuilt:
+                self.stdout.write(f'Rebuilt analytics for {rebuilt} form(s).')
+                continue
+            time.sleep(poll_interval)
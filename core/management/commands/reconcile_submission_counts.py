@@ -0,0 +1,43 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Count, F, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from core.models import Form, FormSubmission
+
+
+class Command(BaseCommand):
+    help = (
+        "Compares each form's submission_count counter with its real number of "
+        "submissions and corrects the ones that have drifted."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--form', type=int, help='Only check this form id.')
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Report the drifted counters without changing them.')
+
+    def handle(self, *args, **options):
+        forms = Form.objects.all()
+        if options['form']:
+            forms = forms.filter(pk=options['form'])
+
+        drifted = list(
+            forms.annotate(actual=Count('submissions'))
+            .exclude(submission_count=F('actual'))
+            .values_list('id', 'form_name', 'submission_count', 'actual')
+        )
+        actual_count = Coalesce(Subquery(
+            FormSubmission.objects.filter(form=OuterRef('pk'))
+            .order_by().values('form').annotate(total=Count('id')).values('total'),
+            output_field=IntegerField(),
+        ), 0)
+        for form_id, form_name, stored, actual in drifted:
+            self.stdout.write(f"  '{form_name}' (#{form_id}): counter {stored}, actual {actual}")
+            if not options['dry_run']:
+                # Recount in the UPDATE itself so submissions written meanwhile are included.
+                Form.objects.filter(pk=form_id).update(submission_count=actual_count)
+
+        if options['dry_run']:
+            self.stdout.write(f'{len(drifted)} counter(s) out of date.')
+        else:
+            self.stdout.write(self.style.SUCCESS(f'Corrected {len(drifted)} counter(s).'))
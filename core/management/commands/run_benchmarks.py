@@ -0,0 +1,112 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.test import Client
+from django.test.utils import override_settings
+import json
+import logging
+import random
+
+from core.benchmarks import BENCHMARK_CASES, BenchmarkContext, run_case
+from core.models import FormSubmission
+from core.synthetic import generate_workload
+
+
+class Command(BaseCommand):
+    help = (
+        "Times the hot views (dashboard, form detail, analytics, the three exports and "
+        "both submit views) against a synthetic workload, recording SQL queries, wall "
+        "time and peak memory. Fails when a view exceeds its budget in core/benchmarks.py. "
+        "The workload is created in a transaction that is rolled back afterwards."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--forms', type=int, default=2, help='Root forms in the workload.')
+        parser.add_argument('--fields', type=int, default=12, help='Fields per root form.')
+        parser.add_argument('--submissions', type=int, default=500, help='Submissions per form.')
+        parser.add_argument('--depth', type=int, default=1, help='Levels of child forms.')
+        parser.add_argument('--children', type=int, default=2, help='Child forms per form on each level.')
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--repeat', type=int, default=5, help='Timed runs per view (after one warm-up run).')
+        parser.add_argument('--only', help='Comma-separated names of the cases to run.')
+        parser.add_argument('--no-time-budgets', action='store_true',
+                            help='Only enforce the query and memory budgets.')
+        parser.add_argument('--json', dest='json_path', help='Also write the results to this JSON file.')
+
+    def handle(self, *args, **options):
+        cases = BENCHMARK_CASES
+        if options['only']:
+            names = {name.strip() for name in options['only'].split(',')}
+            cases = [case for case in BENCHMARK_CASES if case.name in names]
+            if len(cases) != len(names):
+                known = ', '.join(case.name for case in BENCHMARK_CASES)
+                raise CommandError(f'Unknown benchmark case in --only. Known cases: {known}')
+            if options['depth'] < 1 and any(case.needs_child_form for case in cases):
+                raise CommandError('The internal_form_fill (submit) case posts to a child form; use --depth 1 or more.')
+        elif options['depth'] < 1:
+            cases = [case for case in cases if not case.needs_child_form]
+            self.stdout.write('Skipping the cases that need child forms (--depth 0).')
+
+        # Failing requests are reported in the results table instead of logged.
+        logging.disable(logging.CRITICAL)
+        try:
+            # The test client sends requests for the host name 'testserver'.
+            with override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver']):
+                results = self._run(cases, options)
+        finally:
+            logging.disable(logging.NOTSET)
+
+        self._report(results, options)
+
+    def _run(self, cases, options):
+        with transaction.atomic():
+            self.stdout.write('Creating the synthetic workload...')
+            workload = generate_workload(
+                forms=options['forms'], fields=options['fields'], submissions=options['submissions'],
+                depth=options['depth'], children=options['children'], relationships=25, seed=options['seed'],
+            )
+            root_form = workload.root_forms[0]
+            child_form = next((form for form in workload.forms if form.parent_form_id == root_form.pk), None)
+            context = BenchmarkContext(
+                root_form=root_form,
+                child_form=child_form,
+                parent_submission_id=FormSubmission.objects.filter(form=root_form).values_list('id', flat=True).first(),
+            )
+
+            client = Client(raise_request_exception=False)
+            client.force_login(root_form.created_by)
+            rng = random.Random(options['seed'])
+            results = []
+            for case in cases:
+                self.stdout.write(f'  {case.name}...')
+                results.append(run_case(client, case, context, rng, repeat=options['repeat']))
+            transaction.set_rollback(True)
+        return results
+
+    def _report(self, results, options):
+        check_time = not options['no_time_budgets']
+        self.stdout.write(
+            f"\n{'view':<30} {'status':>6} {'queries':>12} {'median':>18} {'max':>9} {'peak memory':>18}"
+        )
+        failures = []
+        for result in results:
+            budget = result.case.budget
+            self.stdout.write(
+                f'{result.case.name:<30} {result.status_code:>6} '
+                f'{result.queries:>5} / {budget.queries:<4} '
+                f'{result.median_ms:>7.1f} / {budget.milliseconds:<6.0f}ms '
+                f'{result.max_ms:>7.1f}ms '
+                f'{result.peak_memory_mb:>6.1f} / {budget.memory_mb:<5.1f}MB'
+            )
+            failures.extend(f'{result.case.name}: {problem}' for problem in result.violations(check_time))
+
+        if options['json_path']:
+            with open(options['json_path'], 'w') as output:
+                json.dump({'options': {key: options[key] for key in (
+                    'forms', 'fields', 'submissions', 'depth', 'children', 'seed', 'repeat')},
+                    'results': [result.as_dict() for result in results]}, output, indent=2)
+            self.stdout.write(f"Results written to {options['json_path']}.")
+
+        if failures:
+            raise CommandError('Over budget:\n  ' + '\n  '.join(failures))
+        self.stdout.write(self.style.SUCCESS('All views are within budget.'))
@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand
+import time
+
+from core.exports import claim_next_export_job, run_export_job
+
+
+class Command(BaseCommand):
+    help = "Builds queued CSV/Excel/PDF exports in the background. Run one or more of these next to the web server."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true',
+                            help='Process every pending job, then exit instead of polling.')
+        parser.add_argument('--poll-interval', type=float, default=2.0,
+                            help='Seconds to wait between checks when the queue is empty.')
+
+    def handle(self, *args, **options):
+        self.stdout.write('Export worker started.')
+        while True:
+            job = claim_next_export_job()
+            if job is None:
+                if options['once']:
+                    break
+                time.sleep(options['poll_interval'])
+                continue
+
+            self.stdout.write(f"Building {job.get_export_format_display()} export #{job.pk} for '{job.form.form_name}'...")
+            run_export_job(job)
+            if job.status == 'done':
+                self.stdout.write(self.style.SUCCESS(f"Export #{job.pk} finished ({job.rows_done} rows)."))
+            else:
+                self.stdout.write(self.style.ERROR(f"Export #{job.pk} failed: {job.error}"))
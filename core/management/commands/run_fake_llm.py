@@ -0,0 +1,62 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from core.fake_llm import FakeLLMBehaviour, FakeOllamaServer
+
+
+def add_behaviour_arguments(parser):
+    """The fake model's latency and failure options, shared with benchmark_ai_endpoint."""
+    parser.add_argument('--latency', type=float, default=0.5,
+                        help='Seconds before the first token.')
+    parser.add_argument('--jitter', type=float, default=0.0,
+                        help='Up to this many extra seconds of latency, at random.')
+    parser.add_argument('--tokens-per-second', type=float, default=50.0,
+                        help='How fast the answer is written once it starts (0 = instantly).')
+    parser.add_argument('--error-rate', type=float, default=0.0,
+                        help='Fraction of requests answered with HTTP 500.')
+    parser.add_argument('--malformed-rate', type=float, default=0.0,
+                        help='Fraction of requests answered with invalid JSON.')
+    parser.add_argument('--hang-rate', type=float, default=0.0,
+                        help='Fraction of requests that never get an answer.')
+    parser.add_argument('--seed', type=int, help='Random seed, for repeatable runs.')
+
+
+def behaviour_from_options(options):
+    rates = [options['error_rate'], options['malformed_rate'], options['hang_rate']]
+    if any(rate < 0 for rate in rates) or sum(rates) > 1:
+        raise CommandError('The failure rates must be between 0 and 1 and add up to at most 1.')
+    return FakeLLMBehaviour(
+        latency=options['latency'],
+        jitter=options['jitter'],
+        tokens_per_second=options['tokens_per_second'],
+        error_rate=options['error_rate'],
+        malformed_rate=options['malformed_rate'],
+        hang_rate=options['hang_rate'],
+        seed=options['seed'],
+    )
+
+
+class Command(BaseCommand):
+    help = (
+        "Runs a fake Ollama server with configurable latency, token rate and failure modes. "
+        "Point OLLAMA_HOST at it to use the AI features without a real model."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--host', default='127.0.0.1')
+        parser.add_argument('--port', type=int, default=11434)
+        parser.add_argument('--verbose-requests', action='store_true', help='Log every request.')
+        add_behaviour_arguments(parser)
+
+    def handle(self, *args, **options):
+        server = FakeOllamaServer(
+            options['host'], options['port'], behaviour_from_options(options),
+            verbose=options['verbose_requests'],
+        )
+        self.stdout.write(self.style.SUCCESS(f'Fake Ollama server listening on {server.url}'))
+        self.stdout.write(f'Set OLLAMA_HOST={server.url} to use it. Press Ctrl+C to stop.')
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.stop()
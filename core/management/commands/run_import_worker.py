@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand
+import time
+
+from core.imports import claim_next_import_job, run_import_job
+
+
+class Command(BaseCommand):
+    help = "Imports uploaded CSV/Excel files of submissions in the background. Run one or more of these next to the web server."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true',
+                            help='Process every pending job, then exit instead of polling.')
+        parser.add_argument('--poll-interval', type=float, default=2.0,
+                            help='Seconds to wait between checks when the queue is empty.')
+
+    def handle(self, *args, **options):
+        self.stdout.write('Import worker started.')
+        while True:
+            job = claim_next_import_job()
+            if job is None:
+                if options['once']:
+                    break
+                time.sleep(options['poll_interval'])
+                continue
+
+            self.stdout.write(f"Importing {job.get_file_format_display()} file #{job.pk} into '{job.form.form_name}'...")
+            started = time.perf_counter()
+            run_import_job(job)
+            elapsed = time.perf_counter() - started
+            if job.status == 'done':
+                self.stdout.write(self.style.SUCCESS(
+                    f"Import #{job.pk} finished: {job.rows_imported} rows imported, {job.rows_failed} skipped "
+                    f"in {elapsed:.1f}s."
+                ))
+            else:
+                self.stdout.write(self.style.ERROR(f"Import #{job.pk} failed: {job.error}"))
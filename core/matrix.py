@@ -0,0 +1,117 @@
+# core/matrix.py (NEW FILE)
+"""
+The "submission matrix" loader: one tuple per submission with a value per column.
+
+Every view that shows or exports submissions needs the EAV rows pivoted back into
+one row per submission. This module does that pivot inside PostgreSQL, in a single
+query, instead of looping over `data_entries` in Python.
+
+Two sources are supported:
+- 'snapshot' reads each column out of the denormalized `FormSubmission.snapshot`
+  JSONB payload, so there is no join at all.
+- 'entries' pivots the SubmissionData rows with conditional aggregation
+  (MAX(field_value) FILTER (WHERE field_name = ...) ... GROUP BY submission).
+  It works even if the snapshots have not been backfilled yet.
+
+The default comes from the SUBMISSION_MATRIX_SOURCE setting.
+"""
+from django.conf import settings
+from django.db.models import F, Max, Q
+from django.db.models.fields.json import KeyTextTransform
+
+from .models import FormSubmission, SubmissionData
+from .schema import get_form_schema
+
+MATRIX_SOURCES = ('snapshot', 'entries')
+MATRIX_CHUNK_SIZE = 2000
+# Text that PostgreSQL can safely cast to double precision.
+NUMERIC_PATTERN = r'^\s*[-+]?([0-9]+\.?[0-9]*|\.[0-9]+)([eE][-+]?[0-9]+)?\s*$'
+
+
+def default_matrix_source():
+    return getattr(settings, 'SUBMISSION_MATRIX_SOURCE', 'snapshot')
+
+
+def _column_expression(column, source):
+    if source == 'snapshot':
+        return KeyTextTransform(column, 'snapshot')
+    return Max('data_entries__field_value', filter=Q(data_entries__field_name=column))
+
+
+def annotate_matrix(form, columns=None, source=None, submissions=None):
+    """
+    Returns the submissions of `form` annotated with one value per column, aliased
+    `c0`, `c1`, ... in the order of `columns` (column names are arbitrary user text).
+    Use this when the columns need to be filtered or sorted on before selecting them.
+    """
+    source = source or default_matrix_source()
+    if source not in MATRIX_SOURCES:
+        raise ValueError(f"Unknown submission matrix source '{source}'.")
+    if columns is None:
+        columns = get_form_schema(form).field_names
+    if submissions is None:
+        submissions = FormSubmission.objects.all()
+
+    aliases = {f'c{index}': _column_expression(column, source) for index, column in enumerate(columns)}
+    return submissions.filter(form=form).annotate(**aliases)
+
+
+def column_aliases(columns):
+    return [f'c{index}' for index in range(len(columns))]
+
+
+def submission_matrix(form, columns=None, extra_fields=('id', 'submitted_at'), source=None, submissions=None):
+    """
+    Returns a values_list queryset of tuples `(*extra_fields, *column_values)`, one per
+    submission of `form`. Missing values are None. `columns` defaults to the form's
+    field names; `submissions` may be a pre-filtered FormSubmission queryset. The
+    result can be ordered, filtered and sliced like any queryset before it runs.
+    """
+    if columns is None:
+        columns = get_form_schema(form).field_names
+    return annotate_matrix(form, columns, source=source, submissions=submissions).values_list(
+        *extra_fields, *column_aliases(columns)
+    )
+
+
+def iter_submission_matrix(form, columns=None, extra_fields=('id', 'submitted_at'), source=None,
+                           chunk_size=MATRIX_CHUNK_SIZE, max_id=None):
+    """
+    Streams the matrix in id order, `chunk_size` submissions per query (keyset pagination
+    on the primary key). If `max_id` is given, later submissions are left out.
+    Yields tuples shaped like `submission_matrix`, without the leading id unless it was
+    requested in `extra_fields`.
+    """
+    submissions = FormSubmission.objects.all()
+    if max_id is not None:
+        submissions = submissions.filter(id__lte=max_id)
+    matrix = submission_matrix(
+        form, columns, extra_fields=('id', *extra_fields), source=source, submissions=submissions
+    ).order_by('id')
+
+    last_id = 0
+    while True:
+        chunk = list(matrix.filter(id__gt=last_id)[:chunk_size])
+        if not chunk:
+            return
+        for row in chunk:
+            yield row[1:]
+        last_id = chunk[-1][0]
+
+
+def field_values(form, field_name, source=None):
+    """
+    Returns a queryset with one row per stored value of a single field of `form`,
+    the value annotated as `value`. Unlike the matrix it does not group by
+    submission, so it can be aggregated further (GROUP BY value, MIN/MAX, ...).
+    """
+    source = source or default_matrix_source()
+    if source not in MATRIX_SOURCES:
+        raise ValueError(f"Unknown submission matrix source '{source}'.")
+    if source == 'snapshot':
+        return FormSubmission.objects.filter(form=form).annotate(
+            value=KeyTextTransform(field_name, 'snapshot')
+        ).filter(value__isnull=False)
+    return SubmissionData.objects.filter(submission__form=form, field_name=field_name).annotate(
+        value=F('field_value')
+    )
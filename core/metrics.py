@@ -0,0 +1,267 @@
+# core/metrics.py (NEW FILE)
+"""
+Per-view request metrics, served in the Prometheus text format.
+
+RequestMetricsMiddleware records, for every request, under the name of the URL
+pattern it resolved to (e.g. 'form_detail'):
+
+- how long the view took (a latency histogram),
+- how many SQL queries it ran and how long they took, counted by an
+  execute_wrapper active for the duration of the request (`observe_queries`),
+- the size of the response body, and the response status.
+
+The numbers are kept in memory in this process: recording a request is a dict
+lookup and a handful of additions under a lock. `render_metrics()` formats them
+for the `metrics` view. Each server process keeps its own numbers, so with several
+worker processes every process has to be scraped (or run one process per target).
+
+Streaming responses (the exports) are measured up to the moment the response
+starts: the time and queries spent producing the rest of the stream are not
+included, and their size is only known when they send a Content-Length.
+"""
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import partial
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.db import connections
+from django.db.backends.signals import connection_created
+
+# Upper bounds of the histogram buckets; +Inf is implied.
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200, 500)
+RESPONSE_SIZE_BUCKETS = (1_000, 10_000, 100_000, 1_000_000, 10_000_000)
+
+METRIC_PREFIX = 'formapp'
+UNRESOLVED_VIEW = '<unresolved>'
+# Methods recorded under their own name; anything else a client sends is 'OTHER',
+# so arbitrary methods cannot grow the registry.
+KNOWN_METHODS = frozenset({'GET', 'POST', 'PUT', 'PATCH', 'DELETE', 'HEAD', 'OPTIONS'})
+
+
+class _Histogram:
+    __slots__ = ('bounds', 'counts', 'total', 'count')
+
+    def __init__(self, bounds):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.total += value
+        self.count += 1
+
+
+class _ViewMetrics:
+    """Everything recorded for one (view, method) pair."""
+    __slots__ = ('latency', 'queries', 'sql_seconds', 'response_size', 'statuses')
+
+    def __init__(self):
+        self.latency = _Histogram(LATENCY_BUCKETS)
+        self.queries = _Histogram(QUERY_COUNT_BUCKETS)
+        self.sql_seconds = 0.0
+        self.response_size = _Histogram(RESPONSE_SIZE_BUCKETS)
+        self.statuses = {}
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._views = {}
+        self._lock = threading.Lock()
+
+    def record(self, view, method, status, seconds, queries, sql_seconds, size):
+        with self._lock:
+            metrics = self._views.get((view, method))
+            if metrics is None:
+                metrics = self._views[(view, method)] = _ViewMetrics()
+            metrics.latency.observe(seconds)
+            metrics.queries.observe(queries)
+            metrics.sql_seconds += sql_seconds
+            if size is not None:
+                metrics.response_size.observe(size)
+            metrics.statuses[status] = metrics.statuses.get(status, 0) + 1
+
+    def snapshot(self):
+        """A consistent copy of the recorded metrics: {(view, method): _ViewMetrics}."""
+        copies = {}
+        with self._lock:
+            for key, metrics in self._views.items():
+                copy = _ViewMetrics()
+                for name in ('latency', 'queries', 'response_size'):
+                    source, target = getattr(metrics, name), getattr(copy, name)
+                    target.counts, target.total, target.count = list(source.counts), source.total, source.count
+                copy.sql_seconds = metrics.sql_seconds
+                copy.statuses = dict(metrics.statuses)
+                copies[key] = copy
+        return copies
+
+    def reset(self):
+        with self._lock:
+            self._views.clear()
+
+
+registry = MetricsRegistry()
+
+
+class _QueryTimer:
+    """An execute_wrapper that counts the queries run through it and their total time."""
+    __slots__ = ('count', 'seconds')
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.seconds += time.perf_counter() - started
+            self.count += 1
+
+
+# Query wrappers active in the current context. A ContextVar rather than
+# `connection.execute_wrapper()`: database connections belong to a thread, and under
+# ASGI the ORM runs in a sync_to_async worker thread with its own connection. The
+# context (and so this variable) is copied into that thread.
+_query_observers = ContextVar('query_observers', default=())
+
+
+def _dispatch_to_observers(execute, sql, params, many, context):
+    observers = _query_observers.get()
+    for observer in reversed(observers):
+        execute = partial(observer, execute)
+    return execute(sql, params, many, context)
+
+
+def _install_dispatcher(connection, **kwargs):
+    if _dispatch_to_observers not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_dispatch_to_observers)
+
+
+connection_created.connect(_install_dispatcher)
+
+
+@contextmanager
+def observe_queries(observer):
+    """
+    Runs every SQL query made in the current context through `observer`, an
+    execute_wrapper (see Django's `connection.execute_wrapper`). This includes the
+    queries of sync_to_async calls made from it.
+    """
+    for connection in connections.all(initialized_only=True):
+        _install_dispatcher(connection)
+    token = _query_observers.set((*_query_observers.get(), observer))
+    try:
+        yield
+    finally:
+        _query_observers.reset(token)
+
+
+def _response_size(response):
+    if getattr(response, 'streaming', False):
+        length = response.get('Content-Length')
+        return int(length) if length and length.isdigit() else None
+    return len(response.content)
+
+
+class RequestMetricsMiddleware:
+    """
+    Records latency, SQL and response size per resolved URL name (see module docstring).
+    Works in both sync and async stacks, so under ASGI it does not force Django to
+    run async views in a thread.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        timer = _QueryTimer()
+        started = time.perf_counter()
+        with observe_queries(timer):
+            response = self.get_response(request)
+        self._record(request, response, time.perf_counter() - started, timer)
+        return response
+
+    async def __acall__(self, request):
+        timer = _QueryTimer()
+        started = time.perf_counter()
+        with observe_queries(timer):
+            response = await self.get_response(request)
+        self._record(request, response, time.perf_counter() - started, timer)
+        return response
+
+    @staticmethod
+    def _record(request, response, elapsed, timer):
+        match = getattr(request, 'resolver_match', None)
+        registry.record(
+            view=match.view_name if match else UNRESOLVED_VIEW,
+            method=request.method if request.method in KNOWN_METHODS else 'OTHER',
+            status=response.status_code,
+            seconds=elapsed,
+            queries=timer.count,
+            sql_seconds=timer.seconds,
+            size=_response_size(response),
+        )
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _labels(**labels):
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in labels.items()) + '}'
+
+
+def _format_bound(bound):
+    return repr(float(bound)) if isinstance(bound, float) else str(bound)
+
+
+def _histogram_lines(name, histogram, labels):
+    lines, cumulative = [], 0
+    for bound, count in zip((*histogram.bounds, '+Inf'), histogram.counts):
+        cumulative += count
+        le = bound if bound == '+Inf' else _format_bound(bound)
+        lines.append(f'{name}_bucket{_labels(**labels, le=le)} {cumulative}')
+    lines.append(f'{name}_sum{_labels(**labels)} {histogram.total}')
+    lines.append(f'{name}_count{_labels(**labels)} {histogram.count}')
+    return lines
+
+
+def render_metrics(snapshot=None):
+    """The recorded metrics in the Prometheus text exposition format (version 0.0.4)."""
+    snapshot = registry.snapshot() if snapshot is None else snapshot
+    views = sorted(snapshot.items())
+    p = METRIC_PREFIX
+    sections = [
+        (f'{p}_http_request_duration_seconds', 'histogram', 'Time spent in the view, by URL name.',
+         lambda labels, metrics: _histogram_lines(f'{p}_http_request_duration_seconds', metrics.latency, labels)),
+        (f'{p}_http_responses_total', 'counter', 'Responses, by URL name and status code.',
+         lambda labels, metrics: [f'{p}_http_responses_total{_labels(**labels, status=status)} {count}'
+                                  for status, count in sorted(metrics.statuses.items())]),
+        (f'{p}_db_queries_per_request', 'histogram', 'SQL queries run by one request, by URL name.',
+         lambda labels, metrics: _histogram_lines(f'{p}_db_queries_per_request', metrics.queries, labels)),
+        (f'{p}_db_query_duration_seconds_total', 'counter', 'Time spent running SQL queries, by URL name.',
+         lambda labels, metrics: [f'{p}_db_query_duration_seconds_total{_labels(**labels)} {metrics.sql_seconds}']),
+        (f'{p}_http_response_size_bytes', 'histogram', 'Response body size, by URL name (non-streaming responses).',
+         lambda labels, metrics: _histogram_lines(f'{p}_http_response_size_bytes', metrics.response_size, labels)),
+    ]
+    lines = []
+    for name, kind, description, render in sections:
+        lines.append(f'# HELP {name} {description}')
+        lines.append(f'# TYPE {name} {kind}')
+        for (view, method), metrics in views:
+            lines.extend(render({'view': view, 'method': method}, metrics))
+    return '\n'.join(lines) + '\n'
@@ -0,0 +1,36 @@
+# Generated by Django 5.2.4 on 2026-10-18 09:21
+
+from django.db import migrations, models
+
+
+def fill_snapshots(apps, schema_editor):
+    # Existing submissions get their snapshot from their SubmissionData rows, so the
+    # read paths that use SUBMISSION_MATRIX_SOURCE = 'snapshot' see their values.
+    FormSubmission = apps.get_model('core', 'FormSubmission')
+    SubmissionData = apps.get_model('core', 'SubmissionData')
+    schema_editor.execute(f"""
+        UPDATE {FormSubmission._meta.db_table} AS s
+        SET snapshot = agg.snapshot
+        FROM (
+            SELECT submission_id, jsonb_object_agg(field_name, field_value) AS snapshot
+            FROM {SubmissionData._meta.db_table}
+            GROUP BY submission_id
+        ) AS agg
+        WHERE agg.submission_id = s.id
+    """)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0006_exportjob'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='formsubmission',
+            name='snapshot',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+        migrations.RunPython(fill_snapshots, migrations.RunPython.noop),
+    ]
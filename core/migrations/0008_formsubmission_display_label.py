@@ -0,0 +1,35 @@
+# Generated by Django 5.2.4 on 2026-10-18 09:25
+
+from django.db import migrations, models
+
+from core.models import representative_value
+
+
+def fill_display_labels(apps, schema_editor):
+    # Labels are derived from the snapshots that migration 0007 filled in.
+    FormSubmission = apps.get_model('core', 'FormSubmission')
+    batch = []
+    for submission in FormSubmission.objects.exclude(snapshot={}).only('id', 'snapshot').iterator(chunk_size=2000):
+        submission.display_label = representative_value(submission.snapshot)
+        if submission.display_label:
+            batch.append(submission)
+        if len(batch) >= 2000:
+            FormSubmission.objects.bulk_update(batch, ['display_label'])
+            batch = []
+    if batch:
+        FormSubmission.objects.bulk_update(batch, ['display_label'])
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0007_formsubmission_snapshot'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='formsubmission',
+            name='display_label',
+            field=models.CharField(blank=True, max_length=255),
+        ),
+        migrations.RunPython(fill_display_labels, migrations.RunPython.noop),
+    ]
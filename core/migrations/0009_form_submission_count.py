@@ -0,0 +1,31 @@
+# Generated by Django 5.2.4 on 2026-10-18 09:27
+
+from django.db import migrations, models
+from django.db.models import Count, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def fill_submission_counts(apps, schema_editor):
+    Form = apps.get_model('core', 'Form')
+    FormSubmission = apps.get_model('core', 'FormSubmission')
+    counts = (
+        FormSubmission.objects.filter(form=OuterRef('pk'))
+        .order_by().values('form').annotate(total=Count('id')).values('total')
+    )
+    Form.objects.update(submission_count=Coalesce(Subquery(counts, output_field=IntegerField()), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_formsubmission_display_label'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='form',
+            name='submission_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(fill_submission_counts, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,58 @@
+# Generated by Django 5.2.4 on 2026-10-18 09:32
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def mark_existing_forms_stale(apps, schema_editor):
+    # Forms that already have submissions need their aggregates built once,
+    # by `rebuild_form_analytics` or on the next analytics page view.
+    Form = apps.get_model('core', 'Form')
+    Form.objects.filter(submission_count__gt=0).update(analytics_ready=False)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0009_form_submission_count'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='form',
+            name='analytics_ready',
+            field=models.BooleanField(default=True, editable=False),
+        ),
+        migrations.CreateModel(
+            name='FieldBucket',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('field_name', models.CharField(max_length=255)),
+                ('kind', models.CharField(choices=[('numeric', 'Numeric range'), ('category', 'Category'), ('date', 'Day')], max_length=10)),
+                ('bucket', models.CharField(max_length=255)),
+                ('count', models.PositiveIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('form', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='field_buckets', to='core.form')),
+            ],
+            options={
+                'unique_together': {('form', 'field_name', 'bucket')},
+            },
+        ),
+        migrations.CreateModel(
+            name='FieldStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('field_name', models.CharField(max_length=255)),
+                ('count', models.PositiveIntegerField(default=0)),
+                ('min_value', models.FloatField(blank=True, null=True)),
+                ('max_value', models.FloatField(blank=True, null=True)),
+                ('sum_value', models.FloatField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('form', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='field_stats', to='core.form')),
+            ],
+            options={
+                'unique_together': {('form', 'field_name')},
+            },
+        ),
+        migrations.RunPython(mark_existing_forms_stale, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.4 on 2026-10-18 10:51
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0014_apitoken'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='formsubmission',
+            index=models.Index(fields=['form', 'submitted_at', 'id'], name='core_formsu_form_id_7d51ca_idx'),
+        ),
+    ]
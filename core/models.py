@@ -2,7 +2,7 @@ from django.db import models
 
 # Create your models here.
 import uuid
-from django.db import models
+from django.db import connection, models
 from django.contrib.auth.models import AbstractUser
 from django.conf import settings
 
@@ -46,6 +46,16 @@ class Form(models.Model):
     status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='draft')
     version = models.PositiveIntegerField(default=1)
     original_form = models.ForeignKey('self', on_delete=models.SET_NULL, null=True, blank=True, related_name='versions')
+    # Counter cache of this form's submissions. Kept up to date by the write and delete
+    # helpers in core.submissions; `manage.py reconcile_submission_counts` repairs drift.
+    submission_count = models.PositiveIntegerField(default=0, editable=False)
+    # Whether the analytics aggregates (see core.analytics) are complete for this form.
+    # Cleared when submissions are deleted or edited; `manage.py rebuild_form_analytics`
+    # (once, or continuously with --watch) or the analytics view (for small forms) recompute them.
+    analytics_ready = models.BooleanField(default=True, editable=False)
+    # Bumped by every write, edit and delete of this form's submission data (see
+    # core.submissions), so caches of that data, like export files, can tell it changed.
+    data_version = models.PositiveIntegerField(default=0, editable=False)
 
     def __str__(self):
         return f"{self.form_name} (v{self.version})"
@@ -68,8 +78,37 @@ class FormPermission(models.Model):
 
     def __str__(self):
         return f"{self.user.username} has {self.get_permission_level_display()} access to {self.form.form_name}"
+
+# A list of common field names that make a good label for a submission,
+# in order of preference. They are matched case-insensitively.
+REPRESENTATIVE_FIELDS = [
+    'name', 'full name', 'full_name', 'title', 'school name', 'school_name',
+    'teacher name', 'teacher_name', 'student name', 'student_name', 'username'
+]
+
+def representative_value(values):
+    """
+    Picks the value used to label a submission (like a name or title) from a
+    {field_name: field_value} dict, or returns '' if none of the fields match.
+    """
+    values_by_name = {}
+    for field_name, field_value in values.items():
+        values_by_name.setdefault(str(field_name).lower(), field_value)
+    for field_name in REPRESENTATIVE_FIELDS:
+        if values_by_name.get(field_name):
+            return str(values_by_name[field_name])[:255]
+    return ''
+
 # 3. Form Submission Model (NEW - Replaces Dynamic Tables)
 # This table stores one record for every time a form is submitted.
+class FormSubmissionQuerySet(models.QuerySet):
+    def with_labels(self):
+        """
+        Loads only what __str__ needs (the stored label and the form name) in the
+        same query, so labelling a whole list of submissions costs a single query.
+        """
+        return self.select_related('form').only('id', 'display_label', 'form_id', 'form__form_name')
+
 class FormSubmission(models.Model):
     form = models.ForeignKey(Form, on_delete=models.CASCADE, related_name='submissions')
     submitted_at = models.DateTimeField(auto_now_add=True)
@@ -77,37 +116,39 @@ class FormSubmission(models.Model):
     submitted_by = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True)
     # NEW: If this is a submission to a child form, this links back to the specific parent record.
     parent_submission = models.ForeignKey('self', on_delete=models.CASCADE, null=True, blank=True, related_name='child_submissions')
+    # Denormalized copy of this submission's SubmissionData as {field_name: field_value}.
+    # Kept in sync by core.submissions and filled for older rows by migration 0007
+    # (`backfill_submission_snapshots` repairs drift), so read paths can load one row
+    # per submission instead of pivoting the EAV table.
+    snapshot = models.JSONField(default=dict, blank=True)
+    # The representative value (like a name or title) shown by __str__, precomputed
+    # from the snapshot whenever the submission's data is written.
+    display_label = models.CharField(max_length=255, blank=True)
+
+    objects = FormSubmissionQuerySet.as_manager()
+
+    class Meta:
+        # Serves the submission table's default keyset pages (newest first, id as tie-breaker).
+        indexes = [models.Index(fields=['form', 'submitted_at', 'id'])]
 
     def __str__(self):
         """
-        Tries to find a representative piece of data (like a name or title)
-        to display as the string representation of this submission.
+        Displays the submission's representative value (like a name or title)
+        plus the form type for context, e.g. "TCS (Company Form)".
+        Use `FormSubmission.objects.with_labels()` to avoid a query for the form.
         """
-        # A list of common field names to check for, in order of preference.
-        # We check for lowercase to make the matching case-insensitive.
-        REPRESENTATIVE_FIELDS = [
-            'name', 'full name', 'full_name', 'title', 'school name', 'school_name',
-            'teacher name', 'teacher_name', 'student name', 'student_name', 'username'
-        ]
-
-        # Use prefetch_related in the admin for performance.
-        # Here we do a direct query.
-        for field_name_to_check in REPRESENTATIVE_FIELDS:
-            try:
-                # Query the related SubmissionData entries.
-                # We use __iexact for a case-insensitive match on the field_name.
-                data_entry = self.data_entries.get(field_name__iexact=field_name_to_check)
-                if data_entry.field_value:
-                    # Found a good field, return its value plus the form type for context.
-                    return f"{data_entry.field_value} ({self.form.form_name})"
-            except SubmissionData.DoesNotExist:
-                # This field name wasn't in the submission, so we continue to the next.
-                continue
-        
-        # If no representative field was found after checking all possibilities,
-        # fall back to a more informative default.
+        if self.display_label:
+            return f"{self.display_label} ({self.form.form_name})"
+        # If no representative field was found, fall back to a more informative default.
         return f"Submission for {self.form.form_name} (ID: {self.id})"
 
+    def refresh_snapshot(self, save=True):
+        """Rebuilds `snapshot` and `display_label` from the SubmissionData rows."""
+        self.snapshot = dict(self.data_entries.values_list('field_name', 'field_value'))
+        self.display_label = representative_value(self.snapshot)
+        if save:
+            self.save(update_fields=['snapshot', 'display_label'])
+
 # 4. Submission Data Model (NEW - Replaces Dynamic Tables)
 # This stores the actual key-value pairs of the submitted data.
 class SubmissionData(models.Model):
@@ -156,3 +197,237 @@ class ChildRelationship(models.Model):
 
     def __str__(self):
         return f"{self.source_submission} -> {self.target_submission} ({self.relationship_type})"
+
+# 6. Export Job Model
+# A queued CSV/Excel/PDF export, built in the background by the
+# `run_export_worker` management command and downloaded later.
+class ExportJob(models.Model):
+    FORMAT_CHOICES = (
+        ('csv', 'CSV'),
+        ('xlsx', 'Excel'),
+        ('pdf', 'PDF'),
+    )
+    STATUS_CHOICES = (
+        ('pending', 'Pending'),
+        ('running', 'Running'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    )
+    form = models.ForeignKey(Form, on_delete=models.CASCADE, related_name='export_jobs')
+    requested_by = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True)
+    export_format = models.CharField(max_length=10, choices=FORMAT_CHOICES)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
+    rows_total = models.PositiveIntegerField(default=0)
+    rows_done = models.PositiveIntegerField(default=0)
+    file = models.FileField(upload_to='exports/', blank=True)
+    error = models.TextField(blank=True)
+    # The state of the form's data the file was built from. If none of these has
+    # changed, a repeat request for the same form and format reuses this file.
+    last_submission_id = models.BigIntegerField(null=True, blank=True)
+    submission_count = models.PositiveIntegerField(default=0)
+    data_version = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [models.Index(fields=['form', 'export_format', 'status'])]
+
+    @property
+    def progress(self):
+        """Percentage of rows written so far."""
+        if self.status == 'done':
+            return 100
+        if not self.rows_total:
+            return 0
+        return min(100, int(self.rows_done * 100 / self.rows_total))
+
+    def __str__(self):
+        return f"{self.get_export_format_display()} export of {self.form.form_name} ({self.get_status_display()})"
+
+# 7. Analytics aggregates
+# Maintained by core.analytics as submissions are written, so the analytics
+# dashboard can chart a form without reading its submissions.
+class FieldStats(models.Model):
+    """Running count/min/max/sum of the numeric values of one field."""
+    form = models.ForeignKey(Form, on_delete=models.CASCADE, related_name='field_stats')
+    field_name = models.CharField(max_length=255)
+    count = models.PositiveIntegerField(default=0)
+    min_value = models.FloatField(null=True, blank=True)
+    max_value = models.FloatField(null=True, blank=True)
+    sum_value = models.FloatField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ('form', 'field_name')
+
+    def __str__(self):
+        return f"{self.form.form_name} / {self.field_name}: {self.count} value(s)"
+
+class FieldBucket(models.Model):
+    """How many submissions fall into one bucket (value range, option or day) of one field."""
+    KIND_CHOICES = (
+        ('numeric', 'Numeric range'),
+        ('category', 'Category'),
+        ('date', 'Day'),
+    )
+    form = models.ForeignKey(Form, on_delete=models.CASCADE, related_name='field_buckets')
+    field_name = models.CharField(max_length=255)
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+    bucket = models.CharField(max_length=255)
+    count = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ('form', 'field_name', 'bucket')
+
+    def __str__(self):
+        return f"{self.form.form_name} / {self.field_name} = {self.bucket}: {self.count}"
+
+# 8. AI generation cache
+class AIGenerationCacheEntry(models.Model):
+    """A stored LLM answer for one normalized form description (see core.ai_cache)."""
+    # sha256 of the model name, prompt version and normalized description.
+    key = models.CharField(max_length=64, unique=True)
+    normalized_description = models.TextField()
+    model_name = models.CharField(max_length=100)
+    prompt_version = models.PositiveIntegerField()
+    fields = models.JSONField()
+    hits = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    last_used_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    class Meta:
+        verbose_name = 'AI generation cache entry'
+        verbose_name_plural = 'AI generation cache entries'
+
+    def __str__(self):
+        return f"{self.normalized_description[:60]} ({self.model_name})"
+
+# 9. Usage counters
+class UsageCounter(models.Model):
+    """A named, persistent counter (e.g. AI cache hits), shared by all server processes."""
+    name = models.CharField(max_length=100, unique=True)
+    value = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['name']
+
+    def __str__(self):
+        return f"{self.name}: {self.value}"
+
+    @classmethod
+    def increment(cls, name, amount=1):
+        """Adds `amount` to the counter, creating it if needed, in one atomic statement."""
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"""
+                INSERT INTO {cls._meta.db_table} AS t (name, value, updated_at) VALUES (%s, %s, NOW())
+                ON CONFLICT (name) DO UPDATE SET value = t.value + EXCLUDED.value, updated_at = NOW()
+                """,
+                [name, amount],
+            )
+
+    @classmethod
+    def current_values(cls, prefix=''):
+        """Returns {name: value} for the counters whose name starts with `prefix`."""
+        return dict(cls.objects.filter(name__startswith=prefix).values_list('name', 'value'))
+
+# 10. Request profiles
+class RequestProfile(models.Model):
+    """
+    A cProfile report and the SQL statements of one request that a staff user asked
+    to profile (see core.profiling). Only the newest REQUEST_PROFILE_BUFFER_SIZE are kept.
+    """
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True)
+    method = models.CharField(max_length=10)
+    path = models.TextField()
+    view_name = models.CharField(max_length=255, blank=True)
+    status_code = models.PositiveSmallIntegerField()
+    duration_ms = models.FloatField()
+    sql_count = models.PositiveIntegerField()
+    sql_ms = models.FloatField()
+    # [{'sql': ..., 'ms': ...}] in execution order.
+    sql_statements = models.JSONField(default=list)
+    # pstats output, sorted by cumulative time.
+    profile = models.TextField()
+
+    class Meta:
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"{self.method} {self.path} ({self.duration_ms:.0f} ms)"
+
+# 11. Import jobs
+# A CSV/Excel file of submissions being loaded into a form in the background by
+# the `run_import_worker` command (see core.imports).
+class ImportJob(models.Model):
+    FORMAT_CHOICES = (
+        ('csv', 'CSV'),
+        ('xlsx', 'Excel'),
+    )
+    STATUS_CHOICES = (
+        ('uploaded', 'Waiting for column mapping'),
+        ('pending', 'Pending'),
+        ('running', 'Running'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    )
+    form = models.ForeignKey(Form, on_delete=models.CASCADE, related_name='import_jobs')
+    requested_by = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True)
+    file = models.FileField(upload_to='imports/')
+    file_format = models.CharField(max_length=10, choices=FORMAT_CHOICES)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='uploaded')
+    # The file's header row, and {column: field name} for the columns to import.
+    columns = models.JSONField(default=list)
+    column_mapping = models.JSONField(default=dict)
+    rows_total = models.PositiveIntegerField(default=0)
+    rows_done = models.PositiveIntegerField(default=0)
+    rows_imported = models.PositiveIntegerField(default=0)
+    rows_failed = models.PositiveIntegerField(default=0)
+    # [{'row': ..., 'column': ..., 'message': ...}] for rows that were skipped (capped).
+    row_errors = models.JSONField(default=list)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [models.Index(fields=['status', 'created_at'])]
+
+    @property
+    def progress(self):
+        """Percentage of rows processed so far."""
+        if self.status == 'done':
+            return 100
+        if not self.rows_total:
+            return 0
+        return min(100, int(self.rows_done * 100 / self.rows_total))
+
+    def __str__(self):
+        return f"{self.get_file_format_display()} import into {self.form.form_name} ({self.get_status_display()})"
+
+# 12. API tokens
+class ApiToken(models.Model):
+    """
+    A key that lets a machine client (a kiosk, an integration) call the JSON API as
+    `user`. Only a SHA-256 hash of the key is stored; see core.api_tokens.
+    """
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='api_tokens')
+    name = models.CharField(max_length=100, help_text="What the token is used for, e.g. 'Lobby kiosk'.")
+    # The first characters of the key, to tell tokens apart without storing the key.
+    key_prefix = models.CharField(max_length=8)
+    key_hash = models.CharField(max_length=64, unique=True)
+    is_active = models.BooleanField(default=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    last_used_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"{self.name} ({self.key_prefix}...)"
@@ -0,0 +1,191 @@
+# core/pagination.py (NEW FILE)
+"""
+Keyset pagination, sorting and per-column filtering for a form's submission table.
+
+Instead of OFFSET pages, each page link carries a cursor holding the sort value and
+id of the row it starts after (or before), so fetching any page costs one query
+that reads only the visible rows, however deep into the table the user is.
+"""
+import base64
+import json
+from datetime import datetime
+
+from django.db.models import Case, F, FloatField, Q, TextField, Value, When
+from django.db.models.functions import Cast, Coalesce
+from django.utils import timezone
+
+from .matrix import NUMERIC_PATTERN, annotate_matrix, column_aliases
+from .models import SubmissionData
+from .schema import get_form_schema
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+
+def encode_cursor(sort_value, submission_id):
+    if isinstance(sort_value, datetime):
+        sort_value = sort_value.isoformat()
+    raw = json.dumps([sort_value, submission_id]).encode()
+    return base64.urlsafe_b64encode(raw).decode()
+
+
+def decode_cursor(cursor):
+    """Returns (sort_value, submission_id), or None if the cursor is missing or malformed."""
+    if not cursor:
+        return None
+    try:
+        sort_value, submission_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return sort_value, int(submission_id)
+    except (ValueError, TypeError):
+        return None
+
+
+class SubmissionTable:
+    """
+    One page of a form's submissions, driven by the request's GET parameters:
+
+    - `sort`: a field name from `Form.fields` (default: submission time)
+    - `dir`: 'asc' or 'desc' (default 'desc')
+    - `f<index>`: a case-insensitive "contains" filter on the field at that index
+    - `q`: search across all values of the submission
+    - `after` / `before`: cursors from the previous page's links
+    - `per_page`: page size, up to MAX_PAGE_SIZE
+    """
+
+    def __init__(self, form, params, extra_fields=('submitted_at', 'parent_submission_id')):
+        self.form = form
+        self.params = params
+        schema = get_form_schema(form)
+        self.fields = schema.fields
+        self.field_names = schema.field_names
+        self.extra_fields = extra_fields
+
+        self.sort = params.get('sort') if params.get('sort') in self.field_names else None
+        self.direction = 'asc' if params.get('dir') == 'asc' else 'desc'
+        self.search_query = params.get('q') or None
+        self.filters = {
+            index: params[f'f{index}'] for index in range(len(self.fields)) if params.get(f'f{index}')
+        }
+        try:
+            self.per_page = max(1, min(int(params.get('per_page', DEFAULT_PAGE_SIZE)), MAX_PAGE_SIZE))
+        except (TypeError, ValueError):
+            self.per_page = DEFAULT_PAGE_SIZE
+
+    def _sort_expression(self):
+        """The expression rows are ordered by; NULLs are coalesced so keyset comparisons stay exact."""
+        if self.sort is None:
+            return F('submitted_at')
+        index = self.field_names.index(self.sort)
+        alias = f'c{index}'
+        if self.fields[index].is_numeric:
+            numeric = Case(
+                When(**{f'{alias}__regex': NUMERIC_PATTERN}, then=Cast(F(alias), FloatField())),
+                default=Value(None, output_field=FloatField()),
+            )
+            return Coalesce(numeric, Value(float('-inf')), output_field=FloatField())
+        return Coalesce(F(alias), Value(''), output_field=TextField())
+
+    def _cursor_value(self, raw_value):
+        """
+        Converts a decoded cursor's sort value to the type of the sort expression.
+        Raises ValueError or TypeError if it does not fit, e.g. a tampered cursor.
+        """
+        if self.sort is None:
+            if not isinstance(raw_value, str):
+                raise TypeError('Submission time cursors hold an ISO datetime.')
+            value = datetime.fromisoformat(raw_value)
+            if timezone.is_naive(value):
+                raise ValueError('Submission time cursors carry a UTC offset.')
+            return value
+        if self.fields[self.field_names.index(self.sort)].is_numeric:
+            if isinstance(raw_value, bool) or not isinstance(raw_value, (int, float)):
+                raise TypeError('Numeric column cursors hold a number.')
+            return float(raw_value)
+        if not isinstance(raw_value, str):
+            raise TypeError('Text column cursors hold a string.')
+        return raw_value
+
+    def _base_queryset(self):
+        submissions = self.form.submissions.all()
+        if self.search_query:
+            matching = SubmissionData.objects.filter(
+                submission__form=self.form, field_value__icontains=self.search_query
+            )
+            submissions = submissions.filter(id__in=matching.values('submission_id'))
+
+        matrix = annotate_matrix(self.form, self.field_names, submissions=submissions).annotate(
+            sort_value=self._sort_expression()
+        )
+        for index, value in self.filters.items():
+            matrix = matrix.filter(**{f'c{index}__icontains': value})
+        return matrix.values_list('sort_value', 'id', *self.extra_fields, *column_aliases(self.field_names))
+
+    def _decode(self, cursor):
+        """Like decode_cursor, but also None if the sort value does not fit the current sort."""
+        cursor = decode_cursor(cursor)
+        if cursor is None:
+            return None
+        sort_value, submission_id = cursor
+        try:
+            return self._cursor_value(sort_value), submission_id
+        except (ValueError, TypeError):
+            return None
+
+    def page(self):
+        """
+        Runs the single query for this page. Returns a dict with the visible `rows`
+        (tuples of `(*extra_fields, *field_values)`) and the cursors for the
+        neighbouring pages (None when there is no such page).
+        """
+        after = self._decode(self.params.get('after'))
+        before = self._decode(self.params.get('before')) if after is None else None
+        descending = self.direction == 'desc'
+        # Walking backwards from a `before` cursor means reading in the opposite order.
+        reverse = before is not None
+        read_descending = descending != reverse
+
+        queryset = self._base_queryset()
+        cursor = after or before
+        if cursor is not None:
+            sort_value, last_id = cursor
+            lookup = 'lt' if read_descending else 'gt'
+            queryset = queryset.filter(
+                Q(**{f'sort_value__{lookup}': sort_value})
+                | Q(sort_value=sort_value, **{f'id__{lookup}': last_id})
+            )
+
+        ordering = ['-sort_value', '-id'] if read_descending else ['sort_value', 'id']
+        rows = list(queryset.order_by(*ordering)[:self.per_page + 1])
+        has_more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        if reverse:
+            rows.reverse()
+
+        next_cursor = prev_cursor = None
+        if rows:
+            first, last = rows[0], rows[-1]
+            # Coming back from a later page there is always a next page; otherwise
+            # there is one if the query found more rows than fit on this page.
+            if reverse or has_more:
+                next_cursor = encode_cursor(last[0], last[1])
+            if has_more if reverse else after is not None:
+                prev_cursor = encode_cursor(first[0], first[1])
+
+        return {
+            'rows': [row[2:] for row in rows],
+            'next_cursor': next_cursor,
+            'prev_cursor': prev_cursor,
+        }
+
+    def columns(self):
+        """Header metadata for the template: name, filter parameter/value and sort state."""
+        return [
+            {
+                'name': name,
+                'filter_param': f'f{index}',
+                'filter_value': self.filters.get(index, ''),
+                'is_sorted': self.sort == name,
+                'next_dir': 'asc' if self.sort == name and self.direction == 'desc' else 'desc',
+            }
+            for index, name in enumerate(self.field_names)
+        ]
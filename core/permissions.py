@@ -0,0 +1,64 @@
+# core/permissions.py (NEW FILE)
+"""
+Resolves a user's effective permission level on a form.
+
+The level is worked out once per request: `resolve_form_permission` loads the Form,
+attaches it to the request as `request.form` (with the level as
+`request.form_permission`), and later calls for the same form reuse both.
+
+Global admins and the form's creator always get 'admin'. Both checks read the
+user and form already loaded for this request, so a change of role or creator
+takes effect on the next request. Only the FormPermission lookup is cached
+across requests, in Django's cache, and the signal receivers in core/signals.py
+drop a cached entry whenever its FormPermission row is saved or deleted.
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.shortcuts import get_object_or_404
+
+from .models import Form, FormPermission
+
+# Stored in the cache when the user has no FormPermission row, so that is cached too.
+NO_PERMISSION = ''
+
+
+def _cache_key(form_id, user_id):
+    return f'core:form-permission:{form_id}:{user_id}'
+
+
+def granted_permission_level(form_id, user_id):
+    """Returns the level granted by the user's FormPermission row for the form, or None."""
+    key = _cache_key(form_id, user_id)
+    level = cache.get(key)
+    if level is None:
+        level = FormPermission.objects.filter(form_id=form_id, user_id=user_id).values_list(
+            'permission_level', flat=True
+        ).first() or NO_PERMISSION
+        cache.set(key, level, getattr(settings, 'FORM_PERMISSION_CACHE_TIMEOUT', 60))
+    return level or None
+
+
+def forget_permission_level(form_id, user_id):
+    cache.delete(_cache_key(form_id, user_id))
+
+
+def effective_permission_level(user, form):
+    """Returns 'admin', 'editor', 'viewer' or None for `user` on `form`."""
+    if not user.is_authenticated:
+        return None
+    if user.role == 'admin' or form.created_by_id == user.pk:
+        return 'admin'
+    return granted_permission_level(form.pk, user.pk)
+
+
+def resolve_form_permission(request, form_id):
+    """
+    Returns (form, level) for the current user, raising Http404 if the form does not
+    exist. The result is kept on the request, so the form is only loaded once.
+    """
+    form = getattr(request, 'form', None)
+    if form is None or str(form.pk) != str(form_id):
+        form = get_object_or_404(Form, pk=form_id)
+        request.form = form
+        request.form_permission = effective_permission_level(request.user, form)
+    return form, request.form_permission
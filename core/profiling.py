@@ -0,0 +1,150 @@
+# core/profiling.py (NEW FILE)
+"""
+Opt-in profiling of single requests, for staff users.
+
+Add `?_profile=1` to a URL, or send an `X-Profile: 1` header, while logged in as
+a staff user. RequestProfilerMiddleware then runs the rest of the request under
+cProfile and captures every SQL statement with its duration. It stores both as a
+RequestProfile (listed in the admin) and returns the profile's id in an
+`X-Profile-Id` response header. Only the newest REQUEST_PROFILE_BUFFER_SIZE
+profiles are kept, like a ring buffer.
+
+Requests without the trigger only pay for two dictionary lookups. The user is not
+even loaded for them. The middleware runs natively in sync and async stacks. Under
+ASGI the profiler only sees the event loop thread: sync views run in a worker
+thread and show up as the time spent waiting for it, and other requests served by
+the loop meanwhile are included. A streaming response is only profiled until the
+stream starts.
+"""
+import cProfile
+import io
+import pstats
+import time
+from contextlib import contextmanager
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+
+from .metrics import observe_queries
+from .models import RequestProfile
+
+TRIGGER_HEADER = 'HTTP_X_PROFILE'
+TRIGGER_PARAMETER = '_profile'
+# Lines of pstats output and SQL statements kept per profile.
+PROFILE_STAT_LINES = 80
+MAX_CAPTURED_STATEMENTS = 1000
+MAX_STATEMENT_LENGTH = 4000
+
+
+class _SQLRecorder:
+    """An execute_wrapper that keeps each statement and how long it took."""
+
+    def __init__(self):
+        self.statements = []
+        self.count = 0
+        self.seconds = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - started
+            self.count += 1
+            self.seconds += elapsed
+            if len(self.statements) < MAX_CAPTURED_STATEMENTS:
+                self.statements.append({'sql': sql[:MAX_STATEMENT_LENGTH], 'ms': round(elapsed * 1000, 3)})
+
+
+def profiling_requested(request):
+    """Whether the request carries the profiling trigger (the user is not checked here)."""
+    if TRIGGER_HEADER in request.META:
+        return True
+    query_string = request.META.get('QUERY_STRING', '')
+    # The substring test keeps the common case cheap; the parameter name must then
+    # match exactly, so e.g. ?user_profile=3 does not trigger a profile.
+    return TRIGGER_PARAMETER in query_string and any(
+        part.partition('=')[0] == TRIGGER_PARAMETER for part in query_string.split('&')
+    )
+
+
+def trim_profiles():
+    """Deletes all but the newest REQUEST_PROFILE_BUFFER_SIZE profiles."""
+    keep = getattr(settings, 'REQUEST_PROFILE_BUFFER_SIZE', 100)
+    stale = list(RequestProfile.objects.order_by('-created_at', '-id').values_list('id', flat=True)[keep:])
+    if stale:
+        RequestProfile.objects.filter(id__in=stale).delete()
+
+
+@contextmanager
+def _profiling(recorder, profiler):
+    """Records every SQL statement with `recorder` and runs `profiler` while active."""
+    with observe_queries(recorder):
+        profiler.enable()
+        try:
+            yield
+        finally:
+            profiler.disable()
+
+
+class RequestProfilerMiddleware:
+    """
+    Profiles requests from staff users that ask for it (see module docstring).
+    Works in both sync and async stacks, so under ASGI it does not force Django to
+    run async views in a thread.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        if not profiling_requested(request) or not request.user.is_staff:
+            return self.get_response(request)
+
+        recorder, profiler = _SQLRecorder(), cProfile.Profile()
+        started = time.perf_counter()
+        with _profiling(recorder, profiler):
+            response = self.get_response(request)
+        self._store(request, request.user, response, recorder, profiler, time.perf_counter() - started)
+        return response
+
+    async def __acall__(self, request):
+        if not profiling_requested(request):
+            return await self.get_response(request)
+        user = await request.auser()
+        if not user.is_staff:
+            return await self.get_response(request)
+
+        recorder, profiler = _SQLRecorder(), cProfile.Profile()
+        started = time.perf_counter()
+        with _profiling(recorder, profiler):
+            response = await self.get_response(request)
+        await sync_to_async(self._store)(request, user, response, recorder, profiler, time.perf_counter() - started)
+        return response
+
+    @staticmethod
+    def _store(request, user, response, recorder, profiler, duration):
+        report = io.StringIO()
+        pstats.Stats(profiler, stream=report).sort_stats('cumulative').print_stats(PROFILE_STAT_LINES)
+        match = getattr(request, 'resolver_match', None)
+        profile = RequestProfile.objects.create(
+            user=user,
+            method=request.method,
+            path=request.get_full_path(),
+            view_name=match.view_name if match else '',
+            status_code=response.status_code,
+            duration_ms=duration * 1000,
+            sql_count=recorder.count,
+            sql_ms=recorder.seconds * 1000,
+            sql_statements=recorder.statements,
+            profile=report.getvalue(),
+        )
+        trim_profiles()
+        response['X-Profile-Id'] = str(profile.pk)
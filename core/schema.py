@@ -0,0 +1,156 @@
+# core/schema.py (NEW FILE)
+"""
+Compiled form schemas.
+
+`Form.fields` is a JSON list of field definitions. Reading a submission, validating
+it, exporting it or charting it all need the same facts about those fields (names
+in order, which ones are multi-value or file uploads, their options and type
+checkers). `get_form_schema(form)` works them out once per form version and keeps
+the result in a small per-process LRU cache, with Django's cache as a shared
+second level so other server processes can reuse it too.
+
+The cache key includes the form's id, version and `updated_at`, so editing a form
+(which saves it and bumps `updated_at`) makes the old schema unreachable.
+"""
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import date, datetime, time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.validators import URLValidator, validate_email
+
+# Field types whose POSTed value is a list, stored as a JSON string.
+MULTI_VALUE_TYPES = ['MULTISELECT']
+# Field types that must match one of the field's declared options.
+SINGLE_CHOICE_TYPES = ['SELECT', 'RADIO']
+NUMERIC_TYPES = ['INTEGER', 'FLOAT', 'RANGE']
+
+
+def is_multi_value_field(field):
+    """MULTISELECT fields and CHECKBOX groups (a CHECKBOX with options) hold several values."""
+    field_type = field.get('type')
+    return field_type in MULTI_VALUE_TYPES or (field_type == 'CHECKBOX' and 'options' in field)
+
+
+def _check_integer(value):
+    int(value)
+
+
+def _check_float(value):
+    float(value)
+
+
+def _check_url(value):
+    URLValidator()(value)
+
+
+# One checker per field type. Each raises ValueError or ValidationError on bad input.
+TYPE_CHECKERS = {
+    'INTEGER': (_check_integer, "Enter a whole number."),
+    'FLOAT': (_check_float, "Enter a number."),
+    'RANGE': (_check_float, "Enter a number."),
+    'EMAIL': (validate_email, "Enter a valid email address."),
+    'URL': (_check_url, "Enter a valid URL."),
+    'DATE': (date.fromisoformat, "Enter a valid date (YYYY-MM-DD)."),
+    'DATETIME': (datetime.fromisoformat, "Enter a valid date and time."),
+    'TIME': (time.fromisoformat, "Enter a valid time (HH:MM)."),
+}
+
+
+@dataclass(frozen=True)
+class CompiledField:
+    name: str
+    type: str
+    index: int
+    is_multi_value: bool
+    is_file: bool
+    is_numeric: bool
+    is_single_choice: bool
+    options: tuple
+    option_set: frozenset
+
+    @property
+    def checker(self):
+        """The (check, message) pair for this field's type, or None."""
+        return TYPE_CHECKERS.get(self.type)
+
+
+class FormSchema:
+    """The precomputed view of one version of a form's `fields` JSON."""
+
+    def __init__(self, form):
+        self.form_id = form.pk
+        self.version = form.version
+        self.definitions = list(form.fields)
+        self.fields = []
+        for index, field in enumerate(self.definitions):
+            options = tuple(str(option) for option in field.get('options') or [])
+            self.fields.append(CompiledField(
+                name=field['name'],
+                type=field.get('type'),
+                index=index,
+                is_multi_value=is_multi_value_field(field),
+                is_file=field.get('type') == 'FILE',
+                is_numeric=field.get('type') in NUMERIC_TYPES,
+                is_single_choice=field.get('type') in SINGLE_CHOICE_TYPES,
+                options=options,
+                option_set=frozenset(options),
+            ))
+        self.field_names = [field.name for field in self.fields]
+        self.by_name = {field.name: field for field in self.fields}
+        self.definitions_by_name = {field['name']: field for field in self.definitions}
+        # Column order used by every export: the form's fields, then the submission time.
+        self.export_headers = [*self.field_names, 'submitted_at']
+
+
+class _LRUCache:
+    """A small thread-safe LRU mapping; the oldest entries are dropped past `max_size`."""
+
+    def __init__(self, max_size):
+        self.max_size = max_size
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+_local_schemas = _LRUCache(getattr(settings, 'FORM_SCHEMA_CACHE_SIZE', 256))
+
+
+def _schema_cache_key(form):
+    return f'core:form-schema:{form.pk}:{form.version}:{form.updated_at.timestamp()}'
+
+
+def get_form_schema(form):
+    """Returns the compiled FormSchema for `form`, building it at most once per version."""
+    if form.pk is None or form.updated_at is None:
+        # Unsaved forms have no stable key; just compile them.
+        return FormSchema(form)
+
+    key = _schema_cache_key(form)
+    schema = _local_schemas.get(key)
+    if schema is None:
+        schema = cache.get(key)
+        if schema is None:
+            schema = FormSchema(form)
+            cache.set(key, schema, getattr(settings, 'FORM_SCHEMA_CACHE_TIMEOUT', 24 * 60 * 60))
+        _local_schemas.set(key, schema)
+    return schema
@@ -0,0 +1,40 @@
+# core/signals.py (NEW FILE)
+# Deletes are deliberately not handled here: a post_delete receiver on SubmissionData or
+# FormSubmission would stop Django from deleting their rows with a single DELETE. Code
+# that deletes them uses the helpers in core.submissions, which fix up the counters
+# and snapshots afterwards.
+from functools import partial
+
+from django.db import transaction
+from django.db.models import F
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import Form, FormPermission, SubmissionData
+from .permissions import forget_permission_level
+
+
+@receiver(post_save, sender=SubmissionData)
+def refresh_submission_snapshot(sender, instance, raw=False, **kwargs):
+    """
+    Keeps the submission's snapshot and display label in sync when a single
+    SubmissionData row is saved outside the bulk write path (e.g. from the admin).
+    """
+    if raw:
+        return
+    instance.submission.refresh_snapshot()
+    # The aggregates still count the old value; have them rebuilt.
+    Form.objects.filter(pk=instance.submission.form_id).update(
+        analytics_ready=False, data_version=F('data_version') + 1
+    )
+
+
+@receiver(post_save, sender=FormPermission)
+@receiver(post_delete, sender=FormPermission)
+def forget_cached_permission(sender, instance, **kwargs):
+    """
+    Drops the cached FormPermission lookup so the new level applies on the next request.
+    Done after commit: dropping it earlier would let a concurrent request cache the old
+    row again before the change is visible.
+    """
+    transaction.on_commit(partial(forget_permission_level, instance.form_id, instance.user_id))
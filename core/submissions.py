@@ -0,0 +1,326 @@
+# core/submissions.py (NEW FILE)
+"""
+The single write path for form submissions.
+
+Every view that stores submission data goes through this module so the whole
+payload is validated against `Form.fields` up front and the `FormSubmission`
+plus all of its `SubmissionData` rows are written in one atomic batch.
+"""
+import json
+
+from django.core.exceptions import ValidationError
+from django.db import connection, transaction
+from django.db.models import Count, F, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from .analytics import record_submissions
+from .models import Form, FormSubmission, SubmissionData, representative_value
+from .schema import get_form_schema
+
+
+def extract_submission_values(form, request):
+    """
+    Reads the values for every field defined on `form` out of the request.
+    Returns a dict of {field_name: field_value} ready for `write_submission`.
+    """
+    values = {}
+    for field in get_form_schema(form).fields:
+        field_name = field.name
+
+        # Handle file uploads
+        if field.is_file:
+            if field_name in request.FILES:
+                uploaded_file = request.FILES[field_name]
+                # NOTE: In a production app, you would save this file to a proper
+                # media storage (like S3 or local MEDIA_ROOT) and store its path.
+                # For now, we save the filename and size as a record.
+                values[field_name] = f"Uploaded: {uploaded_file.name} ({uploaded_file.size} bytes)"
+            continue
+
+        # Handle standard POST data
+        if field_name in request.POST:
+            if field.is_multi_value:
+                # We store the list of values as a JSON string in the database
+                values[field_name] = json.dumps(request.POST.getlist(field_name))
+            else:
+                values[field_name] = request.POST.get(field_name)
+    return values
+
+
+def validate_field_value(field, value):
+    """Returns an error message for `value`, or None if it is acceptable for the compiled `field`."""
+    if value in (None, ''):
+        # Empty values are stored as-is; the templates handle required fields.
+        return None
+
+    if field.is_multi_value:
+        try:
+            selected = json.loads(value)
+        except (TypeError, ValueError):
+            return "Expected a list of values."
+        if not isinstance(selected, list):
+            return "Expected a list of values."
+        invalid = [str(item) for item in selected if field.options and str(item) not in field.option_set]
+        if invalid:
+            return f"Invalid choice(s): {', '.join(invalid)}."
+        return None
+
+    if field.is_single_choice and field.options and str(value) not in field.option_set:
+        return f"'{value}' is not one of the available options."
+
+    checker = field.checker
+    if checker:
+        check, message = checker
+        try:
+            check(str(value))
+        except (ValueError, ValidationError):
+            return message
+    return None
+
+
+def validate_submission_values(form, values):
+    """
+    Validates a {field_name: field_value} payload against the form's field definitions.
+    Raises a ValidationError keyed by field name if anything is wrong, otherwise
+    returns the payload with every value converted to a string.
+    """
+    fields = get_form_schema(form).by_name
+    errors = {}
+    cleaned = {}
+
+    for field_name, value in values.items():
+        field = fields.get(field_name)
+        if field is None:
+            errors[field_name] = ["This field does not exist on the form."]
+            continue
+        if isinstance(value, (list, tuple)) and field.is_multi_value:
+            value = json.dumps([str(item) for item in value])
+        message = validate_field_value(field, value)
+        if message:
+            errors[field_name] = [message]
+            continue
+        cleaned[field_name] = '' if value is None else str(value)
+
+    if errors:
+        raise ValidationError(errors)
+    return cleaned
+
+
+def _parent_id_errors(form, parent_ids):
+    """
+    Checks that every referenced parent submission belongs to the form's parent form
+    (one query). Returns ({index: message} for the bad references, [int or None]
+    parent ids in the same order as `parent_ids`).
+    """
+    errors, cleaned = {}, []
+    for index, parent_id in enumerate(parent_ids):
+        if not parent_id:
+            cleaned.append(None)
+        elif not form.parent_form_id:
+            errors[index] = "This form does not have a parent form."
+            cleaned.append(None)
+        else:
+            try:
+                cleaned.append(int(parent_id))
+            except (TypeError, ValueError):
+                errors[index] = "Invalid parent record."
+                cleaned.append(None)
+
+    referenced = {parent_id for parent_id in cleaned if parent_id}
+    if referenced:
+        found = set(FormSubmission.objects.filter(
+            pk__in=referenced, form_id=form.parent_form_id
+        ).values_list('id', flat=True))
+        for index, parent_id in enumerate(cleaned):
+            if parent_id and parent_id not in found:
+                errors[index] = "The selected parent record does not exist."
+    return errors, cleaned
+
+
+def validate_submission_batch(form, batch):
+    """
+    Validates every (values, parent_submission_id) pair of `batch` on its own.
+    Returns (cleaned_batch, errors): the cleaned (values, parent_id) pairs for
+    `save_submissions`, and {index: {field_name: [messages]}} for the pairs that
+    failed, so callers can report on each item.
+    """
+    batch = list(batch)
+    cleaned_values, errors = [], {}
+    for index, (values, _) in enumerate(batch):
+        try:
+            cleaned_values.append(validate_submission_values(form, values))
+        except ValidationError as e:
+            errors[index] = e.message_dict
+            cleaned_values.append(None)
+
+    parent_errors, parent_ids = _parent_id_errors(form, [parent_id for _, parent_id in batch])
+    for index, message in parent_errors.items():
+        errors.setdefault(index, {})['parent_submission_id'] = [message]
+    return list(zip(cleaned_values, parent_ids)), errors
+
+
+def write_submissions(form, batch, submitted_by=None):
+    """
+    Validates and stores several submissions for `form` at once.
+
+    `batch` is a list of (values, parent_submission_id) pairs. If any of them is
+    invalid, a ValidationError for the first one is raised and nothing is stored;
+    otherwise see `save_submissions`.
+    Returns the created FormSubmission objects in the same order as `batch`.
+    """
+    cleaned_batch, errors = validate_submission_batch(form, batch)
+    if errors:
+        raise ValidationError(errors[min(errors)])
+    return save_submissions(form, cleaned_batch, submitted_by=submitted_by)
+
+
+def save_submissions(form, cleaned_batch, submitted_by=None):
+    """
+    Stores (values, parent_id) pairs already cleaned by `validate_submission_batch`.
+
+    Everything is written inside a single transaction: one INSERT for the
+    FormSubmission rows (which carry the `snapshot` copy of their values and their
+    `display_label`), one for all of their SubmissionData rows regardless of how
+    many fields the form has, one UPDATE of the form's `submission_count`, and the
+    upserts that add the batch to the form's analytics aggregates.
+    Returns the created FormSubmission objects in the same order as `cleaned_batch`.
+    """
+    submissions = [
+        FormSubmission(
+            form=form,
+            submitted_by=submitted_by,
+            parent_submission_id=parent_id,
+            snapshot=cleaned,
+            display_label=representative_value(cleaned),
+        )
+        for cleaned, parent_id in cleaned_batch
+    ]
+
+    with transaction.atomic():
+        # PostgreSQL returns the new primary keys from bulk_create.
+        FormSubmission.objects.bulk_create(submissions)
+        SubmissionData.objects.bulk_create([
+            SubmissionData(submission=submission, field_name=field_name, field_value=field_value)
+            for submission, (cleaned, _) in zip(submissions, cleaned_batch)
+            for field_name, field_value in cleaned.items()
+        ])
+        record_written_submissions(form, [cleaned for cleaned, _ in cleaned_batch])
+    return submissions
+
+
+def record_written_submissions(form, snapshots):
+    """
+    Adds newly written submissions (their {field_name: value} snapshots) to the
+    form's `submission_count` and, if they are complete, its analytics aggregates.
+    Must run in the transaction that wrote the submissions.
+    """
+    with connection.cursor() as cursor:
+        # Bumping the counter locks the form row, so the analytics flag read here
+        # cannot change before commit (see core.analytics.rebuild_form_aggregates).
+        cursor.execute(
+            f"UPDATE {Form._meta.db_table} SET submission_count = submission_count + %s, "
+            "data_version = data_version + 1 WHERE id = %s RETURNING analytics_ready",
+            [len(snapshots), form.pk],
+        )
+        row = cursor.fetchone()
+    if row and row[0]:
+        record_submissions(form, snapshots)
+
+
+def recount_submissions(form_ids):
+    """
+    Sets `submission_count` of the given forms to their real number of submissions
+    (one UPDATE), flags their analytics aggregates for a rebuild and bumps their
+    `data_version`.
+    """
+    actual_count = Coalesce(Subquery(
+        FormSubmission.objects.filter(form=OuterRef('pk'))
+        .order_by().values('form').annotate(total=Count('id')).values('total'),
+        output_field=IntegerField(),
+    ), 0)
+    Form.objects.filter(pk__in=form_ids).update(
+        submission_count=actual_count, analytics_ready=False, data_version=F('data_version') + 1
+    )
+
+
+def refresh_snapshots(submission_ids):
+    """
+    Rebuilds the snapshot and display label of the given submissions from their
+    SubmissionData rows, flags their forms' analytics aggregates for a rebuild and
+    bumps the forms' `data_version`.
+    """
+    submissions = list(FormSubmission.objects.filter(pk__in=submission_ids))
+    for submission in submissions:
+        submission.refresh_snapshot()
+    Form.objects.filter(pk__in={submission.form_id for submission in submissions}).update(
+        analytics_ready=False, data_version=F('data_version') + 1
+    )
+
+
+def delete_submission_data(entries):
+    """
+    Deletes a queryset of SubmissionData rows (single values of submissions) and
+    refreshes the snapshots of the submissions they belonged to.
+    """
+    with transaction.atomic():
+        submission_ids = set(entries.order_by().values_list('submission_id', flat=True).distinct())
+        deleted = entries.delete()
+        refresh_snapshots(submission_ids)
+    return deleted
+
+
+def _with_child_forms(form_ids):
+    """
+    `form_ids` plus every form holding child submissions of their submissions, at
+    any depth: deleting a submission cascades to its child submissions. One query
+    per level of the hierarchy.
+    """
+    affected = level = set(form_ids)
+    while level:
+        level = set(
+            FormSubmission.objects.filter(parent_submission__form_id__in=level)
+            .exclude(form_id__in=affected).values_list('form_id', flat=True).distinct()
+        )
+        affected = affected | level
+    return affected
+
+
+def delete_submissions(submissions):
+    """
+    Deletes a queryset of submissions, with their data and child submissions, and
+    recounts every form that lost rows. Use this rather than `.delete()`; the
+    counters are not maintained by signals (see core.signals).
+    """
+    with transaction.atomic():
+        form_ids = _with_child_forms(submissions.order_by().values_list('form_id', flat=True).distinct())
+        deleted = submissions.delete()
+        recount_submissions(form_ids)
+    return deleted
+
+
+def delete_forms(forms):
+    """
+    Deletes a queryset of forms (their child forms and submissions cascade) and
+    recounts the remaining forms whose submissions hung off the deleted ones.
+    """
+    with transaction.atomic():
+        form_ids = _with_child_forms(forms.order_by().values_list('id', flat=True))
+        deleted = forms.delete()
+        recount_submissions(form_ids)
+    return deleted
+
+
+def write_submission(form, values, submitted_by=None, parent_submission_id=None):
+    """Validates and stores a single submission. See `write_submissions`."""
+    return write_submissions(form, [(values, parent_submission_id)], submitted_by=submitted_by)[0]
+
+
+def validation_error_messages(error):
+    """Flattens a ValidationError from this module into 'Field: message' strings for display."""
+    if not hasattr(error, 'error_dict'):
+        return error.messages
+    return [
+        f"{field_name}: {message}"
+        for field_name, messages in error.message_dict.items()
+        for message in messages
+    ]
@@ -0,0 +1,186 @@
+# core/synthetic.py (NEW FILE)
+"""
+Synthetic workloads for benchmarking.
+
+`generate_workload` creates root forms with a mix of field types, trees of child
+forms below them, submissions for every form (child submissions point at a random
+submission of the parent form) and ChildRelationship edges between submissions
+that share a parent. Everything is written through core.submissions, so snapshots,
+labels, counters and analytics aggregates are the same as for real data.
+
+The same seed always produces the same forms and values. Synthetic forms are named
+with SYNTHETIC_PREFIX so `delete_synthetic_data` can remove them again.
+"""
+import random
+from dataclasses import dataclass, field as dataclass_field
+from datetime import date, datetime, timedelta
+
+from .models import ChildRelationship, CustomUser, Form, FormSubmission
+from .submissions import write_submissions
+
+SYNTHETIC_PREFIX = '[synthetic]'
+SYNTHETIC_OWNER = 'synthetic_admin'
+
+# Field types cycled through after the leading 'Name' field.
+FIELD_TYPE_CYCLE = [
+    'INTEGER', 'SELECT', 'FLOAT', 'DATE', 'EMAIL', 'MULTISELECT', 'RADIO', 'TEXTAREA',
+    'DATETIME', 'VARCHAR(255)', 'URL', 'CHECKBOX', 'PHONE', 'TIME', 'RANGE', 'COLOR',
+]
+CHOICE_OPTIONS = ['Alpha', 'Bravo', 'Charlie', 'Delta', 'Echo', 'Foxtrot']
+RELATIONSHIP_TYPES = ['mentor', 'sibling', 'partner']
+WORDS = ['north', 'river', 'maple', 'orbit', 'cedar', 'harbor', 'summit', 'violet', 'copper', 'meadow']
+
+
+@dataclass
+class SyntheticWorkload:
+    root_forms: list = dataclass_field(default_factory=list)
+    forms: list = dataclass_field(default_factory=list)
+    submissions: int = 0
+    relationships: int = 0
+
+
+def synthetic_fields(count):
+    """A 'Name' field followed by `count - 1` fields cycling through FIELD_TYPE_CYCLE."""
+    fields = [{'name': 'Name', 'type': 'VARCHAR(255)'}]
+    for index in range(1, count):
+        field_type = FIELD_TYPE_CYCLE[(index - 1) % len(FIELD_TYPE_CYCLE)]
+        field = {'name': f'{field_type.split("(")[0].title()} {index}', 'type': field_type}
+        if field_type in ('SELECT', 'RADIO', 'MULTISELECT'):
+            field['options'] = CHOICE_OPTIONS
+        fields.append(field)
+    return fields
+
+
+def synthetic_value(field, rng, number):
+    """A valid value for `field`; lists for multi-value fields, strings otherwise."""
+    field_type = field['type']
+    if field['name'] == 'Name':
+        return f'{rng.choice(WORDS).title()} {rng.choice(WORDS).title()} {number}'
+    if field_type == 'INTEGER':
+        return str(rng.randint(0, 1000))
+    if field_type in ('FLOAT', 'RANGE'):
+        return f'{rng.uniform(0, 100):.2f}'
+    if field_type in ('SELECT', 'RADIO'):
+        return rng.choice(field['options'])
+    if field_type == 'MULTISELECT':
+        return rng.sample(field['options'], rng.randint(1, 3))
+    if field_type == 'DATE':
+        return (date(2020, 1, 1) + timedelta(days=rng.randint(0, 5 * 365))).isoformat()
+    if field_type == 'DATETIME':
+        return (datetime(2020, 1, 1) + timedelta(minutes=rng.randint(0, 5 * 365 * 24 * 60))).isoformat()
+    if field_type == 'TIME':
+        return f'{rng.randint(0, 23):02d}:{rng.randint(0, 59):02d}'
+    if field_type == 'EMAIL':
+        return f'user{number}@example.com'
+    if field_type == 'URL':
+        return f'https://example.com/{rng.choice(WORDS)}/{number}'
+    if field_type == 'CHECKBOX':
+        return rng.choice(['on', ''])
+    if field_type == 'PHONE':
+        return f'+1-555-{rng.randint(0, 9999):04d}'
+    if field_type == 'COLOR':
+        return f'#{rng.randint(0, 0xFFFFFF):06x}'
+    if field_type == 'TEXTAREA':
+        return ' '.join(rng.choice(WORDS) for _ in range(rng.randint(5, 30)))
+    return rng.choice(WORDS)
+
+
+def synthetic_owner():
+    """The global admin that owns (and can see) all synthetic forms."""
+    owner, created = CustomUser.objects.get_or_create(
+        username=SYNTHETIC_OWNER, defaults={'role': 'admin', 'email': 'synthetic@example.com'}
+    )
+    if created:
+        owner.set_unusable_password()
+        owner.save(update_fields=['password'])
+    return owner
+
+
+def _write_form_submissions(form, count, rng, parent_ids, owner, batch_size):
+    """Writes `count` submissions in batches; returns their ids."""
+    ids = []
+    for start in range(0, count, batch_size):
+        batch = [
+            ({field['name']: synthetic_value(field, rng, number) for field in form.fields},
+             rng.choice(parent_ids) if parent_ids else None)
+            for number in range(start, min(start + batch_size, count))
+        ]
+        ids.extend(submission.pk for submission in write_submissions(form, batch, submitted_by=owner))
+    return ids
+
+
+def _create_relationships(root_submission_ids, rng, count):
+    """Links pairs of child submissions that share a parent submission."""
+    children_by_parent = {}
+    for submission_id, parent_id in FormSubmission.objects.filter(
+        parent_submission_id__in=root_submission_ids
+    ).values_list('id', 'parent_submission_id').order_by('id'):
+        children_by_parent.setdefault(parent_id, []).append(submission_id)
+
+    candidates = [parent_id for parent_id, children in sorted(children_by_parent.items()) if len(children) > 1]
+    edges = []
+    for parent_id in rng.sample(candidates, min(count, len(candidates))):
+        source_id, target_id = rng.sample(children_by_parent[parent_id], 2)
+        edges.append(ChildRelationship(
+            parent_submission_id=parent_id,
+            source_submission_id=source_id,
+            target_submission_id=target_id,
+            relationship_type=rng.choice(RELATIONSHIP_TYPES),
+        ))
+    ChildRelationship.objects.bulk_create(edges, ignore_conflicts=True)
+    return len(edges)
+
+
+def generate_workload(forms=5, fields=12, submissions=1000, child_submissions=None, depth=1,
+                      children=2, relationships=50, seed=42, batch_size=1000, log=None):
+    """
+    Creates `forms` root forms with `fields` fields and `submissions` submissions each.
+    Below every form, `children` child forms are added for `depth` levels, each with
+    `child_submissions` submissions (default: `submissions`). For each root form, up
+    to `relationships` ChildRelationship edges are added between first-level child
+    submissions. Returns a SyntheticWorkload.
+    """
+    rng = random.Random(seed)
+    owner = synthetic_owner()
+    child_submissions = submissions if child_submissions is None else child_submissions
+    workload = SyntheticWorkload()
+
+    for root_number in range(forms):
+        root = Form.objects.create(
+            form_name=f'{SYNTHETIC_PREFIX} Form {root_number + 1}',
+            fields=synthetic_fields(fields), status='active', created_by=owner,
+        )
+        root_ids = _write_form_submissions(root, submissions, rng, None, owner, batch_size)
+        workload.root_forms.append(root)
+        workload.forms.append(root)
+        workload.submissions += len(root_ids)
+
+        level = [(root, root_ids)]
+        for level_number in range(1, depth + 1):
+            next_level = []
+            for parent, parent_ids in level:
+                for child_number in range(children):
+                    child = Form.objects.create(
+                        form_name=f'{parent.form_name} / Child {child_number + 1}',
+                        fields=synthetic_fields(max(2, fields // 2)), status='active',
+                        created_by=owner, parent_form=parent,
+                    )
+                    child_ids = _write_form_submissions(child, child_submissions, rng, parent_ids, owner, batch_size)
+                    workload.forms.append(child)
+                    workload.submissions += len(child_ids)
+                    next_level.append((child, child_ids))
+            level = next_level
+
+        if depth:
+            workload.relationships += _create_relationships(root_ids, rng, relationships)
+        if log:
+            log(f'{root.form_name}: {len(workload.forms)} forms, {workload.submissions} submissions so far')
+    return workload
+
+
+def delete_synthetic_data():
+    """Deletes every synthetic form (children and submissions cascade). Returns the number of forms."""
+    roots = Form.objects.filter(form_name__startswith=SYNTHETIC_PREFIX, parent_form__isnull=True)
+    count = Form.objects.filter(form_name__startswith=SYNTHETIC_PREFIX).count()
+    roots.delete()
+    return count
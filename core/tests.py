@@ -1,3 +1,1060 @@
-from django.test import TestCase
+import asyncio
+import csv
+import io
+import json
+import shutil
+import tempfile
+from datetime import timedelta
+from unittest import mock
 
-# Create your tests here.
+import pandas as pd
+from asgiref.sync import async_to_sync
+from openpyxl import Workbook, load_workbook
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import IntegrityError
+from django.db.models import F
+from django.db.models.signals import post_delete, pre_delete
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from .ai_cache import cache_stats, get_cached_fields, store_fields
+from .analytics import (
+    child_form_rollup, load_field_series, rebuild_form_aggregates, rebuild_stale_aggregates, render_chart,
+    render_form_charts, sql_field_series,
+)
+from .api_tokens import create_api_token
+from .exports import build_xlsx_export, claim_next_export_job, enqueue_export, iter_csv_lines, run_export_job
+from .fake_llm import FAKE_FIELDS, FakeLLMBehaviour, FakeOllamaServer
+from .imports import claim_next_import_job, run_import_job
+from .matrix import submission_matrix
+from .metrics import registry
+from .models import (
+    AIGenerationCacheEntry, ExportJob, FieldBucket, FieldStats, Form, FormPermission, FormSubmission, ImportJob,
+    RequestProfile, SubmissionData,
+)
+from .pagination import SubmissionTable, encode_cursor
+from .permissions import granted_permission_level, resolve_form_permission
+from .profiling import profiling_requested
+from .schema import get_form_schema
+from .submissions import delete_submission_data, delete_submissions, write_submission, write_submissions
+from .utils import (
+    ConcurrencyLimiter, IncrementalJSONArrayParser, astream_fields_with_llama, generate_fields_from_rules,
+    generate_fields_with_llama,
+)
+
+User = get_user_model()
+
+FIELDS = [
+    {'name': 'Name', 'type': 'VARCHAR(255)'},
+    {'name': 'Age', 'type': 'INTEGER'},
+    {'name': 'Color', 'type': 'SELECT', 'options': ['red', 'green', 'blue']},
+    {'name': 'Tags', 'type': 'MULTISELECT', 'options': ['a', 'b', 'c']},
+    {'name': 'Joined', 'type': 'DATE'},
+]
+
+PEOPLE = [
+    {'Name': 'Ann', 'Age': '34', 'Color': 'red', 'Tags': ['a'], 'Joined': '2026-01-05'},
+    {'Name': 'Bob', 'Age': '27', 'Color': 'green', 'Tags': ['a', 'b'], 'Joined': '2026-01-05'},
+    {'Name': 'Cleo', 'Age': '41', 'Color': 'red', 'Tags': [], 'Joined': '2026-02-11'},
+    {'Name': 'Dan', 'Age': '27', 'Color': 'blue', 'Tags': ['c'], 'Joined': '2026-03-01'},
+    {'Name': 'Eve', 'Age': '19', 'Color': 'red', 'Tags': ['b', 'c'], 'Joined': '2026-03-01'},
+]
+
+
+class FormTestCase(TestCase):
+    """Creates a form owned by `owner` plus an editor and a viewer with FormPermissions."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = User.objects.create_user('owner', password='pw', role='editor')
+        cls.editor = User.objects.create_user('editor', password='pw', role='editor')
+        cls.viewer = User.objects.create_user('viewer', password='pw', role='viewer')
+        cls.stranger = User.objects.create_user('stranger', password='pw', role='editor')
+        cls.form = Form.objects.create(form_name='People', fields=FIELDS, created_by=cls.owner, status='active')
+        FormPermission.objects.create(form=cls.form, user=cls.editor, permission_level='editor')
+        FormPermission.objects.create(form=cls.form, user=cls.viewer, permission_level='viewer')
+
+    def setUp(self):
+        # Permission levels, compiled schemas and charts are cached across requests.
+        cache.clear()
+
+    def add_people(self, people=PEOPLE, form=None):
+        form = form or self.form
+        return write_submissions(form, [(dict(person), None) for person in people])
+
+    def add_child_form(self, name, parent=None, status='active'):
+        return Form.objects.create(
+            form_name=name, fields=[{'name': name, 'type': 'VARCHAR(255)'}],
+            parent_form=parent or self.form, created_by=self.owner, status=status,
+        )
+
+    def refresh_form(self):
+        self.form.refresh_from_db()
+        return self.form
+
+
+class MediaRootMixin:
+    """Points MEDIA_ROOT at a temporary directory for tests that store files."""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.media_root = tempfile.mkdtemp()
+        cls.media_override = override_settings(MEDIA_ROOT=cls.media_root)
+        cls.media_override.enable()
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        cls.media_override.disable()
+        shutil.rmtree(cls.media_root, ignore_errors=True)
+
+
+class WriteSubmissionsTests(FormTestCase):
+    def test_writes_submissions_data_snapshot_and_counter(self):
+        submissions = self.add_people()
+
+        self.assertEqual([s.pk for s in submissions], sorted(s.pk for s in submissions))
+        ann = FormSubmission.objects.get(pk=submissions[0].pk)
+        self.assertEqual(ann.snapshot['Tags'], '["a"]')
+        self.assertEqual(ann.display_label, 'Ann')
+        self.assertEqual(
+            dict(ann.data_entries.values_list('field_name', 'field_value')), ann.snapshot,
+        )
+        self.assertEqual(self.refresh_form().submission_count, len(PEOPLE))
+
+    def test_invalid_value_is_rejected_by_field(self):
+        with self.assertRaises(ValidationError) as raised:
+            write_submission(self.form, {'Age': 'old', 'Color': 'purple', 'Nickname': 'x'})
+        self.assertEqual(set(raised.exception.message_dict), {'Age', 'Color', 'Nickname'})
+        self.assertFalse(FormSubmission.objects.exists())
+
+    def test_one_invalid_item_stores_nothing(self):
+        batch = [({'Name': 'Ann', 'Age': '3'}, None), ({'Name': 'Bob', 'Tags': ['z']}, None)]
+        with self.assertRaises(ValidationError) as raised:
+            write_submissions(self.form, batch)
+        self.assertIn('Tags', raised.exception.message_dict)
+        self.assertFalse(FormSubmission.objects.exists())
+        self.assertEqual(self.refresh_form().submission_count, 0)
+
+    def test_failed_insert_rolls_back_the_whole_batch(self):
+        with mock.patch.object(SubmissionData.objects, 'bulk_create', side_effect=IntegrityError('boom')):
+            with self.assertRaises(IntegrityError):
+                self.add_people()
+        self.assertFalse(FormSubmission.objects.exists())
+        self.assertFalse(FieldBucket.objects.filter(form=self.form).exists())
+        self.assertEqual(self.refresh_form().submission_count, 0)
+
+    def test_parent_must_belong_to_the_parent_form(self):
+        child = self.add_child_form('Pet')
+        person = self.add_people(PEOPLE[:1])[0]
+        other = write_submission(child, {'Pet': 'Rex'})
+
+        with self.assertRaises(ValidationError) as raised:
+            write_submission(child, {'Pet': 'Tom'}, parent_submission_id=other.pk)
+        self.assertIn('parent_submission_id', raised.exception.message_dict)
+
+        pet = write_submission(child, {'Pet': 'Tom'}, parent_submission_id=str(person.pk))
+        self.assertEqual(pet.parent_submission_id, person.pk)
+
+
+class ExportTests(FormTestCase):
+    def old_export_frame(self):
+        """The DataFrame the exports used to be built from, before they were streamed."""
+        data = []
+        for sub in self.form.submissions.order_by('id'):
+            row = {entry.field_name: entry.field_value for entry in sub.data_entries.order_by('id')}
+            row['submitted_at'] = sub.submitted_at
+            data.append(row)
+        return pd.DataFrame(data)
+
+    def test_streamed_csv_matches_the_old_export(self):
+        self.add_people()
+        self.client.force_login(self.editor)
+        response = self.client.get(reverse('export_csv', args=[self.form.pk]))
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        streamed = list(csv.reader(io.StringIO(b''.join(response.streaming_content).decode())))
+
+        expected = list(csv.reader(io.StringIO(self.old_export_frame().to_csv(index=False))))
+        self.assertEqual(streamed, expected)
+
+    def test_csv_chunks_cover_every_submission(self):
+        self.add_people()
+        lines = list(iter_csv_lines(self.form, chunk_size=2))
+        self.assertEqual(len(lines), len(PEOPLE) + 1)
+        self.assertEqual(lines[0], 'Name,Age,Color,Tags,Joined,submitted_at\r\n')
+
+    def test_streamed_xlsx_matches_the_old_export(self):
+        self.add_people()
+        self.client.force_login(self.editor)
+        response = self.client.get(reverse('export_excel', args=[self.form.pk]))
+        self.assertEqual(response.status_code, 200)
+        sheet = load_workbook(io.BytesIO(b''.join(response.streaming_content))).active
+        rows = list(sheet.iter_rows(values_only=True))
+
+        frame = self.old_export_frame()
+        self.assertEqual(list(rows[0]), list(frame.columns))
+        fields = frame.drop(columns='submitted_at')
+        self.assertEqual([list(row[:-1]) for row in rows[1:]], fields.values.tolist())
+        # Excel has no time zones: the submission time is written as naive local time.
+        for row, submitted_at in zip(rows[1:], frame['submitted_at']):
+            local = timezone.localtime(submitted_at.to_pydatetime()).replace(tzinfo=None)
+            self.assertLess(abs(row[-1] - local), timedelta(milliseconds=1))
+
+    def test_empty_form_has_nothing_to_export(self):
+        self.client.force_login(self.editor)
+        response = self.client.get(reverse('export_csv', args=[self.form.pk]))
+        self.assertEqual(response.status_code, 404)
+
+
+class ExportJobTests(MediaRootMixin, FormTestCase):
+    def run_worker(self):
+        job = claim_next_export_job()
+        self.assertIsNotNone(job)
+        return run_export_job(job)
+
+    def test_jobs_are_reused_until_the_data_changes(self):
+        self.add_people()
+        job = enqueue_export(self.form, 'csv', requested_by=self.owner)
+        self.assertEqual(enqueue_export(self.form, 'csv', requested_by=self.editor).pk, job.pk)
+
+        job = self.run_worker()
+        self.assertEqual(job.status, 'done')
+        self.assertEqual(job.rows_done, len(PEOPLE))
+        self.assertEqual(enqueue_export(self.form, 'csv').pk, job.pk)
+        self.assertNotEqual(enqueue_export(self.form, 'xlsx').pk, job.pk)
+
+        self.add_people(PEOPLE[:1])
+        self.assertNotEqual(enqueue_export(self.form, 'csv').pk, job.pk)
+
+    def test_edited_data_is_exported_again(self):
+        ann = self.add_people()[0]
+        enqueue_export(self.form, 'csv')
+        job = self.run_worker()
+
+        entry = ann.data_entries.get(field_name='Name')
+        entry.field_value = 'Anna'
+        entry.save()
+        # Same last id and count as before, but the file no longer matches the data.
+        self.assertNotEqual(enqueue_export(self.form, 'csv').pk, job.pk)
+
+    def test_stale_running_job_is_failed_and_replaced(self):
+        self.add_people()
+        job = enqueue_export(self.form, 'csv')
+        ExportJob.objects.filter(pk=job.pk).update(status='running', started_at=job.created_at - timedelta(days=1))
+
+        replacement = enqueue_export(self.form, 'csv')
+        self.assertNotEqual(replacement.pk, job.pk)
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'failed')
+
+    def test_download_is_limited_to_the_forms_editors(self):
+        self.add_people()
+        self.client.force_login(self.owner)
+        response = self.client.post(reverse('export_job_create', args=[self.form.pk]), {'format': 'csv'})
+        self.assertEqual(response.status_code, 202)
+        job = self.run_worker()
+        download_url = reverse('export_job_download', args=[job.pk])
+
+        self.client.force_login(self.editor)
+        response = self.client.get(download_url)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(b''.join(response.streaming_content).startswith(b'Name,Age'))
+
+        for user in (self.viewer, self.stranger):
+            self.client.force_login(user)
+            self.assertEqual(self.client.get(download_url).status_code, 404)
+            self.assertEqual(self.client.get(reverse('export_job_status', args=[job.pk])).status_code, 404)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            FormPermission.objects.filter(form=self.form, user=self.editor).delete()
+        self.client.force_login(self.editor)
+        self.assertEqual(self.client.get(download_url).status_code, 404)
+
+    def test_xlsx_job_builds_a_workbook(self):
+        self.add_people()
+        enqueue_export(self.form, 'xlsx')
+        job = self.run_worker()
+        with job.file.open('rb') as file:
+            rows = list(load_workbook(file).active.iter_rows(values_only=True))
+        with build_xlsx_export(self.form) as direct:
+            self.assertEqual(rows, list(load_workbook(direct).active.iter_rows(values_only=True)))
+
+
+class SnapshotUpkeepTests(FormTestCase):
+    def test_saving_data_refreshes_snapshot_and_label(self):
+        ann = self.add_people()[0]
+        entry = ann.data_entries.get(field_name='Name')
+        entry.field_value = 'Anna'
+        entry.save()
+
+        ann.refresh_from_db()
+        self.assertEqual(ann.snapshot['Name'], 'Anna')
+        self.assertEqual(ann.display_label, 'Anna')
+        self.assertFalse(self.refresh_form().analytics_ready)
+
+    def test_deleting_data_refreshes_snapshot(self):
+        ann = self.add_people()[0]
+        delete_submission_data(ann.data_entries.filter(field_name__in=['Name', 'Age']))
+
+        ann.refresh_from_db()
+        self.assertNotIn('Name', ann.snapshot)
+        self.assertNotIn('Age', ann.snapshot)
+        self.assertEqual(ann.display_label, '')
+        self.assertFalse(self.refresh_form().analytics_ready)
+
+    def test_deleting_submissions_recounts_their_forms(self):
+        people = self.add_people()
+        pets = self.add_child_form('Pet')
+        write_submission(pets, {'Pet': 'Rex'}, parent_submission_id=people[0].pk)
+        write_submission(pets, {'Pet': 'Tom'})
+
+        # Ann's pet goes with her, so both forms lose rows.
+        delete_submissions(FormSubmission.objects.filter(pk__in=[s.pk for s in people[:3]]))
+        form = self.refresh_form()
+        self.assertEqual(form.submission_count, len(PEOPLE) - 3)
+        self.assertFalse(form.analytics_ready)
+        pets.refresh_from_db()
+        self.assertEqual(pets.submission_count, 1)
+
+    def test_submission_models_have_no_delete_receivers(self):
+        # Receivers would stop Django from deleting these rows with a single DELETE.
+        for model in (FormSubmission, SubmissionData):
+            self.assertFalse(pre_delete.has_listeners(model))
+            self.assertFalse(post_delete.has_listeners(model))
+
+    def test_labels_need_no_extra_queries(self):
+        self.add_people()
+        with self.assertNumQueries(1):
+            labels = [str(s) for s in FormSubmission.objects.with_labels().order_by('id')]
+        self.assertEqual(labels[0], 'Ann (People)')
+
+    def test_label_falls_back_to_the_submission_id(self):
+        submission = write_submission(self.form, {'Age': '30'})
+        self.assertEqual(submission.display_label, '')
+        self.assertEqual(str(submission), f'Submission for People (ID: {submission.pk})')
+
+
+class SubmissionMatrixTests(FormTestCase):
+    def test_snapshot_and_entries_sources_agree(self):
+        self.add_people()
+        write_submission(self.form, {'Name': 'Fay'})
+        snapshot = list(submission_matrix(self.form, source='snapshot').order_by('id'))
+        self.assertEqual(list(submission_matrix(self.form, source='entries').order_by('id')), snapshot)
+        self.assertEqual(snapshot[0][2:], ('Ann', '34', 'red', '["a"]', '2026-01-05'))
+        self.assertEqual(snapshot[-1][2:], ('Fay', None, None, None, None))
+
+    def test_matrix_is_loaded_in_one_query(self):
+        self.add_people()
+        for source in ('snapshot', 'entries'):
+            with self.assertNumQueries(1):
+                rows = list(submission_matrix(self.form, ['Name', 'Color'], extra_fields=(), source=source))
+            self.assertEqual(len(rows), len(PEOPLE))
+
+
+class SubmissionTableTests(FormTestCase):
+    def walk(self, params):
+        """Follows the `next` cursors from the first page; returns the pages of names."""
+        pages, params = [], dict(params)
+        while True:
+            page = SubmissionTable(self.form, params).page()
+            pages.append([row[2] for row in page['rows']])
+            if not page['next_cursor']:
+                return pages, page
+            params['after'] = page['next_cursor']
+
+    def first_names(self, params):
+        return [row[2] for row in SubmissionTable(self.form, params).page()['rows']]
+
+    def test_keyset_pages_cover_each_row_once_in_order(self):
+        self.add_people()
+        pages, _ = self.walk({'sort': 'Age', 'dir': 'asc', 'per_page': 2})
+        self.assertEqual(pages, [['Eve', 'Bob'], ['Dan', 'Ann'], ['Cleo']])
+
+        pages, _ = self.walk({'per_page': 2})
+        self.assertEqual(sum(pages, []), ['Eve', 'Dan', 'Cleo', 'Bob', 'Ann'])
+
+    def test_previous_cursor_returns_the_same_page(self):
+        self.add_people()
+        params = {'sort': 'Name', 'dir': 'desc', 'per_page': 2}
+        first = SubmissionTable(self.form, params).page()
+        self.assertIsNone(first['prev_cursor'])
+        second = SubmissionTable(self.form, {**params, 'after': first['next_cursor']}).page()
+        back = SubmissionTable(self.form, {**params, 'before': second['prev_cursor']}).page()
+        self.assertEqual(back['rows'], first['rows'])
+
+    def test_filters_and_search(self):
+        self.add_people()
+        self.add_people(PEOPLE[1:2], form=Form.objects.create(form_name='Other', fields=FIELDS))
+        page = SubmissionTable(self.form, {'f2': 'RED'}).page()
+        self.assertEqual(sorted(row[2] for row in page['rows']), ['Ann', 'Cleo', 'Eve'])
+        page = SubmissionTable(self.form, {'q': 'bo'}).page()
+        self.assertEqual([row[2] for row in page['rows']], ['Bob'])
+
+    def test_malformed_cursor_starts_from_the_top(self):
+        self.add_people()
+        self.assertEqual(self.first_names({'per_page': 2, 'after': 'not-a-cursor'}), ['Eve', 'Dan'])
+
+    def test_text_cursor_on_the_default_sort_starts_from_the_top(self):
+        self.add_people()
+        self.assertEqual(self.first_names({'per_page': 2, 'after': encode_cursor('garbage', 5)}), ['Eve', 'Dan'])
+
+    def test_number_cursor_on_the_default_sort_starts_from_the_top(self):
+        self.add_people()
+        self.assertEqual(self.first_names({'per_page': 2, 'after': encode_cursor(12345, 5)}), ['Eve', 'Dan'])
+
+    def test_text_cursor_on_a_numeric_sort_starts_from_the_top(self):
+        self.add_people()
+        params = {'sort': 'Age', 'dir': 'asc', 'per_page': 2, 'after': encode_cursor('abc', 5)}
+        self.assertEqual(self.first_names(params), ['Eve', 'Bob'])
+
+
+class PermissionCacheTests(FormTestCase):
+    def test_granted_level_is_cached(self):
+        self.assertEqual(granted_permission_level(self.form.pk, self.editor.pk), 'editor')
+        with self.assertNumQueries(0):
+            self.assertEqual(granted_permission_level(self.form.pk, self.editor.pk), 'editor')
+
+    def test_missing_permission_is_cached_too(self):
+        self.assertIsNone(granted_permission_level(self.form.pk, self.stranger.pk))
+        with self.assertNumQueries(0):
+            self.assertIsNone(granted_permission_level(self.form.pk, self.stranger.pk))
+
+    def test_changes_are_forgotten_on_commit(self):
+        self.assertEqual(granted_permission_level(self.form.pk, self.editor.pk), 'editor')
+        with self.captureOnCommitCallbacks() as callbacks:
+            FormPermission.objects.filter(form=self.form, user=self.editor).update(permission_level='admin')
+            FormPermission.objects.get(form=self.form, user=self.editor).save()
+            # Until commit, the cached level stays in place.
+            self.assertEqual(granted_permission_level(self.form.pk, self.editor.pk), 'editor')
+        for callback in callbacks:
+            callback()
+        self.assertEqual(granted_permission_level(self.form.pk, self.editor.pk), 'admin')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            FormPermission.objects.filter(form=self.form, user=self.editor).delete()
+        self.assertIsNone(granted_permission_level(self.form.pk, self.editor.pk))
+
+    def test_level_is_resolved_once_per_request(self):
+        request = RequestFactory().get('/')
+        request.user = self.viewer
+        form, level = resolve_form_permission(request, self.form.pk)
+        self.assertEqual(level, 'viewer')
+        with self.assertNumQueries(0):
+            self.assertEqual(resolve_form_permission(request, str(self.form.pk)), (form, 'viewer'))
+
+    def test_creator_and_global_admin_are_admins(self):
+        admin = User.objects.create_user('boss', password='pw', role='admin')
+        for user in (self.owner, admin):
+            request = RequestFactory().get('/')
+            request.user = user
+            self.assertEqual(resolve_form_permission(request, self.form.pk)[1], 'admin')
+
+
+class FormSchemaCacheTests(FormTestCase):
+    def test_schema_is_compiled_once_per_version(self):
+        schema = get_form_schema(self.form)
+        self.assertEqual(schema.field_names, ['Name', 'Age', 'Color', 'Tags', 'Joined'])
+        self.assertTrue(schema.by_name['Tags'].is_multi_value)
+
+        with mock.patch('core.schema.FormSchema', side_effect=AssertionError('compiled again')):
+            self.assertIs(get_form_schema(Form.objects.get(pk=self.form.pk)), schema)
+
+    def test_new_version_gets_a_new_schema(self):
+        old = get_form_schema(self.form)
+        # update() leaves updated_at alone, so only the version tells the two apart.
+        Form.objects.filter(pk=self.form.pk).update(fields=FIELDS[:2], version=F('version') + 1)
+        new = get_form_schema(Form.objects.get(pk=self.form.pk))
+        self.assertEqual(new.field_names, ['Name', 'Age'])
+        self.assertEqual(old.field_names, ['Name', 'Age', 'Color', 'Tags', 'Joined'])
+
+    def test_saving_the_form_invalidates_its_schema(self):
+        get_form_schema(self.form)
+        self.form.fields = [*FIELDS, {'name': 'Email', 'type': 'EMAIL'}]
+        self.form.save()
+        self.assertEqual(get_form_schema(Form.objects.get(pk=self.form.pk)).field_names[-1], 'Email')
+
+
+class AnalyticsAggregateTests(FormTestCase):
+    def stored_aggregates(self):
+        buckets = set(FieldBucket.objects.filter(form=self.form, count__gt=0).values_list(
+            'field_name', 'kind', 'bucket', 'count'))
+        stats = {
+            entry.field_name: (entry.count, entry.min_value, entry.max_value, round(entry.sum_value, 6))
+            for entry in FieldStats.objects.filter(form=self.form)
+        }
+        return buckets, stats
+
+    def test_incremental_aggregates_match_a_rebuild(self):
+        self.add_people(PEOPLE[:2])
+        self.add_people(PEOPLE[2:])
+        write_submission(self.form, {'Name': 'Fay', 'Age': '', 'Joined': ''})
+        incremental = self.stored_aggregates()
+        self.assertIn(('Color', 'category', 'red', 3), incremental[0])
+        self.assertEqual(incremental[1]['Age'], (5, 19.0, 41.0, 148.0))
+
+        rebuild_form_aggregates(self.form)
+        self.assertEqual(self.stored_aggregates(), incremental)
+        self.assertTrue(self.refresh_form().analytics_ready)
+
+    def test_sql_fallback_matches_the_aggregates(self):
+        self.add_people()
+        series, stats = load_field_series(self.form)
+        sql_series, sql_stats = sql_field_series(self.form)
+        for field_name in ('Color', 'Joined'):
+            self.assertEqual(sql_series[field_name], series[field_name])
+        self.assertEqual(
+            (sql_stats['Age'].count, sql_stats['Age'].min_value, sql_stats['Age'].max_value, sql_stats['Age'].sum_value),
+            (stats['Age'].count, stats['Age'].min_value, stats['Age'].max_value, stats['Age'].sum_value),
+        )
+
+    def test_stale_aggregates_are_rebuilt(self):
+        submissions = self.add_people()
+        delete_submissions(FormSubmission.objects.filter(pk=submissions[0].pk))
+        self.assertFalse(self.refresh_form().analytics_ready)
+
+        self.assertEqual(rebuild_stale_aggregates(), 1)
+        self.assertTrue(self.refresh_form().analytics_ready)
+        self.assertEqual(self.stored_aggregates()[1]['Age'], (4, 19.0, 41.0, 114.0))
+        self.assertEqual(rebuild_stale_aggregates(), 0)
+
+    @override_settings(SUBMISSION_MATRIX_SOURCE='entries')
+    def test_rebuild_reads_the_configured_source(self):
+        self.add_people()
+        incremental = self.stored_aggregates()
+        FormSubmission.objects.filter(form=self.form).update(snapshot={})
+
+        rebuild_form_aggregates(self.form)
+        self.assertEqual(self.stored_aggregates(), incremental)
+
+    def test_backfill_flags_the_forms_it_changes(self):
+        self.add_people()
+        other = Form.objects.create(form_name='Other', fields=FIELDS, created_by=self.owner, status='active')
+        self.add_people(PEOPLE[:1], form=other)
+        FormSubmission.objects.filter(form=self.form).update(snapshot={})
+
+        call_command('backfill_submission_snapshots', stdout=io.StringIO())
+        self.assertFalse(self.refresh_form().analytics_ready)
+        other.refresh_from_db()
+        self.assertTrue(other.analytics_ready)
+
+        self.assertEqual(rebuild_stale_aggregates(), 1)
+        self.assertEqual(self.stored_aggregates()[1]['Age'], (5, 19.0, 41.0, 148.0))
+
+    def test_analytics_view_rebuilds_small_forms(self):
+        self.add_people()
+        Form.objects.filter(pk=self.form.pk).update(analytics_ready=False)
+        FieldBucket.objects.filter(form=self.form).delete()
+
+        self.client.force_login(self.editor)
+        response = self.client.get(reverse('form_analytics', args=[self.form.pk]))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.context['charts']), 3)
+        self.assertTrue(self.refresh_form().analytics_ready)
+        self.assertTrue(FieldBucket.objects.filter(form=self.form).exists())
+
+    @override_settings(ANALYTICS_INLINE_REBUILD_LIMIT=1)
+    def test_analytics_view_charts_large_stale_forms_in_sql(self):
+        self.add_people()
+        Form.objects.filter(pk=self.form.pk).update(analytics_ready=False)
+
+        self.client.force_login(self.editor)
+        response = self.client.get(reverse('form_analytics', args=[self.form.pk]))
+        self.assertEqual(len(response.context['charts']), 3)
+        self.assertFalse(self.refresh_form().analytics_ready)
+
+
+class ChartCacheTests(FormTestCase):
+    def rendered_fields(self):
+        """Renders the form's charts; returns the fields whose chart had to be drawn."""
+        with mock.patch('core.analytics.render_chart', wraps=render_chart) as render:
+            charts = render_form_charts(self.form)
+        self.assertEqual(len(charts), 3)
+        return [call.args[0] for call in render.call_args_list]
+
+    def test_charts_are_cached_until_their_field_changes(self):
+        self.add_people()
+        self.assertEqual(self.rendered_fields(), ['Age', 'Color', 'Joined'])
+        self.assertEqual(self.rendered_fields(), [])
+
+        write_submission(self.form, {'Name': 'Fay', 'Color': 'blue'})
+        self.assertEqual(self.rendered_fields(), ['Color'])
+
+    def test_rebuild_renders_every_chart_again(self):
+        self.add_people()
+        self.rendered_fields()
+        rebuild_form_aggregates(self.form)
+        self.assertEqual(self.rendered_fields(), ['Age', 'Color', 'Joined'])
+
+
+class ChildFormRollupTests(FormTestCase):
+    def test_rollup_matches_the_per_child_counts(self):
+        people = self.add_people()
+        pets = self.add_child_form('Pet')
+        self.add_child_form('Car')
+        self.add_child_form('Draft', status='draft')
+        vets = self.add_child_form('Vet', parent=pets)
+        rex = write_submission(pets, {'Pet': 'Rex'}, parent_submission_id=people[0].pk)
+        write_submission(pets, {'Pet': 'Tom'}, parent_submission_id=people[1].pk)
+        write_submission(pets, {'Pet': 'Stray'})
+        write_submission(vets, {'Vet': 'Dr. Lee'}, parent_submission_id=rex.pk)
+
+        # How the analytics view used to count them: one query per active child form.
+        old_counts = [
+            (child.form_name, FormSubmission.objects.filter(form=child, parent_submission__form=self.form).count())
+            for child in self.form.child_forms.filter(status='active').order_by('id')
+        ]
+        with self.assertNumQueries(1):
+            rollup = child_form_rollup(self.form)
+        self.assertEqual([(row['name'], row['count']) for row in rollup], old_counts)
+        self.assertEqual(old_counts, [('Pet', 2), ('Car', 0)])
+
+        deep = child_form_rollup(self.form, depth=2)
+        self.assertEqual([(row['name'], row['depth'], row['count']) for row in deep],
+                         [('Pet', 1, 2), ('Car', 1, 0), ('Vet', 2, 1)])
+
+
+class AIFieldGenerationTests(FormTestCase):
+    # Nothing the local rules know, so these go to the model.
+    DESCRIPTION = 'Inventory of quantum laboratory equipment'
+    GENERATED = [{'name': 'Serial Number', 'type': 'VARCHAR(255)'}]
+
+    def post(self, description=DESCRIPTION):
+        self.client.force_login(self.editor)
+        return self.client.post(
+            reverse('api_generate_fields'), json.dumps({'description': description}),
+            content_type='application/json',
+        )
+
+    def llm(self, result=None):
+        return mock.patch(
+            'core.views.agenerate_fields_with_llama',
+            new=mock.AsyncMock(return_value=(True, json.dumps(result or self.GENERATED))),
+        )
+
+    def test_generated_fields_are_returned(self):
+        with self.llm() as generate:
+            response = self.post()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {'fields': self.GENERATED})
+        generate.assert_awaited_once_with(self.DESCRIPTION)
+
+    def test_busy_model_is_429(self):
+        with self.llm() as generate, mock.patch('core.views.llm_slots', ConcurrencyLimiter(1)) as slots:
+            self.assertTrue(slots.try_acquire())
+            response = self.post()
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response['Retry-After'], '5')
+        generate.assert_not_awaited()
+
+    def test_slow_model_is_504_and_frees_its_slot(self):
+        async def never_answers(description):
+            await asyncio.sleep(60)
+
+        with mock.patch('core.views.llm_slots', ConcurrencyLimiter(1)), override_settings(AI_GENERATION_TIMEOUT=0.05):
+            with mock.patch('core.views.agenerate_fields_with_llama', never_answers):
+                self.assertEqual(self.post().status_code, 504)
+            with self.llm():
+                self.assertEqual(self.post().status_code, 200)
+
+    def test_repeated_description_is_answered_from_the_cache(self):
+        with self.llm() as generate:
+            self.assertEqual(self.post().headers['X-AI-Cache'], 'miss')
+            response = self.post(self.DESCRIPTION.upper() + '!')
+        self.assertEqual(response.headers['X-AI-Cache'], 'hit')
+        self.assertEqual(response.json(), {'fields': self.GENERATED})
+        generate.assert_awaited_once()
+
+    def test_common_forms_skip_the_model(self):
+        with self.llm() as generate:
+            response = self.post('Contact form')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.headers['X-AI-Source'], 'rules')
+        self.assertEqual(response.json()['fields'][0], {'name': 'Full Name', 'type': 'VARCHAR(255)'})
+        generate.assert_not_awaited()
+
+        with self.llm() as generate:
+            self.post()
+        generate.assert_awaited_once()
+        self.assertEqual(cache_stats()['fast_path'], {'hits': 1, 'misses': 1, 'hit_rate': 0.5})
+
+
+class AICacheTests(TestCase):
+    GENERATED = [{'name': 'Serial Number', 'type': 'VARCHAR(255)'}]
+
+    def test_normalized_descriptions_share_an_entry(self):
+        store_fields('Lab equipment inventory', self.GENERATED)
+        self.assertEqual(get_cached_fields('  lab EQUIPMENT, inventory. '), self.GENERATED)
+        self.assertIsNone(get_cached_fields('Lab equipment'))
+        stats = cache_stats()
+        self.assertEqual((stats['hits'], stats['misses'], stats['entries']), (1, 1, 1))
+
+    @override_settings(AI_CACHE_TTL=60)
+    def test_expired_entries_are_not_served(self):
+        store_fields('Lab equipment inventory', self.GENERATED)
+        AIGenerationCacheEntry.objects.update(created_at=timezone.now() - timedelta(seconds=61))
+        self.assertIsNone(get_cached_fields('Lab equipment inventory'))
+        self.assertFalse(AIGenerationCacheEntry.objects.exists())
+
+    @override_settings(AI_CACHE_MAX_ENTRIES=2)
+    def test_least_recently_used_entries_are_evicted(self):
+        store_fields('first', self.GENERATED)
+        store_fields('second', self.GENERATED)
+        # Using 'first' leaves 'second' as the least recently used entry.
+        get_cached_fields('first')
+        store_fields('third', self.GENERATED)
+        self.assertEqual(
+            sorted(AIGenerationCacheEntry.objects.values_list('normalized_description', flat=True)),
+            ['first', 'third'],
+        )
+
+
+class IncrementalJSONArrayParserTests(SimpleTestCase):
+    FIELDS = [
+        {'name': 'Full Name', 'type': 'VARCHAR(255)'},
+        {'name': 'Role', 'type': 'SELECT', 'options': ['Student', 'Teacher']},
+    ]
+
+    def test_objects_split_across_chunks(self):
+        text = json.dumps(self.FIELDS)
+        parser = IncrementalJSONArrayParser()
+        completed = [parser.feed(text[start:start + 3]) for start in range(0, len(text), 3)]
+        self.assertEqual(sum(completed, []), self.FIELDS)
+        # Each object is returned by the chunk holding its closing brace, not at the end.
+        self.assertEqual(completed[-1], [])
+        self.assertTrue(parser.finished)
+
+    def test_quotes_and_brackets_inside_strings(self):
+        fields = [{'name': 'Say "hi" }]', 'type': 'TEXT'}, {'name': 'Back\\slash {', 'type': 'TEXT'}]
+        parser = IncrementalJSONArrayParser()
+        self.assertEqual(sum((parser.feed(char) for char in json.dumps(fields)), []), fields)
+
+    def test_preamble_and_trailing_text_are_ignored(self):
+        parser = IncrementalJSONArrayParser()
+        self.assertEqual(parser.feed('Sure! Here are the fields:\n[{"name": "A", '), [])
+        self.assertEqual(parser.feed('"type": "TEXT"}'), [{'name': 'A', 'type': 'TEXT'}])
+        self.assertEqual(parser.feed('] Hope this helps! {"name": "B"}'), [])
+        self.assertTrue(parser.finished)
+
+    def test_malformed_object_is_skipped(self):
+        parser = IncrementalJSONArrayParser()
+        with self.assertLogs('core.utils', 'WARNING'):
+            self.assertEqual(parser.feed('[{"name": "A",}, {"name": "B"}]'), [{'name': 'B'}])
+
+
+class FakeLLMTests(SimpleTestCase):
+    def start_server(self, **behaviour):
+        server = FakeOllamaServer(port=0, behaviour=FakeLLMBehaviour(latency=0, tokens_per_second=0, **behaviour))
+        self.addCleanup(server.stop)
+        return server.start()
+
+    def test_answers_like_ollama(self):
+        server = self.start_server()
+        with override_settings(OLLAMA_HOST=server.url):
+            success, content = generate_fields_with_llama('Anything at all')
+        self.assertTrue(success)
+        self.assertEqual(json.loads(content), FAKE_FIELDS)
+
+    def test_streams_the_same_fields(self):
+        async def collect():
+            return [field async for field in astream_fields_with_llama('Anything at all')]
+
+        server = self.start_server()
+        with override_settings(OLLAMA_HOST=server.url):
+            self.assertEqual(async_to_sync(collect)(), FAKE_FIELDS)
+
+    def test_server_errors_are_reported(self):
+        server = self.start_server(error_rate=1.0)
+        with override_settings(OLLAMA_HOST=server.url), self.assertLogs('core.utils', 'ERROR'):
+            success, content = generate_fields_with_llama('Anything at all')
+        self.assertFalse(success)
+        self.assertIn('contacting the AI', content)
+
+    def test_malformed_answers_are_reported(self):
+        server = self.start_server(malformed_rate=1.0)
+        with override_settings(OLLAMA_HOST=server.url), self.assertLogs('core.utils', 'ERROR'):
+            success, content = generate_fields_with_llama('Anything at all')
+        self.assertFalse(success)
+        self.assertIn('malformed JSON', content)
+
+
+class RuleFastPathTests(SimpleTestCase):
+    def names(self, description):
+        fields = generate_fields_from_rules(description)
+        return None if fields is None else [field['name'] for field in fields]
+
+    def test_known_form_kinds_and_fields(self):
+        self.assertEqual(self.names('Contact form'),
+                         ['Full Name', 'Email Address', 'Phone Number', 'Subject', 'Message'])
+        self.assertEqual(self.names('A registration form asking for name, email and gender'),
+                         ['Full Name', 'Email Address', 'Phone Number', 'Date of Birth', 'Address', 'Gender'])
+        self.assertEqual(self.names('Collect email and date of birth'), ['Email Address', 'Date of Birth'])
+
+    def test_anything_unrecognized_goes_to_the_model(self):
+        self.assertIsNone(self.names('Inventory of quantum laboratory equipment'))
+        self.assertIsNone(self.names('Contact form with a field for their favourite dinosaur'))
+        self.assertIsNone(self.names('Form'))
+
+    @override_settings(AI_FAST_PATH_ENABLED=False)
+    def test_fast_path_can_be_switched_off(self):
+        self.assertIsNone(self.names('Contact form'))
+
+
+class RequestMetricsTests(FormTestCase):
+    def setUp(self):
+        super().setUp()
+        registry.reset()
+        self.addCleanup(registry.reset)
+
+    def test_requests_are_recorded_per_view(self):
+        self.client.force_login(self.editor)
+        self.client.get(reverse('dashboard'))
+        self.client.generic('BREW', reverse('dashboard'))
+
+        snapshot = registry.snapshot()
+        metrics = snapshot[('dashboard', 'GET')]
+        self.assertEqual(metrics.statuses, {200: 1})
+        self.assertEqual(metrics.latency.count, 1)
+        self.assertGreater(metrics.queries.total, 0)
+        self.assertEqual(metrics.response_size.count, 1)
+        # Unknown methods share one label instead of growing the registry.
+        self.assertEqual(set(snapshot), {('dashboard', 'GET'), ('dashboard', 'OTHER')})
+
+    def test_metrics_view(self):
+        self.client.force_login(self.editor)
+        self.client.get(reverse('dashboard'))
+        self.assertEqual(self.client.get(reverse('metrics')).status_code, 404)
+
+        self.client.force_login(User.objects.create_user('ops', password='pw', is_staff=True))
+        response = self.client.get(reverse('metrics'))
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('formapp_http_responses_total{view="dashboard",method="GET",status="200"} 1',
+                      response.content.decode())
+
+    @override_settings(METRICS_TOKEN='scrape-me')
+    def test_metrics_token(self):
+        url = reverse('metrics')
+        self.assertEqual(self.client.get(url, headers={'Authorization': 'Bearer wrong'}).status_code, 404)
+        self.assertEqual(self.client.get(url, headers={'Authorization': 'Bearer scrape-me'}).status_code, 200)
+
+
+class RequestProfilerTests(FormTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.staff = User.objects.create_user('ops', password='pw', is_staff=True)
+
+    def test_trigger_parameter_must_match_exactly(self):
+        factory = RequestFactory()
+        for query, expected in [
+            ('_profile=1', True), ('page=2&_profile', True), ('user_profile=1', False),
+            ('q=_profile', False), ('', False),
+        ]:
+            self.assertEqual(profiling_requested(factory.get(f'/?{query}')), expected, query)
+        self.assertTrue(profiling_requested(factory.get('/', headers={'X-Profile': '1'})))
+
+    def test_staff_request_is_profiled(self):
+        self.client.force_login(self.staff)
+        response = self.client.get(reverse('dashboard'), {'_profile': '1'})
+        profile = RequestProfile.objects.get(pk=response['X-Profile-Id'])
+        self.assertEqual((profile.user, profile.view_name, profile.status_code), (self.staff, 'dashboard', 200))
+        self.assertEqual(profile.sql_count, len(profile.sql_statements))
+        self.assertGreater(profile.sql_count, 0)
+        self.assertIn('cumulative', profile.profile)
+
+    def test_other_requests_are_not_profiled(self):
+        self.client.force_login(self.editor)
+        self.assertNotIn('X-Profile-Id', self.client.get(reverse('dashboard'), {'_profile': '1'}))
+        self.client.force_login(self.staff)
+        self.assertNotIn('X-Profile-Id', self.client.get(reverse('dashboard'), {'user_profile': '1'}))
+        self.assertFalse(RequestProfile.objects.exists())
+
+    @override_settings(REQUEST_PROFILE_BUFFER_SIZE=2)
+    def test_only_the_newest_profiles_are_kept(self):
+        self.client.force_login(self.staff)
+        ids = [self.client.get(reverse('dashboard'), headers={'X-Profile': '1'})['X-Profile-Id'] for _ in range(3)]
+        self.assertEqual(sorted(RequestProfile.objects.values_list('id', flat=True)), sorted(map(int, ids[1:])))
+
+
+@mock.patch('core.imports.IMPORT_BATCH_SIZE', 2)
+class ImportTests(MediaRootMixin, FormTestCase):
+    CSV = (
+        'name,Age,Color,Tags,Joined,When\n'
+        'Ann,34,red,a;b,2026-01-05,2026-01-05T10:00:00\n'
+        'Bob,old,green,,2026-01-06,\n'
+        '\n'
+        'Cleo,41,purple,z,2026-01-07,\n'
+        'Dan,27,blue,,2026-01-08,yesterday\n'
+        'Eve,19,red,["c"],,\n'
+        'Fay,22,green,b,2026-01-09,\n'
+    )
+
+    def upload(self, content, name='people.csv', user=None):
+        self.client.force_login(user or self.editor)
+        response = self.client.post(
+            reverse('import_job_create', args=[self.form.pk]),
+            {'file': SimpleUploadedFile(name, content)},
+        )
+        return response
+
+    def start(self, job_id, mapping):
+        return self.client.post(
+            reverse('import_job_start', args=[job_id]), json.dumps({'mapping': mapping}),
+            content_type='application/json',
+        )
+
+    def run_worker(self):
+        job = claim_next_import_job()
+        self.assertIsNotNone(job)
+        return run_import_job(job)
+
+    def test_csv_import_skips_and_reports_invalid_rows(self):
+        response = self.upload(self.CSV.encode())
+        self.assertEqual(response.status_code, 201)
+        payload = response.json()
+        self.assertEqual(payload['column_mapping'], {
+            'name': 'Name', 'Age': 'Age', 'Color': 'Color', 'Tags': 'Tags', 'Joined': 'Joined',
+        })
+
+        mapping = {**payload['column_mapping'], 'When': 'submitted_at'}
+        self.assertEqual(self.start(payload['id'], mapping).status_code, 202)
+        job = self.run_worker()
+
+        self.assertEqual(job.status, 'done')
+        self.assertEqual((job.rows_done, job.rows_imported, job.rows_failed), (6, 3, 3))
+        # Errors are sorted by row; within a row they follow the stored mapping.
+        self.assertEqual(
+            sorted((error['row'], error['column']) for error in job.row_errors),
+            [(3, 'Age'), (5, 'Color'), (5, 'Tags'), (6, 'When')],
+        )
+        self.assertEqual([error['row'] for error in job.row_errors], [3, 5, 5, 6])
+        self.assertFalse(job.file)
+
+        imported = {s.display_label: s for s in FormSubmission.objects.filter(form=self.form)}
+        self.assertEqual(sorted(imported), ['Ann', 'Eve', 'Fay'])
+        self.assertEqual(imported['Ann'].snapshot['Tags'], '["a", "b"]')
+        self.assertEqual(imported['Ann'].submitted_at.isoformat()[:16], '2026-01-05T10:00')
+        self.assertEqual(imported['Eve'].data_entries.get(field_name='Tags').field_value, '["c"]')
+
+        form = self.refresh_form()
+        self.assertEqual(form.submission_count, 3)
+        incremental = set(FieldBucket.objects.filter(form=form).values_list('field_name', 'bucket', 'count'))
+        rebuild_form_aggregates(form)
+        self.assertEqual(set(FieldBucket.objects.filter(form=form).values_list('field_name', 'bucket', 'count')),
+                         incremental)
+
+        report = self.client.get(reverse('import_job_errors', args=[job.pk]))
+        self.assertEqual(report.status_code, 200)
+        lines = report.content.decode().splitlines()
+        self.assertEqual(len(lines), 1 + len(job.row_errors))
+
+    def test_xlsx_import(self):
+        workbook = Workbook()
+        workbook.active.append(['Name', 'Age', 'Joined'])
+        workbook.active.append(['Ann', 34, '2026-01-05'])
+        workbook.active.append(['Bob', 27.0, None])
+        content = io.BytesIO()
+        workbook.save(content)
+
+        payload = self.upload(content.getvalue(), name='people.xlsx').json()
+        self.assertEqual(self.start(payload['id'], payload['column_mapping']).status_code, 202)
+        job = self.run_worker()
+        self.assertEqual((job.status, job.rows_imported, job.rows_failed), ('done', 2, 0))
+        self.assertEqual(
+            sorted(FormSubmission.objects.filter(form=self.form).values_list('snapshot__Age', flat=True)),
+            ['27', '34'],
+        )
+
+    def test_mapping_is_validated(self):
+        payload = self.upload(self.CSV.encode()).json()
+        self.assertEqual(self.start(payload['id'], {'name': 'Nope'}).status_code, 400)
+        self.assertEqual(self.start(payload['id'], {'name': 'Name', 'Age': 'Name'}).status_code, 400)
+        self.assertEqual(self.start(payload['id'], {}).status_code, 400)
+        self.assertEqual(ImportJob.objects.get(pk=payload['id']).status, 'uploaded')
+
+    def test_jobs_are_private_to_their_uploader(self):
+        payload = self.upload(self.CSV.encode()).json()
+        self.client.force_login(self.owner)
+        self.assertEqual(self.client.get(reverse('import_job_status', args=[payload['id']])).status_code, 404)
+        self.assertEqual(self.upload(b'x', user=self.viewer).status_code, 404)
+
+    def test_unreadable_upload_is_refused(self):
+        self.assertEqual(self.upload(b'Name\nAnn\n', name='people.txt').status_code, 400)
+        self.assertFalse(ImportJob.objects.exists())
+
+
+@override_settings(API_BATCH_MAX_SUBMISSIONS=3)
+class SubmissionsBatchApiTests(FormTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.token, cls.key = create_api_token(cls.viewer, 'kiosk')
+
+    def post(self, payload, key=None):
+        headers = {'Authorization': f'Bearer {key or self.key}'} if key != '' else {}
+        return self.client.post(
+            reverse('api_submissions_batch', args=[self.form.pk]), json.dumps(payload),
+            content_type='application/json', headers=headers,
+        )
+
+    def test_valid_batch_is_created(self):
+        response = self.post({'submissions': [
+            {'values': {'Name': 'Ann', 'Age': 34, 'Tags': ['a', 'b']}},
+            {'values': {'Name': 'Bob'}},
+        ]})
+        self.assertEqual(response.status_code, 201)
+        payload = response.json()
+        self.assertEqual(payload['created'], 2)
+        ids = [result['id'] for result in payload['results']]
+        self.assertEqual(
+            list(FormSubmission.objects.filter(pk__in=ids).order_by('id').values_list('display_label', flat=True)),
+            ['Ann', 'Bob'],
+        )
+        self.assertEqual(FormSubmission.objects.get(pk=ids[0]).snapshot['Tags'], '["a", "b"]')
+        self.assertEqual(FormSubmission.objects.get(pk=ids[0]).submitted_by, self.viewer)
+        self.assertEqual(self.refresh_form().submission_count, 2)
+
+    def test_one_invalid_item_saves_nothing(self):
+        response = self.post([
+            {'values': {'Name': 'Ann'}},
+            {'values': {'Age': 'old'}},
+            'not an object',
+        ])
+        self.assertEqual(response.status_code, 400)
+        payload = response.json()
+        self.assertEqual(payload['created'], 0)
+        self.assertEqual([result['status'] for result in payload['results']], ['valid', 'invalid', 'invalid'])
+        self.assertIn('Age', payload['results'][1]['errors'])
+        self.assertFalse(FormSubmission.objects.exists())
+
+    def test_missing_or_bad_token_is_401(self):
+        self.assertEqual(self.post([{'values': {'Name': 'Ann'}}], key='').status_code, 401)
+        self.assertEqual(self.post([{'values': {'Name': 'Ann'}}], key='wrong').status_code, 401)
+        self.token.is_active = False
+        self.token.save()
+        self.assertEqual(self.post([{'values': {'Name': 'Ann'}}]).status_code, 401)
+        self.assertFalse(FormSubmission.objects.exists())
+
+    def test_too_many_items_is_413(self):
+        response = self.post([{'values': {'Name': str(n)}} for n in range(4)])
+        self.assertEqual(response.status_code, 413)
+        self.assertFalse(FormSubmission.objects.exists())
+
+    def test_malformed_body_is_400(self):
+        self.assertEqual(self.post([]).status_code, 400)
+        response = self.client.post(
+            reverse('api_submissions_batch', args=[self.form.pk]), 'not json',
+            content_type='application/json', headers={'Authorization': f'Bearer {self.key}'},
+        )
+        self.assertEqual(response.status_code, 400)
+
+    def test_token_user_needs_access_to_the_form(self):
+        _, key = create_api_token(self.stranger, 'other')
+        self.assertEqual(self.post([{'values': {'Name': 'Ann'}}], key=key).status_code, 404)
@@ -52,7 +52,18 @@ urlpatterns = [
     # This URL captures the share_token from the link
     path('submit/<uuid:share_token>/', views.form_fill, name='form_fill'), 
     path('api/generate-fields/', views.generate_ai_fields_api, name='api_generate_fields'),
+    path('api/generate-fields/stream/', views.generate_ai_fields_stream_api, name='api_generate_fields_stream'),
+    path('api/generate-fields/cache-stats/', views.ai_cache_stats_api, name='api_ai_cache_stats'),
+    path('api/forms/<int:form_id>/submissions/', views.submissions_batch_api, name='api_submissions_batch'),
+    path('metrics/', views.metrics, name='metrics'),
     path('forms/<int:form_id>/export/csv/', views.export_form_data_csv, name='export_csv'),
     path('forms/<int:form_id>/export/excel/', views.export_form_data_excel, name='export_excel'),
     path('forms/<int:form_id>/export/pdf/', views.export_form_data_pdf, name='export_pdf'), 
+    path('forms/<int:form_id>/export/jobs/', views.export_job_create, name='export_job_create'),
+    path('exports/<int:job_id>/', views.export_job_status, name='export_job_status'),
+    path('exports/<int:job_id>/download/', views.export_job_download, name='export_job_download'),
+    path('forms/<int:form_id>/import/', views.import_job_create, name='import_job_create'),
+    path('imports/<int:job_id>/', views.import_job_status, name='import_job_status'),
+    path('imports/<int:job_id>/start/', views.import_job_start, name='import_job_start'),
+    path('imports/<int:job_id>/errors/', views.import_job_errors, name='import_job_errors'),
 ]
\ No newline at end of file
@@ -1,10 +1,18 @@
 import ollama
+import asyncio
+import copy
 import json
 import logging
+import re
+import threading
 import pandas as pd
 from fpdf import FPDF
 from datetime import datetime
-import io
+from itertools import chain, islice
+from openpyxl import Workbook
+from openpyxl.utils import get_column_letter
+from django.conf import settings
+from django.utils import timezone
 
 # Set up logging
 logger = logging.getLogger(__name__)
@@ -12,6 +20,10 @@ logger = logging.getLogger(__name__)
 # Copied directly from your old project. No changes needed.
 def generate_pdf_from_dataframe(df: pd.DataFrame, title: str) -> bytes:
     """Generates a PDF file from a pandas DataFrame."""
+    return generate_pdf_from_rows(list(df.columns), df.itertuples(index=False), title)
+
+def generate_pdf_from_rows(headers: list, rows, title: str) -> bytes:
+    """Generates a PDF file from a list of headers and any iterable of rows."""
     pdf = FPDF(orientation='L', unit='mm', format='A4')
     pdf.add_page()
     
@@ -24,15 +36,15 @@ def generate_pdf_from_dataframe(df: pd.DataFrame, title: str) -> bytes:
     
     pdf.set_font('Arial', 'B', 8)
     page_width = pdf.w - 2 * pdf.l_margin
-    num_columns = len(df.columns)
+    num_columns = len(headers)
     col_width = page_width / num_columns if num_columns > 0 else page_width
     
-    for col in df.columns:
+    for col in headers:
         pdf.cell(col_width, 10, col, 1, 0, 'C')
     pdf.ln()
     
     pdf.set_font('Arial', '', 8)
-    for index, row in df.iterrows():
+    for row in rows:
         for item in row:
             cell_text = str(item).encode('latin-1', 'replace').decode('latin-1')
             pdf.cell(col_width, 10, cell_text, 1, 0)
@@ -40,35 +52,52 @@ def generate_pdf_from_dataframe(df: pd.DataFrame, title: str) -> bytes:
         
     return bytes(pdf.output())
 
-# Copied directly from your old project. No changes needed.
-def generate_excel_from_dataframe(df: pd.DataFrame) -> bytes:
-    """Generates an Excel file from a pandas DataFrame."""
-    output = io.BytesIO()
-    with pd.ExcelWriter(output, engine='openpyxl') as writer:
-        df.to_excel(writer, index=False, sheet_name='Submissions')
-        for column in df:
-            column_width = max(df[column].astype(str).map(len).max(), len(column))
-            # Accessing sheet_properties is deprecated, use column_dimensions directly
-            sheet = writer.sheets['Submissions']
-            sheet.column_dimensions[column[0].upper() if isinstance(column, str) else column].width = column_width + 2
-            
-    return output.getvalue()
-
-# Copied directly from your old project.
-# This function is still perfect for generating the JSON structure.
-def generate_fields_with_llama(description: str) -> tuple[bool, str]:
+def generate_excel_file(headers: list, rows, destination, width_sample_size: int = 500) -> None:
     """
-    Uses an LLM to generate a form's field structure from a natural language description.
-    Returns a tuple: (success: bool, content: str), where content is either
-    a JSON string of the fields or an error message.
+    Writes `rows` (any iterable of lists) to an Excel file at `destination`, which may be
+    a path or a binary file object. Uses openpyxl's write-only mode, so rows are flushed to
+    disk as they are appended and are never held in memory as a whole.
+    Column widths are computed from the first `width_sample_size` rows only.
     """
-    valid_types = [
-        "VARCHAR(255)", "INTEGER", "FLOAT", "DATE", "BOOLEAN", "TEXT", "PHONE",
-        "TEXTAREA", "PASSWORD", "CHECKBOX", "RADIO", "SELECT", "DATETIME", "TIME",
-        "MULTISELECT", "EMAIL", "URL", "COLOR", "RANGE"
-    ]
+    rows = iter(rows)
+    sample = list(islice(rows, width_sample_size))
 
-    prompt = f"""
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet('Submissions')
+
+    # In write-only mode column widths must be set before the first row is appended.
+    for index, header in enumerate(headers):
+        sample_width = max((len(str(row[index])) for row in sample), default=0)
+        column_width = min(max(sample_width, len(str(header))), 60)
+        sheet.column_dimensions[get_column_letter(index + 1)].width = column_width + 2
+
+    sheet.append(headers)
+    for row in chain(sample, rows):
+        sheet.append([_excel_cell_value(value) for value in row])
+    workbook.save(destination)
+
+def _excel_cell_value(value):
+    """Excel cannot store timezone-aware datetimes, so convert them to local naive time."""
+    if isinstance(value, datetime) and value.tzinfo is not None:
+        return timezone.localtime(value).replace(tzinfo=None)
+    return value
+
+# --- AI field generation ---
+
+VALID_FIELD_TYPES = [
+    "VARCHAR(255)", "INTEGER", "FLOAT", "DATE", "BOOLEAN", "TEXT", "PHONE",
+    "TEXTAREA", "PASSWORD", "CHECKBOX", "RADIO", "SELECT", "DATETIME", "TIME",
+    "MULTISELECT", "EMAIL", "URL", "COLOR", "RANGE"
+]
+
+# Bump this whenever the prompt below changes, so cached answers to the old prompt
+# are no longer used (see core.ai_cache).
+PROMPT_VERSION = 1
+
+def build_field_prompt(description: str) -> str:
+    """The prompt that asks the LLM for a JSON array of fields matching `description`."""
+    valid_types = VALID_FIELD_TYPES
+    return f"""
 You are an expert JSON generator for a form-building application.
 Based on the user's request, generate a JSON array of field objects.
 
@@ -85,23 +114,273 @@ Based on the user's request, generate a JSON array of field objects.
 
 **YOUR JSON OUTPUT:**
 """
+
+# --- Rule-based fast path ---
+# Common forms (contact, registration, feedback, order, survey) built from obvious
+# fields do not need the LLM. generate_fields_from_rules() only answers when it
+# recognizes every word of the description; anything else goes to the model.
+
+def _field(name, field_type, options=None):
+    field = {'name': name, 'type': field_type}
+    if options:
+        field['options'] = options
+    return field
+
+FULL_NAME = _field('Full Name', 'VARCHAR(255)')
+EMAIL = _field('Email Address', 'EMAIL')
+PHONE = _field('Phone Number', 'PHONE')
+DATE_OF_BIRTH = _field('Date of Birth', 'DATE')
+ADDRESS = _field('Address', 'TEXTAREA')
+MESSAGE = _field('Message', 'TEXTAREA')
+COMMENTS = _field('Comments', 'TEXTAREA')
+RATING = _field('Rating', 'RADIO', ['1', '2', '3', '4', '5'])
+GENDER = _field('Gender', 'SELECT', ['Female', 'Male', 'Non-binary', 'Prefer not to say'])
+AGE = _field('Age', 'INTEGER')
+
+# (pattern, field), most specific phrases first; each phrase is used up by its match.
+FIELD_RULES = [
+    (r'e-?mail(?: address(?:es)?)?s?', EMAIL),
+    (r'(?:phone|mobile|telephone|cell)(?: numbers?)?', PHONE),
+    (r'date of birth|dob|birth ?date|birthday', DATE_OF_BIRTH),
+    (r'company(?: name)?|organi[sz]ation(?: name)?', _field('Company', 'VARCHAR(255)')),
+    (r'first names?', _field('First Name', 'VARCHAR(255)')),
+    (r'(?:last|family) names?|surnames?', _field('Last Name', 'VARCHAR(255)')),
+    (r'(?:full )?names?', FULL_NAME),
+    (r'(?:shipping|delivery) address(?:es)?', _field('Shipping Address', 'TEXTAREA')),
+    (r'(?:postal |mailing |street |home )?address(?:es)?', ADDRESS),
+    (r'city', _field('City', 'VARCHAR(255)')),
+    (r'country', _field('Country', 'VARCHAR(255)')),
+    (r'(?:zip|postal|post) ?codes?', _field('Postal Code', 'VARCHAR(255)')),
+    (r'(?:website|homepage|portfolio) (?:url|link|address)|urls?', _field('Website', 'URL')),
+    (r'subject', _field('Subject', 'VARCHAR(255)')),
+    (r'messages?', MESSAGE),
+    (r'comments?|remarks|suggestions?', COMMENTS),
+    (r'ratings?|stars?', RATING),
+    (r'gender', GENDER),
+    (r'age', AGE),
+    (r'passwords?', _field('Password', 'PASSWORD')),
+    (r'products?|items?', _field('Product', 'VARCHAR(255)')),
+    (r'quantity|quantities', _field('Quantity', 'INTEGER')),
+    (r'price', _field('Price', 'FLOAT')),
+    (r'(?:delivery|shipping) dates?', _field('Delivery Date', 'DATE')),
+    (r'(?:preferred |appointment )?time', _field('Preferred Time', 'TIME')),
+    (r'(?:preferred |appointment |event |start )?dates?', _field('Date', 'DATE')),
+    (r'newsletter(?: (?:signup|sign-up|subscription))?', _field('Subscribe to Newsletter', 'CHECKBOX')),
+    (r'(?:terms(?: and conditions)?|consent)(?: checkbox)?', _field('I Agree to the Terms and Conditions', 'CHECKBOX')),
+    (r'favou?rite colou?r|colou?r', _field('Favorite Color', 'COLOR')),
+]
+
+# (pattern, default fields) for the kinds of form we know well.
+FORM_TEMPLATES = [
+    (r'contact(?: us)?', [FULL_NAME, EMAIL, PHONE, _field('Subject', 'VARCHAR(255)'), MESSAGE]),
+    (r'regist(?:er|ration)|sign ?-?ups?|enrol(?:l)?(?:ment)?',
+     [FULL_NAME, EMAIL, PHONE, DATE_OF_BIRTH, ADDRESS]),
+    (r'feedback|reviews?', [FULL_NAME, EMAIL, RATING, COMMENTS]),
+    (r'orders?|purchases?', [FULL_NAME, EMAIL, PHONE, _field('Product', 'VARCHAR(255)'),
+                             _field('Quantity', 'INTEGER'), _field('Shipping Address', 'TEXTAREA')]),
+    (r'surveys?|questionnaires?|polls?', [FULL_NAME, EMAIL, AGE, GENDER, RATING, COMMENTS]),
+]
+
+# Words that carry no field of their own ("a simple contact form for our website").
+FILLER_WORDS = frozenset("""
+    a an the and or of for with to in on at by from as that which who their your my our
+    i we me us you need want please create make build generate design add give new
+    simple basic short quick small standard typical general form forms page fields field
+    asking asks ask collect collects collecting capture captures including include includes
+    details detail info information also plus its
+    website site web online app business shop store event events customer customers client
+    clients user users member members people visitor visitors guest guests service services
+""".split())
+
+_compiled_field_rules = [(re.compile(rf'\b(?:{pattern})\b'), field) for pattern, field in FIELD_RULES]
+_compiled_templates = [(re.compile(rf'\b(?:{pattern})\b'), fields) for pattern, fields in FORM_TEMPLATES]
+
+def generate_fields_from_rules(description: str):
+    """
+    Builds the fields for common form descriptions without calling the LLM.
+    Returns a list of field dicts, or None when the description contains anything
+    the rules do not recognize (then the LLM should answer instead).
+    """
+    if not getattr(settings, 'AI_FAST_PATH_ENABLED', True):
+        return None
+    text = ' '.join(re.sub(r"[^\w\s-]", ' ', description.lower()).split())
+
+    template_fields = []
+    for pattern, fields in _compiled_templates:
+        if pattern.search(text):
+            template_fields = fields
+            text = pattern.sub(' ', text)
+            break
+
+    # Explicitly mentioned fields, in the order they appear in the description.
+    mentioned = []
+    for pattern, field in _compiled_field_rules:
+        for match in pattern.finditer(text):
+            mentioned.append((match.start(), field))
+        text = pattern.sub(lambda match: ' ' * len(match.group()), text)
+
+    unrecognized = [word for word in text.split() if word not in FILLER_WORDS]
+    if unrecognized or not (template_fields or mentioned):
+        return None
+
+    fields, names = [], set()
+    for field in [*template_fields, *(field for _, field in sorted(mentioned, key=lambda item: item[0]))]:
+        if field['name'] not in names:
+            names.add(field['name'])
+            fields.append(copy.deepcopy(field))
+    return fields
+
+def _check_generated_json(json_response: str) -> tuple[bool, str]:
     try:
-        response = ollama.generate(
-            model='llama2',
-            prompt=prompt,
-            options={'temperature': 0.1}
+        json.loads(json_response)
+        return (True, json_response)
+    except json.JSONDecodeError as e:
+        error_msg = f"AI returned malformed JSON. Error: {e}\nRaw Response: {json_response}"
+        logger.error(error_msg)
+        return (False, error_msg)
+
+def _llm_options() -> dict:
+    return {'temperature': 0.1}
+
+# Copied directly from your old project.
+# This function is still perfect for generating the JSON structure.
+def generate_fields_with_llama(description: str) -> tuple[bool, str]:
+    """
+    Uses an LLM to generate a form's field structure from a natural language description.
+    Returns a tuple: (success: bool, content: str), where content is either
+    a JSON string of the fields or an error message.
+    """
+    try:
+        client = ollama.Client(host=settings.OLLAMA_HOST, timeout=settings.AI_GENERATION_TIMEOUT)
+        response = client.generate(
+            model=settings.OLLAMA_MODEL,
+            prompt=build_field_prompt(description),
+            options=_llm_options()
         )
-        
-        json_response = response['response']
-        
-        try:
-            json.loads(json_response)
-            return (True, json_response)
-        except json.JSONDecodeError as e:
-            error_msg = f"AI returned malformed JSON. Error: {e}\nRaw Response: {json_response}"
-            logger.error(error_msg)
-            return (False, error_msg)
+        return _check_generated_json(response['response'])
+
+    except Exception as e:
+        logger.error(f"Error calling LLM for field generation: {e}")
+        return (False, f"An error occurred while contacting the AI: {e}")
+
+async def agenerate_fields_with_llama(description: str) -> tuple[bool, str]:
+    """
+    Async version of `generate_fields_with_llama`, for views running under ASGI:
+    the event loop keeps serving other requests while the model is generating.
+    Cancelling the coroutine (e.g. on timeout) closes the connection to Ollama.
+    """
+    try:
+        client = ollama.AsyncClient(host=settings.OLLAMA_HOST, timeout=settings.AI_GENERATION_TIMEOUT)
+        response = await client.generate(
+            model=settings.OLLAMA_MODEL,
+            prompt=build_field_prompt(description),
+            options=_llm_options()
+        )
+        return _check_generated_json(response['response'])
 
+    except asyncio.CancelledError:
+        raise
     except Exception as e:
         logger.error(f"Error calling LLM for field generation: {e}")
-        return (False, f"An error occurred while contacting the AI: {e}")
\ No newline at end of file
+        return (False, f"An error occurred while contacting the AI: {e}")
+
+class IncrementalJSONArrayParser:
+    """
+    Parses a JSON array of objects as it arrives in arbitrary text chunks.
+    `feed(chunk)` returns the top-level objects completed by that chunk, so each
+    field can be used as soon as its closing brace has been generated. Any text
+    before the opening '[' (a chatty preamble) is ignored.
+    """
+    def __init__(self):
+        self._started = False
+        self._finished = False
+        self._depth = 0
+        self._in_string = False
+        self._escaped = False
+        self._current = []
+        self.text = ''
+
+    def feed(self, chunk: str) -> list:
+        self.text += chunk
+        completed = []
+        for char in chunk:
+            if self._finished:
+                break
+            if not self._started:
+                self._started = char == '['
+                continue
+            if self._depth:
+                self._current.append(char)
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif char == '\\':
+                    self._escaped = True
+                elif char == '"':
+                    self._in_string = False
+            elif char == '"':
+                self._in_string = True
+            elif char in '{[':
+                if not self._depth:
+                    self._current = [char]
+                self._depth += 1
+            elif char in '}]':
+                if not self._depth:
+                    # The closing bracket of the array itself.
+                    self._finished = char == ']'
+                    continue
+                self._depth -= 1
+                if not self._depth:
+                    completed.append(self._parse_current())
+        return [item for item in completed if item is not None]
+
+    def _parse_current(self):
+        raw = ''.join(self._current)
+        self._current = []
+        try:
+            return json.loads(raw)
+        except json.JSONDecodeError:
+            logger.warning(f"Skipping malformed field in AI stream: {raw}")
+            return None
+
+    @property
+    def finished(self) -> bool:
+        return self._finished
+
+async def astream_fields_with_llama(description: str):
+    """
+    Streams a generation from the LLM and yields each field object as soon as it is
+    complete. Raises on connection or model errors; the caller enforces the timeout.
+    """
+    client = ollama.AsyncClient(host=settings.OLLAMA_HOST, timeout=settings.AI_GENERATION_TIMEOUT)
+    parser = IncrementalJSONArrayParser()
+    stream = await client.generate(
+        model=settings.OLLAMA_MODEL,
+        prompt=build_field_prompt(description),
+        options=_llm_options(),
+        stream=True,
+    )
+    async for part in stream:
+        for field in parser.feed(part['response']):
+            yield field
+        if parser.finished:
+            break
+
+class ConcurrencyLimiter:
+    """
+    Caps how many calls run at once in this process. `try_acquire` never waits:
+    it returns False straight away when every slot is taken, so callers can
+    answer "busy" instead of queueing. Works across threads and event loops.
+    """
+    def __init__(self, limit: int):
+        self.limit = limit
+        self._slots = threading.BoundedSemaphore(limit)
+
+    def try_acquire(self) -> bool:
+        return self._slots.acquire(blocking=False)
+
+    def release(self) -> None:
+        self._slots.release()
+
+# Shared by every AI endpoint; see AI_MAX_CONCURRENT_GENERATIONS in settings.
+llm_slots = ConcurrencyLimiter(getattr(settings, 'AI_MAX_CONCURRENT_GENERATIONS', 4))
@@ -1,13 +1,28 @@
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth import login
 from django.contrib.auth.decorators import login_required
-from django.http import JsonResponse, HttpResponse
+from django.http import JsonResponse, HttpResponse, StreamingHttpResponse, FileResponse, Http404
+from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.http import require_POST
 from django.urls import reverse  # <--- ADD THIS LINE
-from .decorators import user_has_permission
+from .decorators import api_token_required, user_has_permission
+from .permissions import resolve_form_permission
 from .forms import CustomUserCreationForm, FormCreateForm
-from .models import Form, FormSubmission, SubmissionData, CustomUser, FormPermission, ChildRelationship
-from .utils import generate_fields_with_llama, generate_excel_from_dataframe,generate_pdf_from_dataframe
+from .models import Form, FormSubmission, SubmissionData, CustomUser, FormPermission, ChildRelationship, ExportJob, ImportJob
+from .utils import generate_fields_with_llama, generate_pdf_from_dataframe
+from .submissions import (
+    extract_submission_values, save_submissions, validate_submission_batch, validation_error_messages, write_submission,
+)
+from .matrix import submission_matrix
+from .pagination import SubmissionTable
+from .schema import get_form_schema
+from .analytics import child_form_rollup, rebuild_form_aggregates, render_form_charts, render_sql_charts
+from .metrics import render_metrics
+from .exports import iter_csv_lines, build_xlsx_export, build_pdf_export, enqueue_export, EXPORT_FILE_EXTENSIONS
+from .imports import (
+    detect_file_format, iter_error_report_lines, mapping_targets, read_columns, suggest_mapping, validate_mapping,
+)
+import hmac
 import json
 from django.contrib.auth import logout
 import random
@@ -17,8 +32,8 @@ from django.core.mail import send_mail
 from django.conf import settings
 from django.contrib.auth.decorators import login_required
 from django.db.models import Q
-import pandas as pd
 from django.contrib import messages
+from django.core.exceptions import ValidationError
 
 def home(request):
     """ The main landing page. """
@@ -56,8 +71,8 @@ def dashboard(request):
     if search_query:
         accessible_forms = accessible_forms.filter(form_name__icontains=search_query)
     
-    # Pre-fetch data for efficiency
-    forms_list = accessible_forms.select_related('created_by').prefetch_related('submissions')
+    # Each form carries its own submission counter, so the submissions are not loaded
+    forms_list = accessible_forms.select_related('created_by')
     
     # Data for the stat cards and sidebar
     my_submissions_count = FormSubmission.objects.filter(submitted_by=user).count()
@@ -156,45 +171,17 @@ def form_fill(request, share_token):
     form_obj = get_object_or_404(Form, share_token=share_token, status='active')
     
     if request.method == 'POST':
-        # Create the main submission record
-        submission = FormSubmission.objects.create(
-            form=form_obj
-            # Note: No `submitted_by` because it's a public form
-        )
-
-        # CORRECTED AND ROBUST DATA SAVING LOGIC
-        # Iterate through the DEFINED fields to correctly handle all types
-        for field in form_obj.fields:
-            field_name = field['name']
-            field_type = field.get('type')
-
-            # Handle File Uploads
-            if field_type == 'FILE':
-                if field_name in request.FILES:
-                    uploaded_file = request.FILES[field_name]
-                    # NOTE: In a production app, you would save this file to a proper
-                    # media storage (like S3 or local MEDIA_ROOT) and store its path.
-                    # For now, we save the filename and size as a record.
-                    SubmissionData.objects.create(
-                        submission=submission,
-                        field_name=field_name,
-                        field_value=f"Uploaded: {uploaded_file.name} ({uploaded_file.size} bytes)"
-                    )
-                continue # Skip to the next field in the loop
-
-            # Handle standard POST data
-            if field_name in request.POST:
-                # Handle multi-value fields (e.g., MULTISELECT, checkbox groups)
-                # This uses getlist() to capture all selected values.
-                if field_type in ['MULTISELECT'] or (field_type == 'CHECKBOX' and 'options' in field):
-                    values = request.POST.getlist(field_name)
-                    # We store the list of values as a JSON string in the database
-                    field_value = json.dumps(values)
-                else: # Handle single-value fields (text, radio, single checkbox, etc.)
-                    field_value = request.POST.get(field_name)
-                
-                SubmissionData.objects.create(submission=submission, field_name=field_name, field_value=field_value)
-        # END OF CORRECTED LOGIC
+        # Validate the whole payload, then write the submission and all of its
+        # data rows in one atomic batch.
+        # Note: No `submitted_by` because it's a public form
+        values = extract_submission_values(form_obj, request)
+        try:
+            write_submission(form_obj, values)
+        except ValidationError as e:
+            return render(request, 'core/form_fill.html', {
+                'form': form_obj,
+                'errors': validation_error_messages(e),
+            })
 
         return render(request, 'core/form_submit_success.html', {'form': form_obj})
 
@@ -227,92 +214,454 @@ def form_fill(request, share_token):
 # Add these imports at the top of the file
 from django.http import JsonResponse
 from django.views.decorators.http import require_POST
-from .utils import generate_fields_with_llama
+from .utils import agenerate_fields_with_llama, astream_fields_with_llama, llm_slots
+from .ai_cache import afast_path_fields, aget_cached_fields, astore_fields, cache_stats
+import asyncio
+import logging
+
+logger = logging.getLogger(__name__)
 
 # ... (keep all your existing views like home, register, etc.) ...
 
 # NEW VIEW for AI generation
 @require_POST  # This view only accepts POST requests
 @login_required # Make sure only logged-in users can use the AI
-def generate_ai_fields_api(request):
-    """An API endpoint to generate form fields using AI."""
+async def generate_ai_fields_api(request):
+    """
+    An API endpoint to generate form fields using AI.
+
+    Async, so under ASGI (form_project/asgi.py) waiting on the model does not tie up
+    a worker. At most AI_MAX_CONCURRENT_GENERATIONS calls run at once; beyond that
+    the endpoint answers 429 immediately, and it gives up after AI_GENERATION_TIMEOUT.
+    """
     try:
         # Get the description from the POST data sent by the frontend
         data = json.loads(request.body)
         description = data.get('description')
+    except (json.JSONDecodeError, AttributeError):
+        return JsonResponse({'error': 'Invalid request format.'}, status=400)
 
-        if not description:
-            return JsonResponse({'error': 'Description is required.'}, status=400)
-
+    if description is not None and not isinstance(description, str):
+        return JsonResponse({'error': 'Description must be a string.'}, status=400)
+    description = (description or '').strip()
+    if not description:
+        return JsonResponse({'error': 'Description is required.'}, status=400)
+
+    # Common forms (contact, registration, ...) are answered by local rules at once.
+    rule_fields = await afast_path_fields(description)
+    if rule_fields is not None:
+        return JsonResponse({'fields': rule_fields}, headers={'X-AI-Source': 'rules'})
+
+    # Near-identical descriptions were probably asked for before; answer from the cache.
+    cached_fields = await aget_cached_fields(description)
+    if cached_fields is not None:
+        return JsonResponse({'fields': cached_fields}, headers={'X-AI-Cache': 'hit'})
+
+    if not llm_slots.try_acquire():
+        return JsonResponse(
+            {'error': 'The AI is busy right now. Please try again in a few seconds.'},
+            status=429,
+            headers={'Retry-After': str(settings.AI_RETRY_AFTER_SECONDS)},
+        )
+    try:
         # Call our utility function
-        success, content = generate_fields_with_llama(description)
+        success, content = await asyncio.wait_for(
+            agenerate_fields_with_llama(description), timeout=settings.AI_GENERATION_TIMEOUT
+        )
+    except asyncio.TimeoutError:
+        return JsonResponse({'error': 'AI generation timed out. Please try a shorter description.'}, status=504)
+    finally:
+        llm_slots.release()
 
-        if success:
-            # The content is already a JSON string, so we can return it directly
-            # We parse it and dump it again to ensure it's valid JSON.
-            return JsonResponse({'fields': json.loads(content)})
-        else:
-            # If the AI failed, return an error message
-            return JsonResponse({'error': f'AI generation failed: {content}'}, status=500)
-    
-    except json.JSONDecodeError:
+    if success:
+        # The content is already a JSON string; parse it to return it as an object.
+        fields = json.loads(content)
+        await astore_fields(description, fields)
+        return JsonResponse({'fields': fields}, headers={'X-AI-Cache': 'miss'})
+    # If the AI failed, return an error message
+    return JsonResponse({'error': f'AI generation failed: {content}'}, status=500)
+
+
+def _sse_event(event, data):
+    """Formats one Server-Sent Event frame."""
+    return f'event: {event}\ndata: {json.dumps(data)}\n\n'
+
+
+async def _sse_replay(fields):
+    """Sends fields that are already known (cached or rule-based) as one burst of events."""
+    for field in fields:
+        yield _sse_event('field', field)
+    yield _sse_event('done', {'count': len(fields)})
+
+
+@require_POST
+@login_required
+async def generate_ai_fields_stream_api(request):
+    """
+    Streaming variant of generate_ai_fields_api, sent as Server-Sent Events.
+
+    Each field is sent as a `field` event as soon as the model has finished writing
+    it, followed by one `done` event (or an `error` event). Rule-based and cached
+    answers are sent straight away. The concurrency cap and AI_GENERATION_TIMEOUT
+    apply to the whole stream; when every slot is taken, the stream is a single
+    `error` event.
+    """
+    try:
+        data = json.loads(request.body)
+        description = data.get('description')
+    except (json.JSONDecodeError, AttributeError):
         return JsonResponse({'error': 'Invalid request format.'}, status=400)
-    except Exception as e:
-        return JsonResponse({'error': str(e)}, status=500)
+
+    if description is not None and not isinstance(description, str):
+        return JsonResponse({'error': 'Description must be a string.'}, status=400)
+    description = (description or '').strip()
+    if not description:
+        return JsonResponse({'error': 'Description is required.'}, status=400)
+
+    headers = {'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+
+    rule_fields = await afast_path_fields(description)
+    if rule_fields is not None:
+        return StreamingHttpResponse(
+            _sse_replay(rule_fields), content_type='text/event-stream', headers={**headers, 'X-AI-Source': 'rules'}
+        )
+
+    cached_fields = await aget_cached_fields(description)
+    if cached_fields is not None:
+        return StreamingHttpResponse(
+            _sse_replay(cached_fields), content_type='text/event-stream', headers={**headers, 'X-AI-Cache': 'hit'}
+        )
+
+    async def events():
+        # The slot is taken here rather than in the view: a response that is never
+        # iterated (the client went away first) then never holds one.
+        if not llm_slots.try_acquire():
+            yield _sse_event('error', {'error': 'The AI is busy right now. Please try again in a few seconds.'})
+            return
+        fields = []
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + settings.AI_GENERATION_TIMEOUT
+        stream = astream_fields_with_llama(description)
+        try:
+            while True:
+                try:
+                    field = await asyncio.wait_for(anext(stream), timeout=deadline - loop.time())
+                except StopAsyncIteration:
+                    break
+                fields.append(field)
+                yield _sse_event('field', field)
+        except asyncio.TimeoutError:
+            yield _sse_event('error', {'error': 'AI generation timed out. Please try a shorter description.'})
+            return
+        except Exception as e:
+            logger.error(f"Error streaming AI field generation: {e}")
+            yield _sse_event('error', {'error': f'AI generation failed: {e}'})
+            return
+        finally:
+            await stream.aclose()
+            llm_slots.release()
+
+        if not fields:
+            yield _sse_event('error', {'error': 'AI generation failed: the model returned no fields.'})
+            return
+        await astore_fields(description, fields)
+        yield _sse_event('done', {'count': len(fields)})
+
+    return StreamingHttpResponse(
+        events(), content_type='text/event-stream', headers={**headers, 'X-AI-Cache': 'miss'}
+    )
+
+
+@login_required
+def ai_cache_stats_api(request):
+    """Hit/miss counters of the AI generation cache, for global admins."""
+    if request.user.role != 'admin':
+        raise Http404
+    return JsonResponse(cache_stats())
     # forms_app/views.py
 
 
+def metrics(request):
+    """
+    Per-view latency, SQL and response size metrics (core.metrics) in the Prometheus
+    text format. Staff users can open it in the browser; a scraper can send
+    `Authorization: Bearer <METRICS_TOKEN>` instead of logging in.
+    """
+    token = getattr(settings, 'METRICS_TOKEN', '')
+    authorization = request.headers.get('Authorization', '')
+    has_token = bool(token) and hmac.compare_digest(authorization, f'Bearer {token}')
+    if not has_token and not (request.user.is_authenticated and request.user.is_staff):
+        raise Http404
+    return HttpResponse(render_metrics(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+@csrf_exempt
+@require_POST
+@api_token_required
+@user_has_permission(required_levels=['viewer', 'editor', 'admin'])
+def submissions_batch_api(request, form_id):
+    """
+    Stores a batch of submissions for a machine client authenticated with an API
+    token (core.api_tokens). The body is a JSON array of submissions, or an object
+    with a "submissions" array, where each submission is
+    {"values": {field: value}, "parent_submission_id": id (optional)}.
+
+    Every item is validated against the form. Either all of them are saved in one
+    transaction (201, with the new ids) or, if any item is invalid, none are (400);
+    either way "results" reports on each item, in order.
+    """
+    form_obj = request.form  # loaded by @user_has_permission
+    if form_obj.status != 'active':
+        return JsonResponse({'error': 'This form is not accepting submissions.'}, status=409)
+    try:
+        payload = json.loads(request.body)
+    except (json.JSONDecodeError, UnicodeDecodeError):
+        return JsonResponse({'error': 'The request body must be JSON.'}, status=400)
+    items = payload.get('submissions') if isinstance(payload, dict) else payload
+    if not isinstance(items, list) or not items:
+        return JsonResponse({'error': 'Send a non-empty array of submissions.'}, status=400)
+    max_items = getattr(settings, 'API_BATCH_MAX_SUBMISSIONS', 500)
+    if len(items) > max_items:
+        return JsonResponse({'error': f'Send at most {max_items} submissions per request.'}, status=413)
+
+    batch, shape_errors = [], {}
+    for index, item in enumerate(items):
+        if isinstance(item, dict) and isinstance(item.get('values'), dict):
+            batch.append((item['values'], item.get('parent_submission_id')))
+        else:
+            shape_errors[index] = {'__all__': ['Expected an object with a "values" object.']}
+            batch.append(({}, None))
+    cleaned_batch, errors = validate_submission_batch(form_obj, batch)
+    errors.update(shape_errors)
+
+    if errors:
+        results = [
+            {'index': index, 'status': 'invalid', 'errors': errors[index]} if index in errors
+            else {'index': index, 'status': 'valid'}
+            for index in range(len(items))
+        ]
+        return JsonResponse({
+            'error': f'{len(errors)} of {len(items)} submissions are invalid; nothing was saved.',
+            'created': 0,
+            'results': results,
+        }, status=400)
+
+    submissions = save_submissions(form_obj, cleaned_batch, submitted_by=request.user)
+    return JsonResponse({
+        'created': len(submissions),
+        'results': [
+            {'index': index, 'status': 'created', 'id': submission.pk}
+            for index, submission in enumerate(submissions)
+        ],
+    }, status=201)
+
+
 
 @user_has_permission(required_levels=['editor', 'admin'])
 @login_required
 def export_form_data_csv(request, form_id):
-    form_obj = get_object_or_404(Form, pk=form_id)
-    
-    # This is a simplified data retrieval. We'll improve it.
-    submissions = form_obj.submissions.all()
-    data = []
-    for sub in submissions:
-        row = {entry.field_name: entry.field_value for entry in sub.data_entries.all()}
-        row['submitted_at'] = sub.submitted_at
-        data.append(row)
-
-    if not data:
+    form_obj = request.form  # loaded by @user_has_permission
+
+    if not form_obj.submissions.exists():
         # Handle case with no submissions
         return HttpResponse("No data to export.", status=404)
 
-    df = pd.DataFrame(data)
-    
-    response = HttpResponse(
+    # Rows are written to the client as they are read from the database,
+    # so memory use does not grow with the number of submissions.
+    return StreamingHttpResponse(
+        iter_csv_lines(form_obj),
         content_type='text/csv',
         headers={'Content-Disposition': f'attachment; filename="{form_obj.form_name}.csv"'},
     )
-    df.to_csv(path_or_buf=response, index=False)
-    return response
 
 @user_has_permission(required_levels=['editor', 'admin'])
 @login_required
 def export_form_data_excel(request, form_id):
-    form_obj = get_object_or_404(Form, pk=form_id)
-    
-    submissions = form_obj.submissions.all()
-    data = []
-    for sub in submissions:
-        row = {entry.field_name: entry.field_value for entry in sub.data_entries.all()}
-        row['submitted_at'] = sub.submitted_at
-        data.append(row)
-
-    if not data:
-        return HttpResponse("No data to export.", status=404)
+    form_obj = request.form  # loaded by @user_has_permission
 
-    df = pd.DataFrame(data)
-    excel_bytes = generate_excel_from_dataframe(df)
+    if not form_obj.submissions.exists():
+        return HttpResponse("No data to export.", status=404)
 
-    response = HttpResponse(
-        excel_bytes,
+    # The workbook is written row by row to a temporary file on disk,
+    # which FileResponse then streams to the client and closes (deleting it).
+    excel_file = build_xlsx_export(form_obj)
+    return FileResponse(
+        excel_file,
+        as_attachment=True,
+        filename=f"{form_obj.form_name}.xlsx",
         content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
-        headers={'Content-Disposition': f'attachment; filename="{form_obj.form_name}.xlsx"'},
     )
-    return response
+def _export_job_payload(job):
+    """The JSON shape returned by the export job endpoints."""
+    payload = {
+        'id': job.id,
+        'format': job.export_format,
+        'status': job.status,
+        'progress': job.progress,
+        'rows_done': job.rows_done,
+        'rows_total': job.rows_total,
+        'status_url': reverse('export_job_status', kwargs={'job_id': job.id}),
+        'download_url': None,
+        'error': job.error or None,
+    }
+    if job.status == 'done':
+        payload['download_url'] = reverse('export_job_download', kwargs={'job_id': job.id})
+    return payload
+
+def _get_export_job_for_user(request, job_id):
+    """
+    Anyone who may export the form (its editors and admins) can see or download a
+    job, since `enqueue_export` hands the same job to every editor who asks for it.
+    """
+    job = get_object_or_404(ExportJob, pk=job_id)
+    job.form, level = resolve_form_permission(request, job.form_id)
+    if level not in ('editor', 'admin'):
+        raise Http404
+    return job
+
+@require_POST
+@user_has_permission(required_levels=['editor', 'admin'])
+@login_required
+def export_job_create(request, form_id):
+    """
+    Queues a background export for the `run_export_worker` command to build.
+    Returns the existing file if nothing has changed since it was built.
+    """
+    form_obj = request.form  # loaded by @user_has_permission
+    export_format = request.POST.get('format')
+    if export_format not in EXPORT_FILE_EXTENSIONS:
+        return JsonResponse({'error': 'Unknown export format.'}, status=400)
+
+    job = enqueue_export(form_obj, export_format, requested_by=request.user)
+    return JsonResponse(_export_job_payload(job), status=200 if job.status == 'done' else 202)
+
+@login_required
+def export_job_status(request, job_id):
+    """Lets the browser poll the progress of a queued export."""
+    job = _get_export_job_for_user(request, job_id)
+    return JsonResponse(_export_job_payload(job))
+
+@login_required
+def export_job_download(request, job_id):
+    """Serves the file built by a finished export job."""
+    job = _get_export_job_for_user(request, job_id)
+    if job.status != 'done' or not job.file:
+        raise Http404
+    return FileResponse(
+        job.file.open('rb'),
+        as_attachment=True,
+        filename=f"{job.form.form_name}.{EXPORT_FILE_EXTENSIONS[job.export_format]}",
+    )
+
+def _import_job_payload(job):
+    """The JSON shape returned by the import job endpoints."""
+    return {
+        'id': job.id,
+        'format': job.file_format,
+        'status': job.status,
+        'progress': job.progress,
+        'columns': job.columns,
+        'column_mapping': job.column_mapping,
+        'rows_done': job.rows_done,
+        'rows_total': job.rows_total,
+        'rows_imported': job.rows_imported,
+        'rows_failed': job.rows_failed,
+        'status_url': reverse('import_job_status', kwargs={'job_id': job.id}),
+        'start_url': reverse('import_job_start', kwargs={'job_id': job.id}),
+        'errors_url': reverse('import_job_errors', kwargs={'job_id': job.id}) if job.row_errors else None,
+        'error': job.error or None,
+    }
+
+def _get_import_job_for_user(request, job_id):
+    """
+    Only the user who uploaded a file (or a global admin) can see or start its job,
+    and only while they can still edit the form.
+    """
+    job = get_object_or_404(ImportJob, pk=job_id)
+    if request.user.role != 'admin' and job.requested_by_id != request.user.id:
+        raise Http404
+    job.form, level = resolve_form_permission(request, job.form_id)
+    if level not in ('editor', 'admin'):
+        raise Http404
+    return job
+
+@require_POST
+@user_has_permission(required_levels=['editor', 'admin'])
+@login_required
+def import_job_create(request, form_id):
+    """
+    Stores an uploaded CSV/Excel file as an import job and returns its columns with
+    a suggested mapping to the form's fields. Nothing is imported until the mapping
+    is confirmed with `import_job_start`.
+    """
+    form_obj = request.form  # loaded by @user_has_permission
+    uploaded_file = request.FILES.get('file')
+    file_format = detect_file_format(uploaded_file.name) if uploaded_file else None
+    if file_format is None:
+        return JsonResponse({'error': 'Upload a .csv or .xlsx file.'}, status=400)
+
+    job = ImportJob.objects.create(
+        form=form_obj, requested_by=request.user, file=uploaded_file, file_format=file_format,
+    )
+    try:
+        job.columns = read_columns(job)
+    except Exception:
+        job.file.delete(save=False)
+        job.delete()
+        return JsonResponse({'error': 'The file could not be read.'}, status=400)
+    if not any(job.columns):
+        job.file.delete(save=False)
+        job.delete()
+        return JsonResponse({'error': 'The file has no header row.'}, status=400)
+    job.column_mapping = suggest_mapping(job.columns, form_obj)
+    job.save(update_fields=['columns', 'column_mapping'])
+
+    payload = _import_job_payload(job)
+    payload['targets'] = mapping_targets(form_obj)
+    return JsonResponse(payload, status=201)
+
+@require_POST
+@login_required
+def import_job_start(request, job_id):
+    """Saves the {column: field} mapping of an uploaded file and queues the import."""
+    job = _get_import_job_for_user(request, job_id)
+    if job.status != 'uploaded':
+        return JsonResponse({'error': 'This import has already been started.'}, status=409)
+    try:
+        # The mapping comes either as a JSON body ({"mapping": {...}} or the bare
+        # object) or as a JSON-encoded 'mapping' form field.
+        if request.content_type == 'application/json':
+            mapping = json.loads(request.body or b'{}')
+            if isinstance(mapping, dict) and 'mapping' in mapping:
+                mapping = mapping['mapping']
+        else:
+            mapping = json.loads(request.POST.get('mapping') or '{}')
+        validate_mapping(mapping, job.columns, job.form)
+    except json.JSONDecodeError:
+        return JsonResponse({'error': 'The mapping must be a JSON object.'}, status=400)
+    except ValidationError as e:
+        return JsonResponse({'error': ' '.join(e.messages)}, status=400)
+
+    job.column_mapping = mapping
+    job.status = 'pending'
+    job.save(update_fields=['column_mapping', 'status'])
+    return JsonResponse(_import_job_payload(job), status=202)
+
+@login_required
+def import_job_status(request, job_id):
+    """Lets the browser poll the progress of an import."""
+    job = _get_import_job_for_user(request, job_id)
+    return JsonResponse(_import_job_payload(job))
+
+@login_required
+def import_job_errors(request, job_id):
+    """The rows an import skipped, with the reason, as a CSV file."""
+    job = _get_import_job_for_user(request, job_id)
+    return HttpResponse(
+        ''.join(iter_error_report_lines(job)),
+        content_type='text/csv',
+        headers={'Content-Disposition': f'attachment; filename="import-{job.id}-errors.csv"'},
+    )
+
 # Add this new view to core/views.py
 
 @login_required
@@ -332,62 +681,84 @@ def my_submissions(request):
 @user_has_permission(required_levels=['viewer', 'editor', 'admin'])
 @login_required
 def form_detail(request, form_id):
-    form_obj = get_object_or_404(Form, pk=form_id)
-    
-    # --- MODIFICATION: PRE-FETCH THE PARENT SUBMISSION ---
-    # We use select_related to efficiently get the parent submission data in the same query.
-    submissions = form_obj.submissions.select_related(
-        'parent_submission'
-    ).prefetch_related('data_entries').order_by('-submitted_at')
+    form_obj = request.form  # loaded by @user_has_permission
     
-    # Get the header names from the form's JSON definition
-    headers = [field['name'] for field in form_obj.fields]
+    # Server-side keyset pagination: only the visible page of submissions is read,
+    # sorted and filtered by the GET parameters (see core.pagination.SubmissionTable).
+    table = SubmissionTable(form_obj, request.GET)
+    page = table.page()
 
-    # --- NEW: ADD "LINKED PARENT" TO HEADERS IF THIS IS A CHILD FORM ---
-    if form_obj.parent_form:
-        headers.append('Linked Parent')
-    
-    headers.append('Submitted At') # Add our own column
+    # --- NEW: LOAD THE "LINKED PARENT" RECORDS OF THIS PAGE IN ONE QUERY ---
+    linked_parents = {}
+    if form_obj.parent_form_id:
+        parent_ids = {parent_id for _, parent_id, *_ in page['rows'] if parent_id}
+        linked_parents = FormSubmission.objects.select_related('form').in_bulk(parent_ids)
 
     # Process submissions into a list of lists for easy rendering in the template
     processed_submissions = []
-    for sub in submissions:
-        # Create a dictionary with default empty values for all headers
-        row_dict = {header: "" for header in headers}
-        for entry in sub.data_entries.all():
-            if entry.field_name in row_dict:
-                row_dict[entry.field_name] = entry.field_value
-        
+    for submitted_at, parent_id, *values in page['rows']:
+        ordered_row = ["" if value is None else value for value in values]
+
         # --- NEW: POPULATE THE "LINKED PARENT" DATA ---
-        if form_obj.parent_form and sub.parent_submission:
-            # The str(sub.parent_submission) will use our intelligent __str__ method
+        if form_obj.parent_form_id:
+            # The str() of the parent uses our intelligent __str__ method
             # to display a user-friendly name, e.g., "TCS (Company Form)"
-            row_dict['Linked Parent'] = str(sub.parent_submission)
+            parent = linked_parents.get(parent_id)
+            ordered_row.append(str(parent) if parent else "")
         
-        row_dict['Submitted At'] = sub.submitted_at.strftime('%Y-%m-%d %H:%M')
-        
-        # Ensure the row is ordered according to the headers
-        ordered_row = [row_dict[header] for header in headers]
+        ordered_row.append(submitted_at.strftime('%Y-%m-%d %H:%M'))
         processed_submissions.append(ordered_row)
 
-    # ... (The rest of the view, including context, remains the same) ...
-    all_users = CustomUser.objects.all()
+    # Keep the current sort, filters and search when following the page links.
+    query_without_cursor = request.GET.copy()
+    query_without_cursor.pop('after', None)
+    query_without_cursor.pop('before', None)
+    base_query = query_without_cursor.urlencode()
+    page_links = {
+        'next': f"?{base_query}&after={page['next_cursor']}" if page['next_cursor'] else None,
+        'prev': f"?{base_query}&before={page['prev_cursor']}" if page['prev_cursor'] else None,
+    }
+
+    def sort_url(sort_field, direction):
+        params = query_without_cursor.copy()
+        params['sort'] = sort_field
+        params['dir'] = direction
+        return f"?{params.urlencode()}"
+
+    columns = table.columns()
+    for column in columns:
+        column['sort_url'] = sort_url(column['name'], column['next_dir'])
+    submitted_at_sort_url = sort_url('', 'asc' if table.sort is None and table.direction == 'desc' else 'desc')
+
     full_share_url = None
     if form_obj.share_token:
         relative_url = reverse('form_fill', kwargs={'share_token': form_obj.share_token})
         full_share_url = request.build_absolute_uri(relative_url)
 
-    user_is_form_admin = False
-    if request.user.role == 'admin' or form_obj.created_by == request.user or FormPermission.objects.filter(form=form_obj, user=request.user, permission_level='admin').exists():
-        user_is_form_admin = True
+    user_is_form_admin = request.form_permission == 'admin'
+
+    # The user picker is only shown to form admins, so only they pay for loading it.
+    all_users = []
+    if user_is_form_admin:
+        all_users = CustomUser.objects.exclude(
+            pk__in=[request.user.pk, form_obj.created_by_id]
+        ).only('id', 'username').order_by('username')
         
     context = {
         'form': form_obj,
-        'headers': headers,
+        'columns': columns,
+        'submitted_at_sort_url': submitted_at_sort_url,
+        'show_linked_parent': bool(form_obj.parent_form_id),
+        'sort': table.sort,
+        'sort_dir': table.direction,
         'submissions_data': processed_submissions,
+        'total_submissions': form_obj.submission_count,
+        'page_links': page_links,
+        'search_query': table.search_query,
         'full_share_url': full_share_url,
         'all_users': all_users,
         'user_is_form_admin': user_is_form_admin,
+        'user_can_import': request.form_permission in ('editor', 'admin'),
     }
     return render(request, 'core/form_detail.html', context)
 @login_required
@@ -408,7 +779,7 @@ def internal_form_fill(request):
         
         # If this is a child form, get its parent's records for the dropdown
         if selected_form.parent_form:
-            parent_submissions = FormSubmission.objects.filter(form=selected_form.parent_form)
+            parent_submissions = FormSubmission.objects.filter(form=selected_form.parent_form).with_labels()
             # The __str__ method on FormSubmission now handles user-friendly display text
             parent_records = [{'id': sub.id, 'display_text': str(sub)} for sub in parent_submissions]
 
@@ -417,14 +788,18 @@ def internal_form_fill(request):
             selected_parent_id = request.GET.get('parent_id')
             if selected_parent_id:
                 try:
-                    parent_submission = FormSubmission.objects.get(pk=selected_parent_id)
+                    parent_form = selected_form.parent_form
+                    parent_fields = get_form_schema(parent_form).field_names
                     # Extract its data into a simple dictionary for display in the template
+                    parent_id, *values = submission_matrix(
+                        parent_form, parent_fields, extra_fields=('id',)
+                    ).get(pk=selected_parent_id)
                     selected_parent_info = {
-                        'id': parent_submission.id,
-                        'form_name': parent_submission.form.form_name,
-                        'data': {entry.field_name: entry.field_value for entry in parent_submission.data_entries.all()}
+                        'id': parent_id,
+                        'form_name': parent_form.form_name,
+                        'data': {name: value for name, value in zip(parent_fields, values) if value is not None}
                     }
-                except FormSubmission.DoesNotExist:
+                except (FormSubmission.DoesNotExist, ValueError):
                     pass # Ignore if an invalid ID is passed
             # --- END OF NEW LOGIC ---
 
@@ -437,38 +812,19 @@ def internal_form_fill(request):
             return redirect('dashboard')
 
         form_to_submit = get_object_or_404(Form, pk=form_to_submit_id)
-        submission = FormSubmission.objects.create(
-            form=form_to_submit,
-            submitted_by=request.user,
-            parent_submission_id=parent_submission_id if parent_submission_id else None
-        )
+        values = extract_submission_values(form_to_submit, request)
+        try:
+            write_submission(
+                form_to_submit,
+                values,
+                submitted_by=request.user,
+                parent_submission_id=parent_submission_id,
+            )
+        except ValidationError as e:
+            for error_message in validation_error_messages(e):
+                messages.error(request, error_message)
+            return redirect(f"{reverse('internal_form_fill')}?form_id={form_to_submit.id}")
 
-        # CORRECTED AND ROBUST DATA SAVING LOGIC
-        for field in form_to_submit.fields:
-            field_name = field['name']
-            field_type = field.get('type')
-
-            # Handle file uploads
-            if field_type == 'FILE' and field_name in request.FILES:
-                uploaded_file = request.FILES[field_name]
-                SubmissionData.objects.create(
-                    submission=submission, field_name=field_name,
-                    field_value=f"Uploaded: {uploaded_file.name} ({uploaded_file.size} bytes)"
-                )
-                continue
-
-            # Handle standard POST data
-            if field_name in request.POST:
-                # Handle multi-value fields
-                if field_type in ['MULTISELECT'] or (field_type == 'CHECKBOX' and 'options' in field):
-                    values = request.POST.getlist(field_name)
-                    field_value = json.dumps(values)
-                else: # Handle single-value fields
-                    field_value = request.POST.get(field_name)
-                
-                SubmissionData.objects.create(submission=submission, field_name=field_name, field_value=field_value)
-        # END OF CORRECTED LOGIC
-        
         messages.success(request, "Submission saved successfully!")
         return redirect('form_detail', form_id=form_to_submit.id)
     context = {
@@ -486,7 +842,7 @@ def form_edit(request, form_id):
     """
     Handles editing a form and creating a new version.
     """
-    original_form = get_object_or_404(Form, pk=form_id)
+    original_form = request.form  # loaded by @user_has_permission
 
     if request.method == 'POST':
         # We still use the form for validation, but handle saving manually
@@ -543,8 +899,6 @@ def form_edit(request, form_id):
     }
     return render(request, 'core/form_edit.html', context)
 # core/views.py
-import plotly.express as px
-import pandas as pd
 from django.db.models import Count
 from django.db.models import Q 
 
@@ -554,94 +908,49 @@ def form_analytics(request, form_id):
     """
     Displays an analytics dashboard with dynamic charts for a form.
     """
-    form_obj = get_object_or_404(Form, pk=form_id)
-    submissions = form_obj.submissions.prefetch_related('data_entries').order_by('-submitted_at')
-
-    # --- DATA PREPARATION ---
-    # Pivot the submission data into a pandas DataFrame, which is ideal for analytics.
-    data = []
-    for sub in submissions:
-        # Create a dictionary for each row
-        row = {entry.field_name: entry.field_value for entry in sub.data_entries.all()}
-        row['submitted_at'] = sub.submitted_at
-        data.append(row)
-
-    if not data:
+    form_obj = request.form  # loaded by @user_has_permission
+
+    if form_obj.submission_count == 0:
         # If there are no submissions, just render the page with a message
         return render(request, 'core/form_analytics.html', {'form': form_obj, 'charts': []})
 
-    df = pd.DataFrame(data)
-
     # --- CHART GENERATION ---
-    charts = []
-    # Get the field types from the form's definition to decide what kind of chart to make
-    field_definitions = {field['name']: field for field in form_obj.fields}
-
-    for col in df.columns:
-        if col == 'submitted_at' or col not in field_definitions:
-            continue # Skip metadata columns
-
-        field_type = field_definitions[col].get('type')
-        chart_div = None
-
-        try:
-            # Chart for NUMERIC data (Integers, Floats)
-            if field_type in ['INTEGER', 'FLOAT']:
-                # Convert column to numeric, coercing errors to NaN (Not a Number)
-                numeric_series = pd.to_numeric(df[col], errors='coerce').dropna()
-                if not numeric_series.empty:
-                    fig = px.histogram(numeric_series, x=col, title=f'Distribution of {col}', template='plotly_white')
-                    chart_div = fig.to_html(full_html=False, include_plotlyjs='cdn')
-
-            # Chart for CATEGORICAL data (Select, Radio)
-            elif field_type in ['SELECT', 'RADIO']:
-                # Count the occurrences of each option
-                counts = df[col].value_counts()
-                if not counts.empty:
-                    fig = px.pie(values=counts.values, names=counts.index, title=f'Distribution of {col}', hole=0.3)
-                    chart_div = fig.to_html(full_html=False, include_plotlyjs='cdn')
-
-            # Chart for DATE data
-            elif field_type in ['DATE', 'DATETIME']:
-                # Convert to datetime and group by day
-                date_series = pd.to_datetime(df[col], errors='coerce').dropna().dt.date
-                if not date_series.empty:
-                    counts = date_series.value_counts().sort_index()
-                    fig = px.bar(x=counts.index, y=counts.values, title=f'Submissions by Date for {col}', labels={'x':'Date', 'y':'Count'})
-                    chart_div = fig.to_html(full_html=False, include_plotlyjs='cdn')
-            
-            if chart_div:
-                charts.append(chart_div)
-        
-        except Exception as e:
-            # This will catch any errors during chart generation for a specific column
-            print(f"Could not generate chart for column '{col}': {e}")
-
+    # Charts are drawn from the per-field aggregates kept up to date on every submit,
+    # and each rendered chart is cached until its field's data changes (see core.analytics).
+    # Submissions were deleted or edited since the aggregates were last built. Small
+    # forms are rebuilt right here; larger ones are aggregated in SQL until
+    # `manage.py rebuild_form_analytics` rebuilds them.
+    if not form_obj.analytics_ready and form_obj.submission_count <= getattr(settings, 'ANALYTICS_INLINE_REBUILD_LIMIT', 5000):
+        rebuild_form_aggregates(form_obj)
+        form_obj.analytics_ready = True
+    if form_obj.analytics_ready:
+        charts = render_form_charts(form_obj)
+    else:
+        charts = render_sql_charts(form_obj)
 
     # --- CHILD DATA ROLL-UP ---
-    child_form_stats = []
-    child_forms = form_obj.child_forms.filter(status='active') # Get all child forms
-    if child_forms.exists():
-        for child_form in child_forms:
-            # Count submissions for each child form that are linked to this parent form's submissions
-            count = FormSubmission.objects.filter(
-                form=child_form,
-                parent_submission__form=form_obj
-            ).count()
-            child_form_stats.append({'name': child_form.form_name, 'count': count})
-            
+    # Submissions of each active child form linked to this form's submissions, in one
+    # query. `?depth=2` (up to ANALYTICS_MAX_ROLLUP_DEPTH) adds grandchildren and so on.
+    try:
+        rollup_depth = int(request.GET.get('depth', 1))
+    except ValueError:
+        rollup_depth = 1
+    rollup_depth = max(1, min(rollup_depth, getattr(settings, 'ANALYTICS_MAX_ROLLUP_DEPTH', 5)))
+    child_form_stats = child_form_rollup(form_obj, depth=rollup_depth)
+
     context = {
         'form': form_obj,
         'charts': charts,
-        'total_submissions': len(df),
+        'total_submissions': form_obj.submission_count,
         'child_form_stats': child_form_stats,
+        'rollup_depth': rollup_depth,
     }
     return render(request, 'core/form_analytics.html', context)
 
 @user_has_permission(required_levels=['admin']) # Only form admins can manage permissions
 @login_required
 def manage_form_permissions(request, form_id):
-    form = get_object_or_404(Form, pk=form_id)
+    form = request.form  # loaded by @user_has_permission
     if request.method == 'POST':
         user_id = request.POST.get('user_id')
         permission_level = request.POST.get('permission_level')
@@ -683,34 +992,20 @@ def export_form_data_pdf(request, form_id):
     """
     Fetches form submission data and returns it as a downloadable PDF file.
     """
-    form_obj = get_object_or_404(Form, pk=form_id)
-    
-    # 1. Fetch and pivot data into a DataFrame (same logic as CSV/Excel)
-    submissions = form_obj.submissions.prefetch_related('data_entries').order_by('submitted_at')
-    data = []
-    headers = [field['name'] for field in form_obj.fields] # Get headers from form definition
+    form_obj = request.form  # loaded by @user_has_permission
     
-    for sub in submissions:
-        row_dict = {header: "" for header in headers} # Initialize with all possible headers
-        for entry in sub.data_entries.all():
-            if entry.field_name in row_dict:
-                row_dict[entry.field_name] = entry.field_value
-        data.append(row_dict)
-
-    if not data:
+    if not form_obj.submissions.exists():
         return HttpResponse("No data to export.", status=404)
-    
-    df = pd.DataFrame(data, columns=headers) # Ensure column order is correct
 
-    # 2. Call the utility function to generate the PDF bytes
+    # 1. Render the chunked submission rows (same reader as CSV/Excel) as PDF bytes
     try:
-        pdf_bytes = generate_pdf_from_dataframe(df, title=form_obj.form_name)
+        pdf_bytes = build_pdf_export(form_obj)
     except Exception as e:
         # Handle potential errors during PDF generation
         print(f"Error generating PDF: {e}")
         return HttpResponse("An error occurred while generating the PDF.", status=500)
 
-    # 3. Create the HttpResponse
+    # 2. Create the HttpResponse
     response = HttpResponse(
         pdf_bytes,
         content_type='application/pdf',
@@ -868,7 +1163,7 @@ def get_child_submissions_api(request):
     submissions = FormSubmission.objects.filter(
         parent_submission_id=parent_submission_id,
         form_id=child_form_id
-    )
+    ).with_labels()
     
     # Format the data for the dropdown
     data = [
@@ -897,11 +1192,11 @@ def manage_relationships(request):
     selected_parent_submission = None
 
     if selected_parent_form_id:
-        parent_submissions = FormSubmission.objects.filter(form_id=selected_parent_form_id)
+        parent_submissions = FormSubmission.objects.filter(form_id=selected_parent_form_id).with_labels()
 
     if selected_parent_submission_id:
         selected_parent_submission = get_object_or_404(FormSubmission, pk=selected_parent_submission_id)
-        relationships = ChildRelationship.objects.filter(parent_submission=selected_parent_submission).select_related('source_submission', 'target_submission')
+        relationships = ChildRelationship.objects.filter(parent_submission=selected_parent_submission).select_related('source_submission__form', 'target_submission__form')
         child_submissions = FormSubmission.objects.filter(parent_submission=selected_parent_submission).select_related('form')
         child_form_types = Form.objects.filter(parent_form=selected_parent_submission.form)
 
@@ -943,19 +1238,11 @@ def delete_form(request, form_id):
     """
     Archives a form and all of its versions. This is a "soft delete".
     """
-    form_to_delete = get_object_or_404(Form, pk=form_id)
-
     # --- Permission Check ---
-    # Check if the user is the creator, a global admin, or has specific 'admin' permission for this form.
-    is_creator = form_to_delete.created_by == request.user
-    is_global_admin = request.user.role == 'admin'
-    has_form_admin_perm = FormPermission.objects.filter(
-        form=form_to_delete, 
-        user=request.user, 
-        permission_level='admin'
-    ).exists()
-
-    if not (is_creator or is_global_admin or has_form_admin_perm):
+    # The creator, a global admin, or a user with 'admin' permission for this form.
+    form_to_delete, permission_level = resolve_form_permission(request, form_id)
+
+    if permission_level != 'admin':
         messages.error(request, "You do not have permission to delete this form.")
         return redirect('form_detail', form_id=form_id)
 
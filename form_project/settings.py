@@ -45,10 +45,14 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     "django.middleware.security.SecurityMiddleware",
+    # Per-view latency / SQL / response size metrics, served at /metrics/ (core/metrics.py)
+    "core.metrics.RequestMetricsMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
     "django.contrib.auth.middleware.AuthenticationMiddleware",
+    # Staff-only cProfile + SQL capture when asked for with ?_profile=1 (core/profiling.py)
+    "core.profiling.RequestProfilerMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
 ]
@@ -124,6 +128,71 @@ USE_TZ = True
 
 STATIC_URL = "static/"
 
+# Where core.matrix reads submission values from: 'snapshot' (the denormalized
+# FormSubmission.snapshot column) or 'entries' (pivot the SubmissionData rows in SQL).
+# Migration 0007 fills the snapshots of existing submissions; `backfill_submission_snapshots`
+# repairs them if SubmissionData rows were ever changed without going through core.submissions.
+SUBMISSION_MATRIX_SOURCE = 'snapshot'
+
+# Seconds a user's FormPermission level stays cached (see core.permissions).
+# Changes drop the cached entry once they commit, but only in the cache they can reach:
+# with the default per-process LocMemCache, other server processes keep granting a revoked
+# level for up to this long. Deployments with several processes must configure a shared
+# CACHES backend (e.g. Redis or Memcached) for revocations to take effect everywhere.
+FORM_PERMISSION_CACHE_TIMEOUT = 60
+
+# Compiled form schemas (see core.schema): how many each process keeps in memory,
+# and how long they stay in the shared cache.
+FORM_SCHEMA_CACHE_SIZE = 256
+FORM_SCHEMA_CACHE_TIMEOUT = 24 * 60 * 60
+
+# How long rendered analytics charts are cached. Entries are keyed by each field's
+# data marker, so new submissions never serve a stale chart.
+ANALYTICS_CHART_CACHE_TIMEOUT = 24 * 60 * 60
+# Deepest level of descendant forms the analytics child roll-up may include (?depth=N).
+ANALYTICS_MAX_ROLLUP_DEPTH = 5
+# Forms with out-of-date aggregates and at most this many submissions are rebuilt by the
+# analytics view itself; larger ones are charted in SQL until rebuild_form_analytics runs.
+ANALYTICS_INLINE_REBUILD_LIMIT = 5000
+
+# AI field generation (Ollama)
+OLLAMA_HOST = config('OLLAMA_HOST', default='http://localhost:11434')
+OLLAMA_MODEL = config('OLLAMA_MODEL', default='llama2')
+# Seconds before a generation request is abandoned with a 504.
+AI_GENERATION_TIMEOUT = config('AI_GENERATION_TIMEOUT', default=60, cast=int)
+# LLM calls allowed in flight per server process; further requests get a 429.
+AI_MAX_CONCURRENT_GENERATIONS = config('AI_MAX_CONCURRENT_GENERATIONS', default=4, cast=int)
+AI_RETRY_AFTER_SECONDS = 5
+# Generated fields are reused for near-identical descriptions (see core.ai_cache)
+# for this many seconds, keeping at most AI_CACHE_MAX_ENTRIES (least recently used evicted).
+AI_CACHE_TTL = 30 * 24 * 60 * 60
+AI_CACHE_MAX_ENTRIES = 5000
+# Answer common descriptions (contact, registration, feedback, order, survey forms)
+# from local rules instead of the LLM (see core.utils.generate_fields_from_rules).
+AI_FAST_PATH_ENABLED = config('AI_FAST_PATH_ENABLED', default=True, cast=bool)
+
+# Bearer token a Prometheus scraper can send to read /metrics/ without logging in.
+# Empty means only logged-in staff users can read it.
+METRICS_TOKEN = config('METRICS_TOKEN', default='')
+
+# Number of request profiles (core.profiling) kept; older ones are deleted.
+REQUEST_PROFILE_BUFFER_SIZE = 100
+
+# Most submissions one request to the batch submission API may carry.
+API_BATCH_MAX_SUBMISSIONS = 500
+
+# Seconds a background export may run before it is considered abandoned (its worker
+# died) and marked failed, so the next request queues a fresh one.
+EXPORT_JOB_TIMEOUT = 60 * 60
+
+# Seconds a background import may run (or an upload may wait for its column mapping)
+# before it is considered abandoned and marked failed (see core.imports).
+IMPORT_JOB_TIMEOUT = 60 * 60
+
+# Uploaded and generated files (background export artifacts live in MEDIA_ROOT/exports/)
+MEDIA_URL = "media/"
+MEDIA_ROOT = BASE_DIR / "media"
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 